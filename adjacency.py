@@ -0,0 +1,120 @@
+"""
+Скомпилированный граф соседства известной карты.
+
+Каждому увиденному гексу и невидимым гексам на границе известного
+(они стоят 1, как и раньше) выдается номер узла. Соседи хранятся в
+плоском массиве по DEGREE ячеек на узел (индекс строки - номер узла * DEGREE,
+-1 - соседа нет в графе), веса - в массиве байт. Для поиска каждая строка
+дополнительно собрана в кортеж проходимых соседей, поэтому внутренний
+цикл поиска только читает готовые данные и ничего не выделяет.
+
+Граф растет по мере открытия карты: при новом или изменившемся гексе
+перекомпилируются только он сам и его соседи. Так же по месту ведется
+граница исследованного: увиденные проходимые гексы с невидимым соседом.
+"""
+
+from array import array
+from typing import Dict, List, Optional, Set, Tuple
+
+from hexgeo import NEIGHBOR_DELTAS, HexKey, spiral_key_rings
+
+DEGREE = len(NEIGHBOR_DELTAS)
+NO_NODE = -1
+FRONTIER_WEIGHT = 1                # Вес невидимого гекса на границе известного
+
+Node = int
+
+
+class HexGraph:
+    """Граф соседства: номера узлов, соседи по направлениям, веса"""
+
+    def __init__(self):
+        self.index: Dict[HexKey, Node] = {}
+        self.keys: List[HexKey] = []
+        self.adjacency = array('i')    # DEGREE соседей на узел в порядке NEIGHBOR_DELTAS
+        self.weights = bytearray()     # Вес входа на узел, 0 - непроходимый
+        self.seen = bytearray()        # 1 - гекс видели, 0 - граница неизвестного
+        self.rows: List[Tuple[Node, ...]] = []  # Проходимые соседи каждого узла
+        self.frontier: Set[HexKey] = set()  # Увиденные проходимые гексы рядом с неизвестными
+        self.version = 0               # Растет при любом изменении графа
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: HexKey) -> bool:
+        return key in self.index
+
+    def node(self, key: HexKey) -> Optional[Node]:
+        """Номер узла гекса (None - гекса нет в графе)"""
+        return self.index.get(key)
+
+    def _add(self, key: HexKey, dirty: set) -> Node:
+        """Новый узел-граница с весом FRONTIER_WEIGHT, связанный с уже известными соседями"""
+        node = len(self.keys)
+        self.index[key] = node
+        self.keys.append(key)
+        self.weights.append(FRONTIER_WEIGHT)
+        self.seen.append(0)
+        self.rows.append(())
+        base = node * DEGREE
+        self.adjacency.extend([NO_NODE] * DEGREE)
+        for direction, delta in enumerate(NEIGHBOR_DELTAS):
+            neighbor = self.index.get(key + delta)
+            if neighbor is not None:
+                self.adjacency[base + direction] = neighbor
+                # Противоположное направление - через три позиции
+                self.adjacency[neighbor * DEGREE + (direction + 3) % DEGREE] = node
+                dirty.add(neighbor)
+        dirty.add(node)
+        return node
+
+    def _compile(self, node: Node):
+        """Пересобираем кортеж проходимых соседей узла"""
+        base = node * DEGREE
+        adjacency = self.adjacency
+        weights = self.weights
+        self.rows[node] = tuple(adjacency[i] for i in range(base, base + DEGREE)
+                                if adjacency[i] != NO_NODE and weights[adjacency[i]])
+
+    def reveal(self, key: HexKey, weight: int):
+        """Гекс увидели (или изменился его вес): 0 - непроходимый"""
+        dirty = set()
+        node = self.index.get(key)
+        if node is None:
+            node = self._add(key, dirty)
+        self.weights[node] = weight
+        self.seen[node] = 1
+
+        # Невидимые соседи становятся границей графа; вес узла меняет строки всех соседей
+        base = node * DEGREE
+        for direction, delta in enumerate(NEIGHBOR_DELTAS):
+            neighbor = self.adjacency[base + direction]
+            if neighbor == NO_NODE:
+                neighbor = self._add(key + delta, dirty)
+            dirty.add(neighbor)
+        for other in dirty:
+            self._compile(other)
+
+        # Граница меняется только у самого гекса и у соседей, которые на ней были
+        self._update_frontier(node)
+        for i in range(base, base + DEGREE):
+            if self.keys[self.adjacency[i]] in self.frontier:
+                self._update_frontier(self.adjacency[i])
+        self.version += 1
+
+    def _update_frontier(self, node: Node):
+        """Узел на границе исследованного, если его видели, он проходим и рядом есть невидимый"""
+        key = self.keys[node]
+        base = node * DEGREE
+        seen = self.seen
+        if seen[node] and self.weights[node] and \
+                any(not seen[self.adjacency[i]] for i in range(base, base + DEGREE)):
+            self.frontier.add(key)
+        else:
+            self.frontier.discard(key)
+
+    def frontier_near(self, key: HexKey, radius: int) -> List[Tuple[HexKey, int]]:
+        """Гексы границы в радиусе radius от key с расстоянием, от ближних к дальним"""
+        frontier = self.frontier
+        return [(key + offset, ring) for offset, ring in spiral_key_rings(radius)
+                if key + offset in frontier]
@@ -0,0 +1,55 @@
+"""
+Anytime-планирование хода.
+
+Сначала каждый муравей получает дешевый базовый путь: продолжить путь
+прошлого хода, шаг домой по полю расстояний или остаться на месте. Потом
+планы улучшаются по очереди приоритета, пока до дедлайна отправки есть
+время. На дедлайне отправляется лучший набор, который успели собрать:
+при сотне муравьев часть из них пойдет базовыми путями, но ход не теряется.
+"""
+
+import time
+from typing import Dict, List, Optional
+
+from hexgeo import HexKey
+
+ANYTIME_RESERVE = 0.1          # Секунд до дедлайна на согласование путей и сборку запроса
+
+
+def continue_path(path: Optional[List[HexKey]], pos: HexKey) -> List[HexKey]:
+    """Остаток сохраненного пути, начиная с позиции муравья ([] - муравей с пути сошел)"""
+    if not path:
+        return []
+    try:
+        start = path.index(pos)
+    except ValueError:
+        return []
+    return path[start:]
+
+
+class AnytimePlan:
+    """Лучший известный путь каждого муравья на этот ход"""
+
+    def __init__(self, deadline: Optional[float], reserve: float = ANYTIME_RESERVE):
+        self.deadline = deadline       # Дедлайн отправки (time.monotonic), None - без ограничения
+        self.reserve = reserve
+        self.paths: Dict[str, List[HexKey]] = {}   # ID -> путь с текущей позицией в начале
+        self.refined = 0               # Сколько муравьев получили полный план
+        self.skipped = 0               # Сколько остались на базовом пути: время вышло
+
+    def propose(self, ant_id: str, path: List[HexKey], refined: bool = False):
+        """Новый путь муравья заменяет прежний"""
+        self.paths[ant_id] = path
+        if refined:
+            self.refined += 1
+
+    def has_time(self) -> bool:
+        """Успеем ли улучшить еще один план до дедлайна"""
+        return self.deadline is None or time.monotonic() < self.deadline - self.reserve
+
+    def moves(self) -> List[Dict]:
+        """Команды по лучшим путям (без текущей позиции, муравьи на месте не входят)"""
+        return [{"ant": ant_id, "path": path[1:]} for ant_id, path in self.paths.items() if len(path) > 1]
+
+    def summary(self) -> str:
+        return f"улучшено {self.refined}/{len(self.paths)}, на базовом пути {self.skipped}"
@@ -0,0 +1,69 @@
+"""
+Ответ /arena в столбцах.
+
+Сразу после разбора JSON гексы карты, муравьи, враги и ресурсы
+раскладываются в параллельные NumPy-массивы (q, r, тип, стоимость и т.д.)
+и упакованные ключи гексов. Память о карте и индекс хода строятся по этим
+массивам, без обхода словаря на каждый гекс.
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from hexgeo import KEY_BITS, KEY_OFFSET
+
+# Поля гекса карты и значения по умолчанию (гекс без cost стоит 1, как обычный)
+MAP_FIELDS = (('q', 0), ('r', 0), ('type', 0), ('cost', 1))
+
+
+def field_table(items: Sequence[Dict], fields: Tuple[Tuple[str, int], ...]) -> np.ndarray:
+    """Матрица len(items) x len(fields) из списка словарей (поле, значение по умолчанию)"""
+    if not items:
+        return np.zeros((0, len(fields)), dtype=np.int64)
+    return np.array([tuple(item.get(name, default) for name, default in fields) for item in items],
+                    dtype=np.int64)
+
+
+def pack_columns(q: np.ndarray, r: np.ndarray) -> np.ndarray:
+    """Упакованные ключи гексов (как hexgeo.pack) для массивов координат"""
+    return ((q + KEY_OFFSET) << KEY_BITS) | (r + KEY_OFFSET)
+
+
+class ArenaColumns:
+    """Столбцы одного ответа /arena"""
+
+    __slots__ = ('source', 'map_q', 'map_r', 'map_type', 'map_cost', 'map_keys',
+                 'ant_ids', 'ant_q', 'ant_r', 'ant_type', 'ant_health', 'ant_keys',
+                 'enemy_q', 'enemy_r', 'enemy_type', 'enemy_health', 'enemy_keys',
+                 'food_q', 'food_r', 'food_type', 'food_amount', 'food_keys')
+
+    def __init__(self, arena_data: Dict):
+        self.source = arena_data
+
+        hexes = field_table(arena_data.get('map', []), MAP_FIELDS)
+        self.map_q, self.map_r = hexes[:, 0], hexes[:, 1]
+        self.map_type = hexes[:, 2].astype(np.uint8)
+        self.map_cost = np.minimum(hexes[:, 3], 255).astype(np.uint8)
+        self.map_keys = pack_columns(self.map_q, self.map_r)
+
+        ants = arena_data.get('ants', [])
+        self.ant_ids: List[str] = [ant['id'] for ant in ants]
+        table = field_table(ants, (('q', 0), ('r', 0), ('type', 0), ('health', 0)))
+        self.ant_q, self.ant_r, self.ant_type, self.ant_health = table.T
+        self.ant_keys = pack_columns(self.ant_q, self.ant_r)
+
+        table = field_table(arena_data.get('enemies', []), (('q', 0), ('r', 0), ('type', 0), ('health', 0)))
+        self.enemy_q, self.enemy_r, self.enemy_type, self.enemy_health = table.T
+        self.enemy_keys = pack_columns(self.enemy_q, self.enemy_r)
+
+        table = field_table(arena_data.get('food', []), (('q', 0), ('r', 0), ('type', 0), ('amount', 0)))
+        self.food_q, self.food_r, self.food_type, self.food_amount = table.T
+        self.food_keys = pack_columns(self.food_q, self.food_r)
+
+    def is_for(self, arena_data: Dict) -> bool:
+        """Построены ли столбцы именно по этому ответу /arena"""
+        return self.source is arena_data
+
+    def __len__(self) -> int:
+        return len(self.map_keys)
@@ -0,0 +1,123 @@
+"""
+Индекс состояния арены на один ход.
+
+Строится один раз сразу после получения ответа /arena и дальше только читается
+всеми планировщиками: рельеф по координате, муравьи по ID и позиции,
+враги и ресурсы по позиции, гексы муравейника. Позиции - упакованные
+ключи гексов (hexgeo.pack).
+"""
+
+from types import MappingProxyType
+from typing import Dict, Optional, Tuple
+
+from arena_columns import ArenaColumns
+from constants import HEX_STONE
+from hexgeo import HexKey, pack, pack_dict
+from spatial import SpatialIndex
+
+
+class ArenaIndex:
+    """Неизменяемый индекс ответа /arena (один на ход)"""
+
+    __slots__ = ('source', 'turn_no', 'terrain', 'costs', 'ants_by_id', 'ants_by_pos',
+                 'enemies_by_pos', 'food_by_pos', 'home', 'spot', 'ant_grid', 'enemy_grid', 'food_grid')
+
+    def __init__(self, arena_data: Dict, columns: Optional[ArenaColumns] = None):
+        if columns is not None:
+            # Рельеф из уже разобранных столбцов, без обхода словарей гексов
+            keys = columns.map_keys.tolist()
+            terrain = dict(zip(keys, columns.map_type.tolist()))
+            passable = columns.map_type != HEX_STONE
+            costs = dict(zip(columns.map_keys[passable].tolist(), columns.map_cost[passable].tolist()))
+        else:
+            terrain = {}
+            costs = {}
+            for hex_info in arena_data.get('map', []):
+                pos = pack_dict(hex_info)
+                terrain[pos] = hex_info['type']
+                if hex_info['type'] != HEX_STONE:
+                    costs[pos] = hex_info.get('cost', 1)
+
+        ants_by_id = {}
+        ants_by_pos = {}
+        for ant in arena_data.get('ants', []):
+            ants_by_id[ant['id']] = ant
+            ants_by_pos.setdefault(pack_dict(ant), []).append(ant)
+
+        enemies_by_pos = {}
+        for enemy in arena_data.get('enemies', []):
+            enemies_by_pos.setdefault(pack_dict(enemy), []).append(enemy)
+
+        food_by_pos = {pack_dict(food): food for food in arena_data.get('food', [])}
+
+        spot = arena_data.get('spot') or {}
+
+        set_attr = object.__setattr__
+        set_attr(self, 'source', arena_data)
+        set_attr(self, 'turn_no', arena_data.get('turnNo'))
+        set_attr(self, 'terrain', MappingProxyType(terrain))
+        set_attr(self, 'costs', MappingProxyType(costs))
+        set_attr(self, 'ants_by_id', MappingProxyType(ants_by_id))
+        set_attr(self, 'ants_by_pos', MappingProxyType(
+            {pos: tuple(ants) for pos, ants in ants_by_pos.items()}))
+        set_attr(self, 'enemies_by_pos', MappingProxyType(
+            {pos: tuple(enemies) for pos, enemies in enemies_by_pos.items()}))
+        set_attr(self, 'food_by_pos', MappingProxyType(food_by_pos))
+        set_attr(self, 'home', frozenset(pack_dict(h) for h in arena_data.get('home', [])))
+        set_attr(self, 'spot', pack(spot.get('q', 0), spot.get('r', 0)))
+        # Пространственный хеш для запросов "ближайший" и "в радиусе"
+        set_attr(self, 'ant_grid', SpatialIndex(
+            (pos, ant) for pos, ants in ants_by_pos.items() for ant in ants))
+        set_attr(self, 'enemy_grid', SpatialIndex(
+            (pos, enemy) for pos, enemies in enemies_by_pos.items() for enemy in enemies))
+        set_attr(self, 'food_grid', SpatialIndex(food_by_pos.items()))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ArenaIndex неизменяем")
+
+    def __delattr__(self, name):
+        raise AttributeError("ArenaIndex неизменяем")
+
+    def is_for(self, arena_data: Dict) -> bool:
+        """Построен ли индекс именно по этому ответу /arena"""
+        return self.source is arena_data
+
+    def terrain_type(self, pos: HexKey) -> Optional[int]:
+        """Тип гекса или None, если гекс не виден"""
+        return self.terrain.get(pos)
+
+    def is_passable(self, pos: HexKey) -> bool:
+        """Проходим ли гекс (невидимые гексы считаем проходимыми)"""
+        return self.terrain.get(pos) != HEX_STONE
+
+    def move_cost(self, pos: HexKey) -> float:
+        """Стоимость входа на гекс в очках движения (камень - бесконечность)"""
+        cost = self.costs.get(pos)
+        if cost is not None:
+            return cost
+        return float('inf') if self.terrain.get(pos) == HEX_STONE else 1
+
+    def ant(self, ant_id: str) -> Optional[Dict]:
+        """Наш муравей по ID"""
+        return self.ants_by_id.get(ant_id)
+
+    def ants_at(self, pos: HexKey) -> Tuple[Dict, ...]:
+        """Наши муравьи на гексе"""
+        return self.ants_by_pos.get(pos, ())
+
+    def enemies_at(self, pos: HexKey) -> Tuple[Dict, ...]:
+        """Враги на гексе"""
+        return self.enemies_by_pos.get(pos, ())
+
+    def enemy_at(self, pos: HexKey) -> Optional[Dict]:
+        """Первый враг на гексе"""
+        enemies = self.enemies_by_pos.get(pos)
+        return enemies[0] if enemies else None
+
+    def food_at(self, pos: HexKey) -> Optional[Dict]:
+        """Ресурс на гексе"""
+        return self.food_by_pos.get(pos)
+
+    def is_home(self, pos: HexKey) -> bool:
+        """Является ли гекс частью нашего муравейника"""
+        return pos in self.home
@@ -0,0 +1,205 @@
+"""
+Назначение рабочих на ресурсы для всей колонии.
+
+Каждый ход строится матрица стоимости рабочие x места у ресурсов: реальная
+стоимость пути из слоя поиска пути, дорога до дома и ценность груза. Куча
+больше грузоподъемности рабочего дает несколько мест. Задача решается
+точно (венгерский алгоритм на кратчайших увеличивающих путях). Рабочий,
+которому выгодного места нет, получает фиктивное место "без задания".
+
+Между ходами сохраняются цены мест (двойственные переменные) и прошлые
+назначения: решение стартует с прошлых цен, а прежняя пара рабочий-ресурс
+получает небольшую скидку, чтобы рабочие не перебегали между целями.
+"""
+
+import math
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from constants import (ANT_CARRY_CAPACITY, MOVEMENT_POINTS, RESOURCE_APPLE, RESOURCE_BREAD, RESOURCE_NECTAR,
+                       ROLE_WORKER)
+from hexgeo import HexKey, key_distance, pack_dict
+from pathfinding import CostFn, dijkstra, dijkstra_graph, reconstruct_path
+
+FOOD_VALUE = {RESOURCE_NECTAR: 6, RESOURCE_BREAD: 2, RESOURCE_APPLE: 1}  # Ценность единицы ресурса
+FOOD_VALUE_WEIGHT = 1.0        # Вес ценности груза против стоимости пути
+HOME_DISTANCE_WEIGHT = 0.1     # Вес дороги от ресурса до дома
+MAX_SLOTS_PER_FOOD = 4         # Больше рабочих на одну кучу не посылаем
+STICKY_BONUS = 2.0             # Скидка прежней паре рабочий-ресурс
+IDLE_COST = 1e4                # Стоимость места "без задания": лучше любой достижимой цели только недостижимость
+UNREACHABLE_COST = 1e6         # Ресурс вне горизонта поиска
+THREAT_FOOD_WEIGHT = 0.05      # Надбавка к стоимости места за единицу угрозы на гексе ресурса
+ASSIGN_SEARCH_TURNS = 4        # Горизонт поиска ресурсов рабочим (в ходах движения)
+
+
+def solve_assignment(cost: np.ndarray, prices: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Минимальное по стоимости назначение строк столбцам (строк не больше столбцов)
+
+    Венгерский алгоритм с потенциалами: строки добавляются по одной, каждая
+    - кратчайшим увеличивающим путем по приведенным стоимостям. prices -
+    начальные потенциалы столбцов (например, с прошлого хода).
+    Возвращает (столбец каждой строки, потенциалы столбцов).
+    """
+    row_to_col, v = _augment_rows(cost, prices)
+    if prices is not None:
+        # Решение оптимально, только если у всех свободных столбцов наибольший
+        # потенциал; старые цены могут это нарушить - тогда решаем с нуля
+        free = np.ones(len(v), dtype=bool)
+        free[row_to_col] = False
+        if free.any() and v[free].min() < v.max() - 1e-9:
+            row_to_col, v = _augment_rows(cost, None)
+    return row_to_col, v
+
+
+def _augment_rows(cost: np.ndarray, prices: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Одна прогонка венгерского алгоритма от заданных потенциалов столбцов"""
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    if prices is not None:
+        v[1:] = prices
+    owner = np.zeros(m + 1, dtype=np.int64)    # Строка (с 1), занявшая столбец; 0 - свободен
+    way = np.zeros(m + 1, dtype=np.int64)
+    for row in range(1, n + 1):
+        owner[0] = row
+        col = 0
+        min_reduced = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[col] = True
+            current = owner[col]
+            reduced = cost[current - 1] - u[current] - v[1:]
+            free = ~used[1:]
+            better = free & (reduced < min_reduced[1:])
+            min_reduced[1:][better] = reduced[better]
+            way[1:][better] = col
+            candidates = np.where(free, min_reduced[1:], np.inf)
+            next_col = int(np.argmin(candidates)) + 1
+            delta = candidates[next_col - 1]
+            visited = np.flatnonzero(used)
+            u[owner[visited]] += delta
+            v[visited] -= delta
+            min_reduced[1:][free] -= delta
+            col = next_col
+            if owner[col] == 0:
+                break
+        # Разворачиваем увеличивающий путь
+        while col:
+            prev = way[col]
+            owner[col] = owner[prev]
+            col = prev
+
+    row_to_col = np.full(n, -1, dtype=np.int64)
+    taken = np.flatnonzero(owner[1:])
+    row_to_col[owner[1:][taken] - 1] = taken
+    return row_to_col, v[1:]
+
+
+def carry_slots(food: Dict, capacity: int) -> List[float]:
+    """Ценность груза для каждого места у кучи: первое место - полный груз и т.д."""
+    amount = food.get('amount', 0)
+    slots = min(MAX_SLOTS_PER_FOOD, max(1, math.ceil(amount / capacity)))
+    unit_value = FOOD_VALUE.get(food.get('type'), 1)
+    return [min(capacity, max(0, amount - slot * capacity)) * unit_value for slot in range(slots)]
+
+
+class FoodAssigner:
+    """Назначения рабочих на ресурсы; цены мест и прежние пары живут между ходами"""
+
+    def __init__(self):
+        self.prices: Dict[Hashable, float] = {}    # (гекс ресурса, номер места) -> потенциал
+        self.targets: Dict[str, HexKey] = {}       # ID рабочего -> гекс ресурса прошлого хода
+
+    def assign(self, workers: Sequence[Dict], food_keys: Sequence[HexKey], food: Sequence[Dict],
+               travel: np.ndarray, home_distance: Optional[np.ndarray] = None,
+               extra_cost: Optional[np.ndarray] = None) -> Dict[str, int]:
+        """Рабочий -> индекс ресурса для всех рабочих сразу
+
+        travel - стоимость пути рабочие x ресурсы (np.inf - недостижим),
+        home_distance и extra_cost - добавки по ресурсам (дорога домой, угроза).
+        """
+        if not workers or not food:
+            self.targets = {}
+            return {}
+        capacity = ANT_CARRY_CAPACITY.get(ROLE_WORKER, 1)
+        base = np.zeros(len(food))
+        if home_distance is not None:
+            base += HOME_DISTANCE_WEIGHT * home_distance
+        if extra_cost is not None:
+            base += extra_cost
+
+        # Столбцы: места у каждой кучи, потом по фиктивному месту на рабочего
+        columns: List[Tuple[int, Hashable]] = []
+        gains = []
+        for j, item in enumerate(food):
+            for slot, gain in enumerate(carry_slots(item, capacity)):
+                columns.append((j, (food_keys[j], slot)))
+                gains.append(gain)
+        food_of = np.array([j for j, _ in columns], dtype=np.int64)
+        slot_cost = base[food_of] - FOOD_VALUE_WEIGHT * np.array(gains)
+        cost = np.where(np.isfinite(travel[:, food_of]), travel[:, food_of] + slot_cost, UNREACHABLE_COST)
+
+        # Прежняя цель рабочего - со скидкой
+        for i, worker in enumerate(workers):
+            previous = self.targets.get(worker['id'])
+            if previous is not None:
+                cost[i, [c for c, (j, _) in enumerate(columns) if food_keys[j] == previous]] -= STICKY_BONUS
+        cost = np.hstack([cost, np.full((len(workers), len(workers)), IDLE_COST)])
+
+        keys = [key for _, key in columns] + [('idle', i) for i in range(len(workers))]
+        prices = np.array([self.prices.get(key, 0.0) for key in keys])
+        row_to_col, prices = solve_assignment(cost, prices)
+        self.prices = dict(zip(keys, prices.tolist()))
+
+        result = {}
+        for i, col in enumerate(row_to_col.tolist()):
+            if col < len(columns) and cost[i, col] < UNREACHABLE_COST / 2:
+                result[workers[i]['id']] = columns[col][0]
+        self.targets = {ant_id: food_keys[j] for ant_id, j in result.items()}
+        return result
+
+
+def plan_food(assigner: FoodAssigner, workers: Sequence[Dict], food: Sequence[Dict], graph,
+              cost_of: CostFn, home: Sequence[HexKey] = (), home_field=None, threat=None,
+              horizon_turns: int = ASSIGN_SEARCH_TURNS) -> Dict[str, Tuple[HexKey, List[HexKey]]]:
+    """Цели и пути рабочих к ресурсам: ID -> (гекс ресурса, путь)
+
+    Один поиск Дейкстры на рабочего (только до ресурсов в горизонте), потом
+    одно назначение для всех. home_field - поле расстояний до дома (иначе
+    расстояние по прямой), threat - тепловая карта хода.
+    """
+    if not workers or not food:
+        assigner.assign([], [], [], np.zeros((0, 0)))
+        return {}
+    food_keys = [pack_dict(item) for item in food]
+    travel = np.full((len(workers), len(food)), np.inf)
+    parents_of = []
+    for i, worker in enumerate(workers):
+        start = pack_dict(worker)
+        horizon = MOVEMENT_POINTS.get(worker['type'], 5) * horizon_turns
+        targets = [key for key in food_keys if key_distance(start, key) <= horizon]
+        if not targets:
+            parents_of.append({})
+            continue
+        search = dijkstra_graph(graph, start, horizon, targets=targets)
+        if search is None:
+            search = dijkstra(start, cost_of, horizon, targets=targets)
+        dist, parents = search
+        parents_of.append(parents)
+        for j, key in enumerate(food_keys):
+            if key in dist:
+                travel[i, j] = dist[key]
+
+    home_distance = np.zeros(len(food))
+    for j, key in enumerate(food_keys):
+        distance = home_field.distance(key) if home_field is not None else None
+        if distance is None and home:
+            distance = min(key_distance(key, hill) for hill in home)
+        home_distance[j] = distance or 0
+    extra_cost = threat.levels(food_keys) * THREAT_FOOD_WEIGHT if threat is not None else None
+
+    chosen = assigner.assign(workers, food_keys, food, travel, home_distance, extra_cost)
+    index_of = {worker['id']: i for i, worker in enumerate(workers)}
+    return {ant_id: (food_keys[j], reconstruct_path(parents_of[index_of[ant_id]], food_keys[j]))
+            for ant_id, j in chosen.items()}
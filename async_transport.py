@@ -0,0 +1,141 @@
+"""
+Асинхронный транспорт для API игры.
+
+Одна aiohttp.ClientSession с пулом keep-alive соединений на клиента, тот же
+общий лимит 3 RPS и классы приоритета, что у APIclient, и та же политика
+дедлайнов: таймауты попытки не выходят за дедлайн, повторы с джиттером
+делаются, пока на них хватает времени. Сервер (тестовый или боевой)
+выбирается так же, как в APIclient.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import aiohttp
+
+from config import BASE_URL_PROD, BASE_URL_TEST, HEADERS, TOKEN
+from rate_limit import PRIORITY_ARENA, PRIORITY_MOVE, shared_limiter
+from transport import (ACCEPT_ENCODING, HTTP_MIN_ATTEMPT, HTTP_POOL_SIZE, HTTP_RETRIES, HTTP_RETRY_STATUSES,
+                       HTTP_TIMEOUT, DeadlineExceeded, PayloadStats, Timeout, backoff_delay, decode_json)
+
+KEEPALIVE_TIMEOUT = 30.0       # Сколько держим простаивающее соединение, секунд
+# Ошибки до установки соединения: запрос точно не ушел, повторять можно любой
+# (ConnectionTimeoutError есть только в aiohttp >= 3.10)
+CONNECT_ERRORS = (aiohttp.ClientConnectorError,) + tuple(
+    error for error in (getattr(aiohttp, 'ConnectionTimeoutError', None),) if error is not None)
+
+
+class AsyncTransport:
+    """aiohttp-сессия с пулом соединений, общим лимитом запросов и дедлайнами"""
+
+    def __init__(self, use_test_server: bool = True, token: Optional[str] = TOKEN,
+                 pool_size: int = HTTP_POOL_SIZE, timeout: Timeout = HTTP_TIMEOUT):
+        self.base_url = BASE_URL_TEST if use_test_server else BASE_URL_PROD
+        self.headers = dict(HEADERS, **{'X-Auth-Token': token, 'Accept-Encoding': ACCEPT_ENCODING})
+        self.pool_size = pool_size
+        self.timeout = timeout
+        # Таймауты по умолчанию создаются один раз; отдельный объект нужен, только когда дедлайн ближе
+        self.default_timeout = aiohttp.ClientTimeout(total=sum(timeout), sock_connect=timeout[0])
+        self.rate_limiter = shared_limiter(token)  # Тот же лимит 3 RPS, что у APIclient
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.request_started = 0.0  # Когда ушел последний запрос (после ожидания токена)
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def open(self):
+        """Создаем сессию (в работающем цикле asyncio)"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=KEEPALIVE_TIMEOUT)
+            self.session = aiohttp.ClientSession(connector=connector, headers=self.headers,
+                                                 timeout=self.default_timeout)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _attempt_timeout(self, deadline: float) -> Optional[aiohttp.ClientTimeout]:
+        """Таймауты попытки в пределах дедлайна (None - попытку начинать поздно)"""
+        remaining = deadline - time.monotonic()
+        if remaining < HTTP_MIN_ATTEMPT:
+            return None
+        if remaining >= sum(self.timeout):
+            return self.default_timeout
+        return aiohttp.ClientTimeout(total=remaining, sock_connect=min(self.timeout[0], remaining))
+
+    async def request(self, method: str, endpoint: str, priority: int, deadline: Optional[float] = None,
+                      idempotent: bool = True, payload_stats: Optional[PayloadStats] = None,
+                      **kwargs) -> Tuple[int, Any]:
+        """Запрос в пределах дедлайна (time.monotonic): повторы с джиттером, пока есть время
+
+        Возвращает (статус, JSON или None). Неидемпотентный запрос повторяется
+        только после ошибки соединения: после отправки тела он мог уже дойти
+        до сервера. В payload_stats
+        пишется размер ответа и время разбора JSON.
+        """
+        if deadline is None:
+            await self.rate_limiter.acquire_async(priority)
+            deadline = time.monotonic() + sum(self.timeout)
+        else:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"{method} /{endpoint}: дедлайн истек до отправки")
+            await self.rate_limiter.acquire_async(priority, timeout=remaining)
+        await self.open()
+        self.request_started = time.monotonic()
+        attempt = 0
+        while True:
+            timeout = self._attempt_timeout(deadline)
+            if timeout is None:
+                raise DeadlineExceeded(f"{method} /{endpoint}: дедлайн истек")
+            try:
+                async with self.session.request(method, f"{self.base_url}/{endpoint}", timeout=timeout,
+                                                **kwargs) as response:
+                    status = response.status
+                    if not (idempotent and status in HTTP_RETRY_STATUSES):
+                        if status != 200:
+                            return status, None
+                        # aiohttp сам распаковывает gzip; по сети пришло Content-Length байт
+                        body = await response.read()
+                        decode_started = time.monotonic()
+                        data = decode_json(body)
+                        if payload_stats is not None:
+                            wire = response.headers.get('Content-Length', '')
+                            payload_stats.add(int(wire) if wire.isdigit() else len(body), len(body),
+                                              time.monotonic() - decode_started)
+                        return status, data
+                    error = None
+            except CONNECT_ERRORS as e:
+                error = e  # Соединение не установлено - запрос точно не отправлен
+            except asyncio.TimeoutError:
+                if not idempotent:
+                    raise
+                error = DeadlineExceeded(f"{method} /{endpoint}: таймаут")
+            except aiohttp.ClientConnectionError as e:
+                if not idempotent:
+                    raise
+                error = e
+
+            delay = backoff_delay(attempt)
+            if attempt >= HTTP_RETRIES or time.monotonic() + delay + HTTP_MIN_ATTEMPT > deadline:
+                if error is not None:
+                    raise error
+                return status, None
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def get_arena(self, deadline: Optional[float] = None,
+                        payload_stats: Optional[PayloadStats] = None) -> Tuple[int, Optional[Dict]]:
+        """GET /arena: (статус, снимок или None)"""
+        return await self.request('GET', 'arena', PRIORITY_ARENA, deadline, payload_stats=payload_stats)
+
+    async def send_moves(self, payload: list, deadline: Optional[float] = None) -> Tuple[int, Any]:
+        """POST /move: команды в формате API, без повторов после таймаута"""
+        return await self.request('POST', 'move', PRIORITY_MOVE, deadline, idempotent=False,
+                                  json={"moves": payload})
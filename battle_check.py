@@ -4,7 +4,10 @@
 import os
 import sys
 from config import APIclient, data
-import requests
+from transport import make_session
+
+# Одна keep-alive сессия на все проверки
+SESSION = make_session()
 
 def check_env_file():
     """Проверка .env файла"""
@@ -79,7 +82,7 @@ def check_api_connection():
     
     # Тестовый сервер
     try:
-        test_client = APIclient(use_test_server=True)
+        test_client = APIclient(use_test_server=True, session=SESSION)
         rounds_info = test_client.get_rounds_info()
         if rounds_info:
             print("   ✅ Тестовый сервер доступен")
@@ -93,7 +96,7 @@ def check_api_connection():
     
     # Боевой сервер
     try:
-        prod_client = APIclient(use_test_server=False)
+        prod_client = APIclient(use_test_server=False, session=SESSION)
         rounds_info = prod_client.get_rounds_info()
         if rounds_info:
             print("   ✅ Боевой сервер доступен")
@@ -141,7 +144,7 @@ def test_registration():
     print("\n📝 Тест регистрации на тестовом сервере...")
     
     try:
-        client = APIclient(use_test_server=True)
+        client = APIclient(use_test_server=True, session=SESSION)
         result = client.register_for_round()
         
         if result:
@@ -53,9 +53,11 @@ def battle_start():
             turn_count += 1
             print(f"\n=== ХОД {turn_count} ===")
             
-            # Получаем текущие данные арены
-            arena_data = client.get_arena()
+            # Получаем текущие данные арены (на первом ходу - снимок из проверки выше)
+            if arena_data is None:
+                arena_data = client.get_arena()
             if not arena_data:
+                arena_data = None
                 print("❌ Ошибка получения данных арены")
                 time.sleep(1)
                 continue
@@ -67,15 +69,17 @@ def battle_start():
                 print(f"Общее количество ходов: {turn_count-1}")
                 break
                 
-            # Выполняем ход
-            success = client.execute_turn()
+            # Выполняем ход по уже полученному снимку (без второго запроса /arena)
+            success = client.execute_turn(arena_data)
             if not success:
                 print("⚠️ Ошибка выполнения хода, продолжаем...")
             
-            # Ждем до следующего хода
-            sleep_time = max(0.5, next_turn_in - 0.2)  # Небольшой запас
-            if sleep_time > 0:
-                time.sleep(sleep_time)
+            arena_data = None
+            
+            # Ждем открытия следующего хода по часам сервера
+            time.sleep(client.turn_clock.sleep_time())
+            if turn_count % 10 == 0:
+                print(f"⏱️ {client.turn_clock.summary()}")
                 
     except KeyboardInterrupt:
         print(f"\n⏹️ Остановлено пользователем на ходу {turn_count}")
@@ -91,6 +95,7 @@ def battle_start():
         import traceback
         traceback.print_exc()
         
+    print(f"⏱️ {client.turn_clock.summary()}")
     return True
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+"""
+Реестр заявок на ресурсы.
+
+Заявка - гекс ресурса, муравей-владелец, ход заявки и срок жизни. Один
+словарь по гексу и обратный словарь по муравью дают заявку, снятие и
+поиск за O(1); у муравья не больше одной заявки. Раз в ход sync снимает
+заявки умерших муравьев, уже несущих груз и на ресурсы, которых больше не
+видно, а просроченные заявки не считаются и при поиске. Память не растет
+за раунд: заявок не больше, чем муравьев. Изменения идут под замком:
+планировщики муравьев работают в нескольких потоках.
+"""
+
+import threading
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from hexgeo import HexKey
+
+CLAIM_TTL_TURNS = 20           # Сколько ходов живет заявка без продления
+
+Claim = Tuple[str, int, int]   # Владелец, ход заявки, срок жизни
+
+
+class ClaimRegistry:
+    """Заявки муравьев на ресурсы: гекс -> (владелец, ход, срок)"""
+
+    def __init__(self, ttl: int = CLAIM_TTL_TURNS):
+        self.ttl = ttl
+        self.by_hex: Dict[HexKey, Claim] = {}
+        self.by_ant: Dict[str, HexKey] = {}
+        self.lock = threading.RLock()  # Проверка и запись заявки - одна операция
+
+    def __len__(self) -> int:
+        return len(self.by_hex)
+
+    def _alive(self, claim: Claim, turn: Optional[int]) -> bool:
+        return turn is None or turn - claim[1] < claim[2]
+
+    def owner(self, key: HexKey, turn: Optional[int] = None) -> Optional[str]:
+        """Владелец действующей заявки на гекс (turn - для проверки срока)"""
+        claim = self.by_hex.get(key)
+        if claim is None or not self._alive(claim, turn):
+            return None
+        return claim[0]
+
+    def claimed_by_other(self, key: HexKey, ant_id: str, turn: Optional[int] = None) -> bool:
+        """Занят ли ресурс другим муравьем"""
+        owner = self.owner(key, turn)
+        return owner is not None and owner != ant_id
+
+    def claim(self, key: HexKey, ant_id: str, turn: int, ttl: Optional[int] = None) -> bool:
+        """Заявка муравья на гекс; прежняя заявка муравья снимается. False - гекс занят другим"""
+        with self.lock:
+            if self.claimed_by_other(key, ant_id, turn):
+                return False
+            self.release_ant(ant_id)
+            self.release(key)
+            self.by_hex[key] = (ant_id, turn, self.ttl if ttl is None else ttl)
+            self.by_ant[ant_id] = key
+            return True
+
+    def release(self, key: HexKey):
+        """Снимаем заявку на гекс"""
+        with self.lock:
+            claim = self.by_hex.pop(key, None)
+            if claim is not None and self.by_ant.get(claim[0]) == key:
+                del self.by_ant[claim[0]]
+
+    def release_ant(self, ant_id: str):
+        """Снимаем заявку муравья"""
+        with self.lock:
+            key = self.by_ant.pop(ant_id, None)
+            if key is not None:
+                self.by_hex.pop(key, None)
+
+    def sync(self, turn: int, ants: Iterable[Dict], food_keys: Set[HexKey]) -> int:
+        """Снимаем мертвые заявки по снимку хода; возвращает, сколько снято
+
+        Заявка снимается, если муравья нет среди живых или он уже несет
+        груз, если ресурса на гексе больше не видно или истек срок.
+        """
+        busy = set()
+        alive = set()
+        for ant in ants:
+            alive.add(ant['id'])
+            if ant.get('food', {}).get('amount', 0) > 0:
+                busy.add(ant['id'])
+        with self.lock:
+            stale = [key for key, (owner, claimed, ttl) in self.by_hex.items()
+                     if owner not in alive or owner in busy or key not in food_keys or turn - claimed >= ttl]
+            for key in stale:
+                self.release(key)
+        return len(stale)
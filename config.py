@@ -1,4 +1,5 @@
 import os
+import time
 import requests
 from dotenv import load_dotenv
 import random
@@ -6,6 +7,28 @@ import json
 import math
 from collections import defaultdict
 from typing import List, Dict, Tuple, Optional
+import numpy as np
+from constants import (ROLE_WORKER, ROLE_FIGHTER, ROLE_SCOUT, MOVEMENT_POINTS,
+                       HEX_ANTHILL, HEX_EMPTY, HEX_DIRT, HEX_ACID, HEX_STONE,
+                       RESOURCE_APPLE, RESOURCE_BREAD, RESOURCE_NECTAR)
+from anytime import AnytimePlan, continue_path
+from assignment import FoodAssigner, plan_food
+from arena_columns import ArenaColumns
+from arena_index import ArenaIndex
+from hexgeo import (HexKey, NEIGHBOR_DELTAS, pack, pack_dict, unpack, key_to_dict, key_distance,
+                    neighbor_keys, pack_array, coords_array, distance_matrix, distances_from)
+from pathfinding import (find_path, find_path_graph, dijkstra, dijkstra_graph, reconstruct_path,
+                         PATH_MAX_NODES, PATH_MAX_STEP_COST, PATH_TIME_BUDGET)
+from distance_field import DistanceField, FieldCache
+from incremental import IncrementalPlanner
+from hierarchy import HierarchicalPlanner, LONG_PATH_DISTANCE
+from reservation import resolve_moves
+from threat import THREAT_MAX_EXTRA, ThreatField
+from rate_limit import PRIORITY_ARENA, PRIORITY_BACKGROUND, PRIORITY_MOVE, shared_limiter
+from transport import (HTTP_TIMEOUT, DeadlineExceeded, PayloadStats, Timeout, decode_json, make_session,
+                       request_with_deadline, wire_size)
+from turn_clock import TurnClock
+from world import WorldStore
 
 load_dotenv()
 
@@ -28,42 +51,51 @@ data = {
     ]
 }
 
-# Константы типов муравьев
-ROLE_WORKER = 0
-ROLE_FIGHTER = 1
-ROLE_SCOUT = 2
+# Ядра угрозы по типу врага: (тип, радиус, сила)
+THREAT_KERNELS = (
+    (ROLE_FIGHTER, 2, 70),
+    (ROLE_SCOUT, 4, 20),
+    (ROLE_WORKER, 1, 30)
+)
 
-# Константы типов гексов
-HEX_ANTHILL = 1
-HEX_EMPTY = 2
-HEX_DIRT = 3
-HEX_ACID = 4
-HEX_STONE = 5
+# Сколько шагов пути к дому читаем из поля за ход (больше, чем очков движения)
+HOME_PATH_STEPS = 8
 
-# Константы ресурсов
-RESOURCE_APPLE = 1
-RESOURCE_BREAD = 2
-RESOURCE_NECTAR = 3
+# Горизонт поиска ресурсов рабочим (в ходах движения)
+FOOD_SEARCH_TURNS = 4
+# Штраф к оценке ресурса за единицу угрозы на его гексе
+THREAT_FOOD_PENALTY = 0.05
 
 class AdvancedStrategy:
-    def __init__(self):
-        self.explored_hexes = set()
+    def __init__(self, world: Optional[WorldStore] = None):
+        self.world = world if world is not None else WorldStore()  # Вся увиденная карта
         self.enemy_positions = {}
         self.resource_memory = {}
         self.turn_count = 0
         self.threat_assessment = defaultdict(int)
+        self.enemy_anthills = set()  # Гексы чужих муравейников, которые видели
+        self.threat_field = None  # Тепловая карта угрозы последнего снимка
         
-    def update_memory(self, arena_data):
+    def update_memory(self, arena_data, columns: Optional[ArenaColumns] = None):
         """Обновляем память о карте, врагах и ресурсах"""
         self.turn_count += 1
         
-        # Запоминаем исследованные гексы
-        for hex_info in arena_data.get('map', []):
-            self.explored_hexes.add((hex_info['q'], hex_info['r']))
+        # Записываем увиденные гексы в чанки мира (по столбцам, если они уже разобраны)
+        if columns is not None:
+            self.world.update_columns(columns.map_keys, columns.map_type, columns.map_cost, self.turn_count)
+        else:
+            self.world.update(arena_data.get('map', []), self.turn_count)
+        
+        # Чужие муравейники не двигаются: запоминаем их для зон угрозы
+        if columns is not None:
+            anthills = set(columns.map_keys[columns.map_type == HEX_ANTHILL].tolist())
+        else:
+            anthills = {pack_dict(h) for h in arena_data.get('map', []) if h['type'] == HEX_ANTHILL}
+        self.enemy_anthills |= anthills - {pack_dict(h) for h in arena_data.get('home', [])}
             
         # Обновляем информацию о врагах
         for enemy in arena_data.get('enemies', []):
-            pos = (enemy['q'], enemy['r'])
+            pos = pack_dict(enemy)
             self.enemy_positions[pos] = {
                 'type': enemy['type'],
                 'health': enemy['health'],
@@ -72,61 +104,60 @@ class AdvancedStrategy:
             
         # Запоминаем ресурсы
         for food in arena_data.get('food', []):
-            pos = (food['q'], food['r'])
+            pos = pack_dict(food)
             self.resource_memory[pos] = {
                 'type': food['type'],
                 'amount': food['amount'],
                 'turn': self.turn_count
             }
             
-    def hex_distance(self, pos1: Tuple[int, int], pos2: Tuple[int, int]) -> int:
-        """Вычисление расстояния между гексами"""
-        q1, r1 = pos1
-        q2, r2 = pos2
-        return (abs(q1 - q2) + abs(q1 + r1 - q2 - r2) + abs(r1 - r2)) // 2
+    hex_distance = staticmethod(key_distance)
+    
+    def move_priority(self, ant: Dict) -> int:
+        """Очередь постановки пути в таблицу резервирований (больше - раньше)"""
+        if ant.get('food', {}).get('amount', 0) > 0:
+            return 100  # Доставка ресурсов
+        return {ROLE_WORKER: 60, ROLE_FIGHTER: 50, ROLE_SCOUT: 40}.get(ant['type'], 0)
+        
+    def threat_map(self, arena_data) -> ThreatField:
+        """Тепловая карта угрозы снимка (строится один раз на ответ /arena)"""
+        if self.threat_field is None or not self.threat_field.is_for(arena_data):
+            self.threat_field = ThreatField(arena_data, THREAT_KERNELS, self.enemy_anthills)
+        return self.threat_field
+        
+    def threat_levels(self, positions: np.ndarray, arena_data) -> np.ndarray:
+        """Уровень угрозы для набора позиций (n, 2) по тепловой карте хода"""
+        return self.threat_map(arena_data).levels(pack_array(positions))
         
     def assess_threat_level(self, pos, arena_data):
         """Оценка уровня угрозы для позиции"""
-        threat = 0
-        enemies = arena_data.get('enemies', [])
-        
-        for enemy in enemies:
-            enemy_pos = (enemy['q'], enemy['r'])
-            distance = self.hex_distance(pos, enemy_pos)
-            
-            if enemy['type'] == ROLE_FIGHTER and distance <= 2:
-                threat += 70 / (distance + 1)
-            elif enemy['type'] == ROLE_SCOUT and distance <= 4:
-                threat += 20 / (distance + 1)
-            elif enemy['type'] == ROLE_WORKER and distance <= 1:
-                threat += 30 / (distance + 1)
-                
-        return threat
+        return self.threat_map(arena_data).at(pack(*pos))
         
     def find_safe_exploration_targets(self, ant, arena_data):
-        """Находим безопасные цели для исследования"""
-        ant_pos = (ant['q'], ant['r'])
-        candidates = []
-        
-        # Генерируем потенциальные цели в радиусе движения
-        for radius in range(1, ant['type'] == ROLE_SCOUT and 8 or 6):
-            for q in range(-radius, radius + 1):
-                for r in range(-radius, radius + 1):
-                    if abs(q + r) <= radius:
-                        target = (ant_pos[0] + q, ant_pos[1] + r)
-                        if target not in self.explored_hexes:
-                            threat = self.assess_threat_level(target, arena_data)
-                            distance = self.hex_distance(ant_pos, target)
-                            score = radius * 10 - threat - distance
-                            candidates.append((target, score))
-                            
-        candidates.sort(key=lambda x: x[1], reverse=True)
-        return candidates[:5] if candidates else []
+        """Находим безопасные цели для исследования: ближайшие гексы границы исследованного"""
+        max_radius = 7 if ant['type'] == ROLE_SCOUT else 5
+        
+        # Граница ведется в графе при каждом обновлении памяти: здесь только обход спирали
+        near = self.world.graph.frontier_near(pack_dict(ant), max_radius)
+        if not near:
+            return []
+        keys = [key for key, _ in near]
+        distance = np.array([ring for _, ring in near])
+        
+        threat = self.threat_map(arena_data).levels(keys)
+        scores = max_radius * 10 - threat - distance
+        
+        best = np.argsort(-scores, kind='stable')[:5]
+        return [(keys[i], float(scores[i])) for i in best]
 
 class APIclient:
-    def __init__(self, use_test_server=True):
+    def __init__(self, use_test_server=True, session: Optional[requests.Session] = None,
+                 timeout: Timeout = HTTP_TIMEOUT):
         self.token = TOKEN
         self.headers = HEADERS
+        # Keep-alive сессия: можно передать общую для нескольких клиентов
+        self.session = session if session is not None else make_session(HEADERS)
+        self.timeout = timeout
         
         # Выбираем сервер
         if use_test_server:
@@ -136,37 +167,114 @@ class APIclient:
             self.base_url = BASE_URL_PROD
             print("⚔️ Используется БОЕВОЙ сервер")
             
-        self.strategy = AdvancedStrategy()
-        self.request_count = 0  # Для отслеживания лимита 3 RPS
-        self.last_request_time = 0
-        
-    def _rate_limit_check(self):
-        """Проверка лимита запросов (3 RPS)"""
-        import time
-        current_time = time.time()
-        if current_time - self.last_request_time < 0.34:  # ~1/3 секунды между запросами
-            time.sleep(0.34 - (current_time - self.last_request_time))
-        self.last_request_time = time.time()
+        self.world = WorldStore()  # Общая память о карте для стратегии и поиска пути
+        self.strategy = AdvancedStrategy(self.world)
+        self.rate_limiter = shared_limiter(TOKEN)  # Лимит 3 RPS, общий для всех процессов токена
+        self.request_started = 0.0  # Когда ушел последний запрос (после ожидания токена)
+        self.arena_index = None  # Индекс последнего ответа /arena
+        self.arena_columns = None  # Тот же ответ в столбцах NumPy
+        self.arena_payload = PayloadStats()  # Размер ответов /arena и время разбора
+        self.arena_turn = None  # turnNo последнего учтенного снимка арены
+        self.planned_turn = None  # turnNo, для которого команды уже отправлены
+        self.turn_clock = TurnClock()  # Граница хода сервера по turnNo, nextTurnIn и RTT
+        self.home_fields = FieldCache()  # Поле расстояний до муравейника
+        self.incremental = IncrementalPlanner(self.world.weights)  # Состояния D* Lite по муравьям
+        self.hierarchy = HierarchicalPlanner(self.world.weights)  # Кластеры для дальних путей
+        self.last_paths: Dict[str, List[HexKey]] = {}  # Полные пути прошлого хода для базового плана
+        self.food_assigner = FoodAssigner()  # Цены мест у ресурсов живут между ходами
+        self.food_plan = None  # ID рабочего -> (ресурс, путь) на этот ход; None - выбирает каждый сам
+        
+    def _request(self, method: str, endpoint: str, priority: int, deadline: Optional[float] = None,
+                 idempotent: bool = True, **kwargs) -> requests.Response:
+        """Запрос к API через keep-alive сессию клиента в пределах общего лимита запросов
+        
+        deadline (time.monotonic) ограничивает и ожидание токена, и сам запрос
+        с повторами; без него запрос ограничен обычными таймаутами.
+        """
+        if deadline is None:
+            self.rate_limiter.acquire(priority)
+            deadline = time.monotonic() + sum(self.timeout)
+        else:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"{method} /{endpoint}: дедлайн истек до отправки")
+            self.rate_limiter.acquire(priority, timeout=remaining)
+        self.request_started = time.monotonic()
+        response = request_with_deadline(self.session, method, f"{self.base_url}/{endpoint}", deadline,
+                                         timeout=self.timeout, idempotent=idempotent,
+                                         headers=self.headers, **kwargs)
+        response.raise_for_status()
+        return response
         
     def get_arena(self):
         """Получение текущего состояния арены"""
-        self._rate_limit_check()
         try:
-            response = requests.get(f"{self.base_url}/arena", headers=self.headers)
-            response.raise_for_status()
-            data = response.json()
-            self.strategy.update_memory(data)
+            # Снимок, пришедший позже дедлайна отправки команд, уже бесполезен
+            response = self._request('GET', 'arena', PRIORITY_ARENA, self.turn_clock.fetch_deadline())
+            received_at = time.monotonic()
+            body = response.content
+            data = decode_json(body)
+            columns = ArenaColumns(data)
+            self.arena_payload.add(wire_size(response), len(body), time.monotonic() - received_at)
+            self.turn_clock.observe(data, self.request_started, received_at)
+            if self.remember_arena(data, columns):
+                print(f"📦 /arena: {self.arena_payload.last()}")
             return data
-        except requests.RequestException as e:
+        except (requests.RequestException, ValueError) as e:
+            # ValueError - битое или обрезанное тело ответа (decode_json)
             print(f"Ошибка при получении данных арены: {e}")
             return None
 
+    def remember_arena(self, data: Dict, columns: Optional[ArenaColumns] = None) -> bool:
+        """Снимок /arena в память клиента: индекс хода, карта и кэши поиска пути
+
+        Память обновляется один раз на ход: для повторного снимка того же
+        turnNo обновляется только индекс. True - снимок нового хода.
+        """
+        self.arena_columns = columns if columns is not None else ArenaColumns(data)
+        self.arena_index = ArenaIndex(data, self.arena_columns)
+        turn_no = data.get('turnNo')
+        if turn_no is not None and turn_no == self.arena_turn:
+            return False
+        self.arena_turn = turn_no
+        self.strategy.update_memory(data, self.arena_columns)
+        # Чиним сохраненные пути и кластеры только по изменившимся гексам
+        changed = self.world.changed
+        self.incremental.notify_changed(changed)
+        self.hierarchy.mark_changed(changed)
+        self.incremental.forget(self.arena_index.ants_by_id)
+        return True
+
+    def get_index(self, arena_data: Dict) -> ArenaIndex:
+        """Индекс хода для arena_data (строится один раз на ответ /arena)"""
+        if self.arena_index is None or not self.arena_index.is_for(arena_data):
+            columns = self.arena_columns
+            if columns is not None and not columns.is_for(arena_data):
+                columns = None
+            self.arena_index = ArenaIndex(arena_data, columns)
+        return self.arena_index
+
+    def already_planned(self, arena_data: Dict) -> bool:
+        """Для хода этого снимка команды уже отправлены (тот же turnNo пришел повторно)"""
+        turn_no = arena_data.get('turnNo')
+        return turn_no is not None and turn_no == self.planned_turn
+
     def send_move(self, moves):
         """Отправка команд движения"""
-        self._rate_limit_check()
+        deadline = self.turn_clock.deadline()
+        if deadline is not None and time.monotonic() > deadline:
+            # Опоздавшие команды ушли бы в следующий ход по устаревшим позициям
+            print("⏰ Дедлайн хода прошел: команды не отправлены")
+            self.turn_clock.record_drop()
+            return None
         try:
-            response = requests.post(f"{self.base_url}/move", headers=self.headers, json={"moves": moves})
-            response.raise_for_status()
+            # Словари координат собираем только здесь, внутри пути - упакованные ключи
+            payload = [{"ant": move["ant"], "path": [key_to_dict(key) for key in move["path"]]}
+                       for move in moves]
+            # Ответ должен прийти до конца хода; повторная отправка - только при обрыве соединения
+            response = self._request('POST', 'move', PRIORITY_MOVE, self.turn_clock.boundary,
+                                     idempotent=False, json={"moves": payload})
+            self.turn_clock.record_send(self.request_started, time.monotonic())
             return response.json()
         except requests.RequestException as e:
             print(f"Ошибка при отправке команд: {e}")
@@ -174,10 +282,8 @@ class APIclient:
             
     def register_for_round(self):
         """Регистрация на раунд"""
-        self._rate_limit_check()
         try:
-            response = requests.post(f"{self.base_url}/register", headers=self.headers, json=data)
-            response.raise_for_status()
+            response = self._request('POST', 'register', PRIORITY_ARENA, json=data)
             return response.json()
         except requests.RequestException as e:
             print(f"Ошибка при регистрации: {e}")
@@ -185,10 +291,8 @@ class APIclient:
     
     def get_logs(self):
         """Получение журнала действий"""
-        self._rate_limit_check()
         try:
-            response = requests.get(f"{self.base_url}/logs", headers=self.headers)
-            response.raise_for_status()
+            response = self._request('GET', 'logs', PRIORITY_BACKGROUND)
             return response.json()
         except requests.RequestException as e:
             print(f"Ошибка при получении логов: {e}")
@@ -196,47 +300,37 @@ class APIclient:
     
     def get_rounds_info(self):
         """Получение информации о раундах"""
-        self._rate_limit_check()
         try:
-            response = requests.get(f"{self.base_url}/rounds", headers=self.headers)
-            response.raise_for_status()
+            response = self._request('GET', 'rounds', PRIORITY_BACKGROUND)
             return response.json()
         except requests.RequestException as e:
             print(f"Ошибка при получении информации о раундах: {e}")
             return None
 
-    def validate_move_path(self, ant: Dict, path: List[Dict], arena_data: Dict) -> List[Dict]:
+    def validate_move_path(self, ant: Dict, path: List[HexKey], arena_data: Dict) -> List[HexKey]:
         """Валидация пути движения согласно правилам игры"""
         if not path or len(path) < 2:
             return path
             
         ant_type = ant['type']
-        max_movement_points = {ROLE_WORKER: 5, ROLE_FIGHTER: 4, ROLE_SCOUT: 7}.get(ant_type, 5)
+        max_movement_points = MOVEMENT_POINTS.get(ant_type, 5)
         
         validated_path = [path[0]]  # Стартовая позиция
         movement_spent = 0
-        
-        # Создаем карту стоимости движения
-        hex_costs = {}
-        for hex_info in arena_data.get('map', []):
-            pos = (hex_info['q'], hex_info['r'])
-            cost = hex_info.get('cost', 1)
-            if hex_info['type'] == HEX_STONE:
-                cost = float('inf')  # Непроходимый
-            hex_costs[pos] = cost
+        index = self.get_index(arena_data)
         
         # Проверяем каждый шаг пути
         for i in range(1, len(path)):
-            current_pos = (path[i-1]['q'], path[i-1]['r'])
-            next_pos = (path[i]['q'], path[i]['r'])
+            current_pos = path[i-1]
+            next_pos = path[i]
             
             # Проверяем, что гексы соседние
-            if next_pos not in self.get_neighbors(*current_pos):
+            if next_pos - current_pos not in NEIGHBOR_DELTAS:
                 print(f"Предупреждение: несоседние гексы в пути муравья {ant['id']}")
                 break
                 
             # Проверяем стоимость движения
-            move_cost = hex_costs.get(next_pos, 1)
+            move_cost = index.move_cost(next_pos)
             if move_cost == float('inf'):
                 print(f"Предупреждение: попытка пройти через непроходимый гекс")
                 break
@@ -251,130 +345,108 @@ class APIclient:
         return validated_path
     
     def check_collision_avoidance(self, moves: List[Dict], arena_data: Dict) -> List[Dict]:
-        """Проверка и предотвращение коллизий между нашими муравьями"""
-        our_ants = {ant['id']: ant for ant in arena_data.get('ants', [])}
-        final_positions = {}
-        
-        # Вычисляем финальные позиции каждого муравья
-        for move in moves:
-            ant_id = move['ant']
-            ant = our_ants.get(ant_id)
-            if not ant:
-                continue
-                
-            if move['path']:
-                final_pos = (move['path'][-1]['q'], move['path'][-1]['r'])
-            else:
-                final_pos = (ant['q'], ant['r'])
-                
-            final_positions[ant_id] = final_pos
-        
-        # Проверяем конфликты (муравьи одного типа не могут быть на одном гексе)
-        type_positions = defaultdict(list)
-        for ant_id, pos in final_positions.items():
-            ant = our_ants.get(ant_id)
-            if ant:
-                type_positions[ant['type']].append((ant_id, pos))
-        
-        # Устраняем конфликты
-        cleaned_moves = []
-        for move in moves:
-            ant_id = move['ant']
-            ant = our_ants.get(ant_id)
-            if not ant:
-                continue
-                
-            # Проверяем, есть ли конфликт с другими муравьями того же типа
-            final_pos = final_positions[ant_id]
-            same_type_ants = type_positions[ant['type']]
-            
-            conflict = False
-            for other_ant_id, other_pos in same_type_ants:
-                if other_ant_id != ant_id and other_pos == final_pos:
-                    conflict = True
-                    break
-            
-            if not conflict:
-                cleaned_moves.append(move)
-            else:
-                print(f"Предупреждение: конфликт позиций для муравья {ant_id}, команда отменена")
-                
-        return cleaned_moves
-
-    @staticmethod
-    def hex_distance(pos1: Tuple[int, int], pos2: Tuple[int, int]) -> int:
-        """Вычисление расстояния между гексами"""
-        q1, r1 = pos1
-        q2, r2 = pos2
-        return (abs(q1 - q2) + abs(q1 + r1 - q2 - r2) + abs(r1 - r2)) // 2
-
-    @staticmethod
-    def get_neighbors(q: int, r: int) -> List[Tuple[int, int]]:
-        """Получение соседних гексов"""
-        directions = [(+1, 0), (+1, -1), (0, -1), (-1, 0), (-1, +1), (0, +1)]
-        return [(q + dq, r + dr) for dq, dr in directions]
-
-    def find_path_astar(self, start: Tuple[int, int], goal: Tuple[int, int], 
-                       arena_data: Dict, max_cost: int = 20) -> List[Dict]:
-        """A* алгоритм для поиска оптимального пути"""
-        from heapq import heappush, heappop
-        
-        open_set = [(0, start, [])]
-        closed_set = set()
-        
-        # Создаем карту стоимости гексов
-        hex_costs = {}
-        for hex_info in arena_data.get('map', []):
-            pos = (hex_info['q'], hex_info['r'])
-            if hex_info['type'] == HEX_STONE:
-                continue  # Непроходимый
-            elif hex_info['type'] == HEX_ACID:
-                hex_costs[pos] = 3  # Избегаем кислоту
-            elif hex_info['type'] == HEX_DIRT:
-                hex_costs[pos] = 2
-            else:
-                hex_costs[pos] = 1
-                
-        while open_set:
-            f_cost, current, path = heappop(open_set)
-            
-            if current == goal:
-                return [{'q': q, 'r': r} for q, r in [start] + path]
-                
-            if current in closed_set:
-                continue
-                
-            closed_set.add(current)
-            
-            for neighbor in self.get_neighbors(*current):
-                if neighbor in closed_set:
-                    continue
-                    
-                move_cost = hex_costs.get(neighbor, 1)
-                if move_cost > max_cost:
-                    continue
-                    
-                new_path = path + [neighbor]
-                g_cost = len(new_path)
-                h_cost = self.hex_distance(neighbor, goal)
-                f_cost = g_cost + h_cost
-                
-                heappush(open_set, (f_cost, neighbor, new_path))
-                
-        return [{'q': start[0], 'r': start[1]}]  # Остаемся на месте
+        """Согласование путей наших муравьев (гекс, шаг) с учетом врагов"""
+        return resolve_moves(moves, self.get_index(arena_data), self.strategy.move_priority)
 
-    def get_optimal_resource_target(self, ant: Dict, visible_food: List[Dict], 
-                                   home_coords: List[Dict]) -> Optional[Tuple[int, int]]:
-        """Выбор оптимального ресурса для сбора"""
+    hex_distance = staticmethod(key_distance)
+    get_neighbors = staticmethod(neighbor_keys)
+
+    def path_cost_fn(self, arena_data: Dict):
+        """Функция стоимости гекса для поиска пути (None - непроходимый)"""
+        return self.world.cost_of
+
+    def home_field(self, arena_data: Dict) -> DistanceField:
+        """Поле расстояний до муравейника (одно на все муравьи, кэшируется между ходами)"""
+        index = self.get_index(arena_data)
+        return self.home_fields.get(index.home, self.world, self.world.cost_of)
+
+    def path_to_home(self, ant_pos: HexKey, arena_data: Dict,
+                     max_steps: int = HOME_PATH_STEPS) -> List[HexKey]:
+        """Путь к ближайшему гексу муравейника по полю расстояний"""
+        field = self.home_field(arena_data)
+        if field.distance(ant_pos) is None:
+            # Гекс вне поля - ищем путь обычным A*
+            home = self.get_index(arena_data).home
+            if not home:
+                return [ant_pos]
+            target = min(home, key=lambda h: self.hex_distance(ant_pos, h))
+            return self.find_path_astar(ant_pos, target, arena_data)
+        return field.path_from(ant_pos, max_steps)
+
+    def find_path_astar(self, start: HexKey, goal: HexKey, 
+                       arena_data: Dict, max_cost: int = 20,
+                       max_nodes: int = PATH_MAX_NODES,
+                       time_budget: float = PATH_TIME_BUDGET,
+                       avoid_threat: bool = False) -> List[HexKey]:
+        """A* алгоритм для поиска оптимального пути
+        
+        max_cost ограничивает суммарную стоимость пути; если цель недостижима
+        в пределах ограничений, возвращается частичный путь в ее сторону.
+        avoid_threat - гексы под угрозой дороже (по тепловой карте хода).
+        """
+        if avoid_threat:
+            cost_of = self.strategy.threat_map(arena_data).cost_overlay(self.path_cost_fn(arena_data))
+            return find_path(start, goal, cost_of, max_cost=max_cost, max_nodes=max_nodes,
+                             time_budget=time_budget, max_step_cost=PATH_MAX_STEP_COST + THREAT_MAX_EXTRA)
+        # Сначала скомпилированный граф известной карты. Он не знает невидимых
+        # гексов: если цели в графе нет или путь до нее не дошел (например,
+        # мешает полоса невидимых гексов) - поиск по ключам, где невидимые стоят 1
+        path = find_path_graph(self.world.graph, start, goal, max_cost=max_cost,
+                               max_nodes=max_nodes, time_budget=time_budget)
+        if path is None or path[-1] != goal:
+            by_keys = find_path(start, goal, self.path_cost_fn(arena_data), max_cost=max_cost,
+                                max_nodes=max_nodes, time_budget=time_budget)
+            if path is None or by_keys[-1] == goal:
+                path = by_keys
+        return path
+
+    def search_food(self, ant: Dict, visible_food: List[Dict], arena_data: Dict,
+                    horizon_turns: int = FOOD_SEARCH_TURNS):
+        """Один поиск Дейкстры от муравья до всех видимых ресурсов
+        
+        Возвращает (реальная стоимость пути до каждого достижимого ресурса,
+        родители для восстановления пути). Поиск ограничен горизонтом
+        в horizon_turns ходов движения муравья.
+        """
+        ant_pos = pack_dict(ant)
+        horizon = MOVEMENT_POINTS.get(ant['type'], 5) * horizon_turns
+        food_positions = [pack_dict(food) for food in visible_food]
+        search = dijkstra_graph(self.world.graph, ant_pos, horizon, targets=food_positions)
+        if search is None:
+            search = dijkstra(ant_pos, self.path_cost_fn(arena_data), horizon, targets=food_positions)
+        dist, parents = search
+        travel_costs = {pos: dist[pos] for pos in food_positions if pos in dist}
+        return travel_costs, parents
+
+    def choose_resource_target(self, ant: Dict, visible_food: List[Dict], home_coords: List[Dict],
+                               arena_data: Dict) -> Optional[Tuple[HexKey, List[HexKey]]]:
+        """Выбор оптимального ресурса и путь к нему по одному поиску"""
+        if not visible_food:
+            return None
+        
+        # Дальше горизонта поиска по прямой ресурс недостижим: такие не ищем
+        horizon = MOVEMENT_POINTS.get(ant['type'], 5) * FOOD_SEARCH_TURNS
+        in_reach = {id(food) for _, food in self.get_index(arena_data).food_grid.within(pack_dict(ant), horizon)}
+        visible_food = [food for food in visible_food if id(food) in in_reach]
         if not visible_food:
             return None
             
-        ant_pos = (ant['q'], ant['r'])
+        travel_costs, parents = self.search_food(ant, visible_food, arena_data)
+        home_field = self.home_field(arena_data)
+        threat = self.strategy.threat_map(arena_data)
         scored_resources = []
         
-        for food in visible_food:
-            food_pos = (food['q'], food['r'])
-            distance = self.hex_distance(ant_pos, food_pos)
+        # Прямое расстояние до дома для ресурсов вне поля - одной матрицей ресурсы x дом
+        if home_coords:
+            straight_home = distance_matrix(coords_array(visible_food), coords_array(home_coords)).min(axis=1)
+        else:
+            straight_home = np.zeros(len(visible_food), dtype=np.int64)
+        
+        for i, food in enumerate(visible_food):
+            food_pos = pack_dict(food)
+            travel_cost = travel_costs.get(food_pos)
+            if travel_cost is None:
+                continue  # Недостижим в пределах горизонта (стены, камни)
             
             # Оценка ценности ресурса
             value_multiplier = {
@@ -384,47 +456,87 @@ class APIclient:
             }.get(food['type'], 1)
             
             # Учитываем расстояние до дома
-            home_distance = min(self.hex_distance(food_pos, (h['q'], h['r'])) 
-                               for h in home_coords)
+            home_distance = home_field.distance(food_pos)
+            if home_distance is None:
+                home_distance = int(straight_home[i])
             
-            score = (food['amount'] * value_multiplier) / (distance + 1) - home_distance * 0.1
+            score = (food['amount'] * value_multiplier) / (travel_cost + 1) - home_distance * 0.1
+            score -= threat.at(food_pos) * THREAT_FOOD_PENALTY
             scored_resources.append((food_pos, score))
             
-        scored_resources.sort(key=lambda x: x[1], reverse=True)
-        return scored_resources[0][0] if scored_resources else None
+        if not scored_resources:
+            return None
+        target_pos = max(scored_resources, key=lambda x: x[1])[0]
+        return target_pos, reconstruct_path(parents, target_pos)
+
+    def find_path_incremental(self, ant: Dict, goal: HexKey, arena_data: Dict,
+                              max_steps: int = HOME_PATH_STEPS) -> List[HexKey]:
+        """Путь к цели, которая сохраняется между ходами (D* Lite)
+        
+        Состояние поиска муравья живет между ходами и чинится только по
+        изменившимся гексам; если цель недостижима - обычный A*.
+        """
+        ant_pos = pack_dict(ant)
+        path = self.incremental.plan(ant['id'], ant_pos, goal, max_steps)
+        if path is None:
+            return self.find_path_astar(ant_pos, goal, arena_data)
+        return path
+
+    def find_path_long(self, start: HexKey, goal: HexKey, arena_data: Dict,
+                       max_steps: int = HOME_PATH_STEPS) -> List[HexKey]:
+        """Путь к дальней цели: маршрут по кластерам, точно только первые шаги"""
+        if self.hex_distance(start, goal) < LONG_PATH_DISTANCE:
+            return self.find_path_astar(start, goal, arena_data)
+        path = self.hierarchy.plan(start, goal, max_steps)
+        if path is None:
+            return self.find_path_astar(start, goal, arena_data)
+        return path[:max_steps + 1]
+
+    def assign_food(self, ants: List[Dict], visible_food: List[Dict], arena_data: Dict):
+        """Цели всех свободных рабочих одним назначением (см. assignment.py)"""
+        index = self.get_index(arena_data)
+        workers = [ant for ant in ants if ant['type'] == ROLE_WORKER
+                   and not ant.get('food', {}).get('amount', 0) and pack_dict(ant) != index.spot]
+        self.food_plan = plan_food(self.food_assigner, workers, visible_food, self.world.graph,
+                                   self.path_cost_fn(arena_data), index.home, self.home_field(arena_data),
+                                   self.strategy.threat_map(arena_data), FOOD_SEARCH_TURNS)
+
+    def get_optimal_resource_target(self, ant: Dict, visible_food: List[Dict], 
+                                   home_coords: List[Dict], arena_data: Dict) -> Optional[HexKey]:
+        """Выбор оптимального ресурса для сбора"""
+        choice = self.choose_resource_target(ant, visible_food, home_coords, arena_data)
+        return choice[0] if choice else None
 
     def plan_worker_move(self, ant: Dict, visible_food: List[Dict], 
-                        home_coords: List[Dict], arena_data: Dict) -> List[Dict]:
+                        home_coords: List[Dict], arena_data: Dict) -> List[HexKey]:
         """Планирование движения рабочего с улучшенной логикой"""
-        ant_pos = (ant['q'], ant['r'])
-        spot = arena_data.get('spot', {})
-        main_hex = (spot.get('q', 0), spot.get('r', 0))
+        ant_pos = pack_dict(ant)
+        main_hex = self.get_index(arena_data).spot
         
         # ВАЖНО: Освобождаем основной гекс для создания новых муравьев
         if ant_pos == main_hex:
             # Ищем ближайший свободный гекс рядом с муравейником
             for home in home_coords:
-                home_pos = (home['q'], home['r'])
+                home_pos = pack_dict(home)
                 if home_pos != main_hex:
                     return self.find_path_astar(ant_pos, home_pos, arena_data)
             
             # Если все гексы муравейника заняты, отходим на 1 гекс
-            neighbors = self.get_neighbors(*ant_pos)
+            neighbors = self.get_neighbors(ant_pos)
             if neighbors:
                 return self.find_path_astar(ant_pos, neighbors[0], arena_data)
         
-        # Если несем ресурсы, идем домой
+        # Если несем ресурсы, идем домой по общему полю расстояний
         if ant.get('food') and ant['food'].get('amount', 0) > 0:
-            # Выбираем ближайший гекс муравейника
-            closest_home = min(home_coords, 
-                             key=lambda h: self.hex_distance(ant_pos, (h['q'], h['r'])))
-            target = (closest_home['q'], closest_home['r'])
-            return self.find_path_astar(ant_pos, target, arena_data)
+            return self.path_to_home(ant_pos, arena_data)
             
-        # Ищем оптимальный ресурс
-        target_pos = self.get_optimal_resource_target(ant, visible_food, home_coords)
-        if target_pos:
-            return self.find_path_astar(ant_pos, target_pos, arena_data)
+        # Цель из общего назначения хода; без него - оптимальный ресурс для одного муравья
+        if self.food_plan is None:
+            choice = self.choose_resource_target(ant, visible_food, home_coords, arena_data)
+        else:
+            choice = self.food_plan.get(ant['id'])
+        if choice:
+            return choice[1]
             
         # Исследуем территорию рядом с домом
         home_center = home_coords[0] if home_coords else {'q': 0, 'r': 0}
@@ -433,13 +545,13 @@ class APIclient:
         if exploration_targets:
             # Фильтруем цели рядом с домом
             nearby_targets = [target for target, score in exploration_targets 
-                            if self.hex_distance(target, (home_center['q'], home_center['r'])) <= 8]
+                            if self.hex_distance(target, pack_dict(home_center)) <= 8]
             if nearby_targets:
-                return self.find_path_astar(ant_pos, nearby_targets[0], arena_data)
+                return self.find_path_astar(ant_pos, nearby_targets[0], arena_data, avoid_threat=True)
                 
-        return [{'q': ant['q'], 'r': ant['r']}]
+        return [ant_pos]
 
-    def calculate_combat_effectiveness(self, attacker: Dict, target_pos: Tuple[int, int], 
+    def calculate_combat_effectiveness(self, attacker: Dict, target_pos: HexKey, 
                                      arena_data: Dict, our_ants: List[Dict]) -> float:
         """Расчет эффективности атаки с учетом бонусов"""
         base_damage = {ROLE_WORKER: 30, ROLE_FIGHTER: 70, ROLE_SCOUT: 20}.get(attacker['type'], 30)
@@ -448,28 +560,19 @@ class APIclient:
         # Базовый урон
         damage = base_damage
         
-        # Бонус поддержки (50% если рядом союзник)
+        # Бонус поддержки (50% если рядом союзник): соседей берем из пространственного хеша
         support_bonus = 0
-        for ally in our_ants:
-            if ally['id'] == attacker['id']:
-                continue
-            ally_pos = (ally['q'], ally['r'])
-            
-            # Проверяем, что союзник рядом с атакующим И целью
-            if (self.hex_distance(ally_pos, attacker_pos) <= 1 and 
-                self.hex_distance(ally_pos, target_pos) <= 1 and
-                ally_pos != attacker_pos):  # Не на одном гексе
-                support_bonus = 0.5
-                break
+        neighbors = self.get_index(arena_data).ant_grid.within(pack_dict(attacker), 1)
+        # Союзник рядом с атакующим И целью, но не на одном гексе с атакующим
+        if any(distance == 1 and self.hex_distance(pack_dict(ally), target_pos) <= 1
+               for distance, ally in neighbors):
+            support_bonus = 0.5
         
         # Бонус муравейника (25% если в радиусе 2 от дома)
         anthill_bonus = 0
         home_coords = arena_data.get('home', [])
-        for home in home_coords:
-            home_pos = (home['q'], home['r'])
-            if self.hex_distance(attacker_pos, home_pos) <= 2:
-                anthill_bonus = 0.25
-                break
+        if home_coords and np.any(distances_from(attacker_pos, coords_array(home_coords)) <= 2):
+            anthill_bonus = 0.25
         
         # Применяем бонусы
         total_multiplier = 1.0 + support_bonus + anthill_bonus
@@ -477,18 +580,11 @@ class APIclient:
         
         return final_damage
         
-    def should_attack_position(self, attacker: Dict, target_pos: Tuple[int, int], 
+    def should_attack_position(self, attacker: Dict, target_pos: HexKey, 
                               arena_data: Dict, our_ants: List[Dict]) -> bool:
         """Определяет, стоит ли атаковать данную позицию"""
         # Проверяем, есть ли враг на этой позиции
-        enemies = arena_data.get('enemies', [])
-        target_enemy = None
-        
-        for enemy in enemies:
-            if (enemy['q'], enemy['r']) == target_pos:
-                target_enemy = enemy
-                break
-                
+        target_enemy = self.get_index(arena_data).enemy_at(target_pos)
         if not target_enemy:
             return False
             
@@ -509,17 +605,16 @@ class APIclient:
         return turns_to_kill_enemy <= turns_to_kill_us or our_damage > enemy_health
 
     def plan_fighter_move(self, ant: Dict, visible_enemies: List[Dict], 
-                         arena_data: Dict, our_ants: List[Dict]) -> List[Dict]:
+                         arena_data: Dict, our_ants: List[Dict]) -> List[HexKey]:
         """Планирование движения бойца с тактикой"""
-        ant_pos = (ant['q'], ant['r'])
-        spot = arena_data.get('spot', {})
-        main_hex = (spot.get('q', 0), spot.get('r', 0))
+        ant_pos = pack_dict(ant)
+        main_hex = self.get_index(arena_data).spot
         home_coords = arena_data.get('home', [])
         
         # ВАЖНО: Освобождаем основной гекс для создания новых муравьев
         if ant_pos == main_hex:
             # Отходим на ближайший гекс для патрулирования
-            neighbors = self.get_neighbors(*ant_pos)
+            neighbors = self.get_neighbors(ant_pos)
             if neighbors:
                 return self.find_path_astar(ant_pos, neighbors[0], arena_data)
         
@@ -528,53 +623,50 @@ class APIclient:
             patrol_targets = self.strategy.find_safe_exploration_targets(ant, arena_data)
             if patrol_targets:
                 return self.find_path_astar(ant_pos, patrol_targets[0][0], arena_data)
-            return [{'q': ant['q'], 'r': ant['r']}]
-            
-        # Приоритезируем цели
-        priority_targets = []
-        for enemy in visible_enemies:
-            enemy_pos = (enemy['q'], enemy['r'])
-            distance = self.hex_distance(ant_pos, enemy_pos)
-            
-            # Приоритет: рабочие > разведчики > бойцы
-            priority = {ROLE_WORKER: 3, ROLE_SCOUT: 2, ROLE_FIGHTER: 1}.get(enemy['type'], 1)
-            
-            # Учитываем здоровье врага
-            health_factor = 200 / (enemy['health'] + 1)
+            return [ant_pos]
             
-            # Проверяем поддержку союзников
-            support = sum(1 for ally in our_ants 
-                         if ally['type'] == ROLE_FIGHTER and 
-                         self.hex_distance((ally['q'], ally['r']), enemy_pos) <= 2)
-            
-            score = priority * health_factor + support * 0.5 - distance * 0.1
-            priority_targets.append((enemy_pos, score))
-            
-        priority_targets.sort(key=lambda x: x[1], reverse=True)
-        target_pos = priority_targets[0][0]
+        # Приоритезируем цели (все враги сразу, матрицы бойцы x враги)
+        enemy_coords = coords_array(visible_enemies)
+        distance = distances_from(unpack(ant_pos), enemy_coords)
+        
+        # Приоритет: рабочие > разведчики > бойцы
+        priority = np.array([{ROLE_WORKER: 3, ROLE_SCOUT: 2, ROLE_FIGHTER: 1}.get(enemy['type'], 1)
+                             for enemy in visible_enemies])
+        
+        # Учитываем здоровье врага
+        health_factor = 200 / (np.array([enemy['health'] for enemy in visible_enemies]) + 1)
+        
+        # Проверяем поддержку союзников: бойцы в радиусе 2 от каждого врага
+        ant_grid = self.get_index(arena_data).ant_grid
+        support = np.array([ant_grid.count_within(pack_dict(enemy), 2,
+                                                  where=lambda ally: ally['type'] == ROLE_FIGHTER)
+                            for enemy in visible_enemies])
+        
+        scores = priority * health_factor + support * 0.5 - distance * 0.1
+        best = int(np.argmax(scores))
+        target_pos = pack(int(enemy_coords[best, 0]), int(enemy_coords[best, 1]))
         
         # Пытаемся окружить цель
-        neighbors = self.get_neighbors(*target_pos)
+        neighbors = self.get_neighbors(target_pos)
         best_attack_pos = min(neighbors, 
                              key=lambda pos: self.hex_distance(ant_pos, pos))
         
         return self.find_path_astar(ant_pos, best_attack_pos, arena_data)
 
-    def plan_scout_move(self, ant: Dict, arena_data: Dict) -> List[Dict]:
+    def plan_scout_move(self, ant: Dict, arena_data: Dict) -> List[HexKey]:
         """Планирование движения разведчика"""
-        ant_pos = (ant['q'], ant['r'])
-        spot = arena_data.get('spot', {})
-        main_hex = (spot.get('q', 0), spot.get('r', 0))
+        ant_pos = pack_dict(ant)
+        main_hex = self.get_index(arena_data).spot
         
         # ВАЖНО: Освобождаем основной гекс для создания новых муравьев
         if ant_pos == main_hex:
             # Отходим для разведки
             exploration_targets = self.strategy.find_safe_exploration_targets(ant, arena_data)
             if exploration_targets:
-                return self.find_path_astar(ant_pos, exploration_targets[0][0], arena_data)
+                return self.find_path_astar(ant_pos, exploration_targets[0][0], arena_data, avoid_threat=True)
             
             # Если нет целей для разведки, отходим на соседний гекс
-            neighbors = self.get_neighbors(*ant_pos)
+            neighbors = self.get_neighbors(ant_pos)
             if neighbors:
                 return self.find_path_astar(ant_pos, neighbors[0], arena_data)
         
@@ -584,7 +676,7 @@ class APIclient:
         if exploration_targets:
             # Выбираем самую перспективную цель
             target_pos = exploration_targets[0][0]
-            return self.find_path_astar(ant_pos, target_pos, arena_data)
+            return self.find_path_astar(ant_pos, target_pos, arena_data, avoid_threat=True)
             
         # Если все исследовано, патрулируем периметр
         home_coords = arena_data.get('home', [])
@@ -595,18 +687,49 @@ class APIclient:
             radius = 10
             target_q = int(home_center['q'] + radius * math.cos(angle))
             target_r = int(home_center['r'] + radius * math.sin(angle))
-            return self.find_path_astar(ant_pos, (target_q, target_r), arena_data)
+            return self.find_path_long(ant_pos, pack(target_q, target_r), arena_data)
             
-        return [{'q': ant['q'], 'r': ant['r']}]
+        return [ant_pos]
 
-    def execute_turn(self):
-        """Основной цикл выполнения хода с полной валидацией"""
-        arena_data = self.get_arena()
+    def baseline_path(self, ant: Dict, arena_data: Dict) -> List[HexKey]:
+        """Дешевый путь без поиска: домой по полю, дальше по прошлому пути или на месте"""
+        ant_pos = pack_dict(ant)
+        if ant.get('food', {}).get('amount', 0) > 0:
+            field = self.home_field(arena_data)
+            if field.distance(ant_pos) is not None:
+                return field.path_from(ant_pos, HOME_PATH_STEPS)
+        return continue_path(self.last_paths.get(ant['id']), ant_pos) or [ant_pos]
+
+    def refine_rank(self, ant: Dict, index: ArenaIndex) -> int:
+        """Очередь улучшения планов: груженые рабочие, бойцы в контакте, разведчики, остальные"""
+        if ant['type'] == ROLE_WORKER and ant.get('food', {}).get('amount', 0) > 0:
+            return 0
+        if ant['type'] == ROLE_FIGHTER and index.enemy_grid.count_within(pack_dict(ant), 2):
+            return 1
+        if ant['type'] == ROLE_SCOUT:
+            return 2
+        return 3
+
+    def execute_turn(self, arena_data: Optional[Dict] = None):
+        """Основной цикл выполнения хода с полной валидацией
+        
+        arena_data - снимок /arena, уже полученный игровым циклом; без него
+        арена запрашивается здесь. Повторный снимок того же хода не планируется.
+        Планирование anytime: у каждого муравья сразу есть базовый путь, полные
+        планы строятся по приоритету, пока до дедлайна отправки есть время.
+        """
+        if arena_data is None:
+            arena_data = self.get_arena()
         if not arena_data:
             return False
+        if self.already_planned(arena_data):
+            print(f"ℹ️ Ход {arena_data.get('turnNo')} уже спланирован, пропускаем")
+            return True
             
-        moves = []
-        our_ants = arena_data.get('ants', [])
+        # Индекс строится один раз и дальше используется всеми планировщиками
+        index = self.get_index(arena_data)
+        
+        our_ants = list(index.ants_by_id.values())
         visible_enemies = arena_data.get('enemies', [])
         visible_food = arena_data.get('food', [])
         home_coords = arena_data.get('home', [])
@@ -617,7 +740,26 @@ class APIclient:
         print(f"Видимых ресурсов: {len(visible_food)}")
         print(f"Текущий счет: {arena_data.get('score', 0)}")
         
+        # Базовый путь для каждого муравья: его и отправим, если на полный план не хватит времени
+        plan = AnytimePlan(self.turn_clock.deadline())
+        self.last_paths = {ant_id: path for ant_id, path in self.last_paths.items()
+                           if ant_id in index.ants_by_id}
         for ant in our_ants:
+            plan.propose(ant['id'], self.validate_move_path(ant, self.baseline_path(ant, arena_data), arena_data))
+        
+        # Рабочие делят ресурсы одним назначением; не успели - каждый выберет сам
+        self.food_plan = None
+        if plan.has_time():
+            try:
+                self.assign_food(our_ants, visible_food, arena_data)
+            except Exception as e:
+                print(f"Ошибка назначения ресурсов: {e}")
+        
+        ranked = sorted(our_ants, key=lambda ant: self.refine_rank(ant, index))
+        for i, ant in enumerate(ranked):
+            if not plan.has_time():
+                plan.skipped = len(ranked) - i  # До этих муравьев очередь не дошла
+                break
             ant_type = ant['type']
             ant_type_name = {ROLE_WORKER: 'Рабочий', ROLE_FIGHTER: 'Боец', ROLE_SCOUT: 'Разведчик'}.get(ant_type, 'Неизвестный')
             
@@ -629,22 +771,24 @@ class APIclient:
                 elif ant_type == ROLE_SCOUT:
                     path = self.plan_scout_move(ant, arena_data)
                 else:
-                    path = [{'q': ant['q'], 'r': ant['r']}]
+                    path = [pack_dict(ant)]
                 
                 # Валидируем путь
                 validated_path = self.validate_move_path(ant, path, arena_data)
+                plan.propose(ant['id'], validated_path, refined=True)
+                self.last_paths[ant['id']] = path  # Остаток пути - базовый план следующего хода
                 
                 if len(validated_path) > 1:  # Есть движение
-                    moves.append({
-                        "ant": ant['id'],
-                        "path": validated_path[1:]  # Исключаем текущую позицию
-                    })
                     print(f"{ant_type_name} {ant['id'][:8]}: движение на {len(validated_path)-1} шагов")
                 else:
                     print(f"{ant_type_name} {ant['id'][:8]}: остается на месте")
                     
             except Exception as e:
                 print(f"Ошибка планирования для {ant_type_name} {ant['id'][:8]}: {e}")
+        
+        if plan.skipped:
+            print(f"⏳ Дедлайн близко: {plan.summary()}")
+        moves = plan.moves()
                 
         # Проверяем коллизии между нашими муравьями
         moves = self.check_collision_avoidance(moves, arena_data)
@@ -659,6 +803,7 @@ class APIclient:
                 print(f"✅ Отправлено {len(moves)} команд")
         else:
             print("ℹ️ Нет команд для отправки")
+        self.planned_turn = arena_data.get('turnNo')
             
         print(f"До следующего хода: {arena_data.get('nextTurnIn', 0):.1f} сек")
         print("=" * 40)
@@ -695,20 +840,27 @@ def main():
     try:
         print("🎮 Начинаем игру...")
         while True:
+            # Один запрос /arena на ход: снимок сразу уходит в планировщик
             arena_data = client.get_arena()
-            if arena_data and arena_data.get('nextTurnIn', 0) > 0:
-                client.execute_turn()
-                import time
-                time.sleep(2)  # Ждем между ходами
-            else:
-                print("🏁 Раунд завершен или нет данных")
+            if not arena_data:
+                # Ошибка сети, дедлайн или лимит запросов: пропускаем ход, а не игру
+                print("❌ Нет данных арены, пропускаем ход")
+                time.sleep(client.turn_clock.sleep_time())
+                continue
+            if arena_data.get('nextTurnIn', 0) <= 0:
+                print("🏁 Раунд завершен")
                 break
+            client.execute_turn(arena_data)
+            # Спим до открытия следующего хода по часам сервера
+            time.sleep(client.turn_clock.sleep_time())
     except KeyboardInterrupt:
         print("\n⏹️  Остановлено пользователем")
     except Exception as e:
         print(f"💥 Ошибка: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        print(f"⏱️ {client.turn_clock.summary()}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,30 @@
+"""
+Игровые константы DatsPulse (типы муравьев, гексов и ресурсов)
+"""
+
+# Константы типов муравьев
+ROLE_WORKER = 0
+ROLE_FIGHTER = 1
+ROLE_SCOUT = 2
+
+# Очки движения за ход по типу муравья
+MOVEMENT_POINTS = {ROLE_WORKER: 5, ROLE_FIGHTER: 4, ROLE_SCOUT: 7}
+
+# Константы типов гексов
+HEX_ANTHILL = 1
+HEX_EMPTY = 2
+HEX_DIRT = 3
+HEX_ACID = 4
+HEX_STONE = 5
+
+# Константы ресурсов
+RESOURCE_APPLE = 1
+RESOURCE_BREAD = 2
+RESOURCE_NECTAR = 3
+
+# Муравейник каждый ход атакует чужих муравьев в радиусе
+ANTHILL_ATTACK_RADIUS = 2
+ANTHILL_ATTACK_DAMAGE = 20
+
+# Сколько единиц ресурса переносит муравей
+ANT_CARRY_CAPACITY = {ROLE_WORKER: 8, ROLE_FIGHTER: 2, ROLE_SCOUT: 2}
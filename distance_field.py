@@ -0,0 +1,136 @@
+"""
+Поля расстояний (flow field) до множества целей.
+
+Один обратный Дейкстра от всех целей сразу (например, от трех гексов
+муравейника) дает стоимость пути до ближайшей цели для каждого известного
+гекса. Любой муравей читает следующие шаги к цели за O(длина пути), без поиска.
+"""
+
+from heapq import heappush, heappop
+from typing import Container, Dict, Iterable, List, Optional
+
+from adjacency import HexGraph
+from hexgeo import NEIGHBOR_DELTAS, HexKey
+from pathfinding import CostFn
+from world import WorldStore
+
+
+class DistanceField:
+    """Поле стоимости пути от каждого гекса области до ближайшей цели"""
+
+    def __init__(self, targets: Iterable[HexKey], cost_of: CostFn, domain: Container[HexKey],
+                 graph: Optional[HexGraph] = None):
+        self.targets = frozenset(targets)
+        self.cost_of = cost_of
+        self.dist: Dict[HexKey, int] = {}
+        if graph is not None:
+            self._build_graph(graph)
+        else:
+            self._build(domain)
+
+    def _build(self, domain: Container[HexKey]):
+        """Обратный Дейкстра: стоимость x -> y равна стоимости входа на y"""
+        dist = self.dist
+        cost_of = self.cost_of
+        heap = []
+        for target in self.targets:
+            if cost_of(target) is not None:
+                dist[target] = 0
+                heappush(heap, (0, target))
+
+        while heap:
+            d, current = heappop(heap)
+            if d > dist[current]:
+                continue
+            enter_cost = cost_of(current)
+            new_d = d + enter_cost
+            for delta in NEIGHBOR_DELTAS:
+                neighbor = current + delta
+                if neighbor not in domain or cost_of(neighbor) is None:
+                    continue
+                old_d = dist.get(neighbor)
+                if old_d is None or new_d < old_d:
+                    dist[neighbor] = new_d
+                    heappush(heap, (new_d, neighbor))
+
+    def _build_graph(self, graph: HexGraph):
+        """Тот же обратный Дейкстра по графу соседства; область - увиденные гексы графа"""
+        index = graph.index
+        rows = graph.rows
+        weights = graph.weights
+        seen = graph.seen
+        dist = {}
+        heap = []
+        for target in self.targets:
+            node = index.get(target)
+            if node is not None and seen[node] and weights[node]:
+                dist[node] = 0
+                heappush(heap, (0, node))
+
+        while heap:
+            d, current = heappop(heap)
+            if d > dist[current]:
+                continue
+            new_d = d + weights[current]
+            for neighbor in rows[current]:
+                if not seen[neighbor]:
+                    continue
+                old_d = dist.get(neighbor)
+                if old_d is None or new_d < old_d:
+                    dist[neighbor] = new_d
+                    heappush(heap, (new_d, neighbor))
+
+        keys = graph.keys
+        self.dist = {keys[node]: d for node, d in dist.items()}
+
+    def distance(self, pos: HexKey) -> Optional[int]:
+        """Стоимость пути до ближайшей цели (None - гекс вне поля)"""
+        return self.dist.get(pos)
+
+    def next_step(self, pos: HexKey) -> Optional[HexKey]:
+        """Следующий гекс по убыванию поля (None - цель достигнута или гекс вне поля)"""
+        if pos in self.targets or pos not in self.dist:
+            return None
+        best = None
+        best_value = self.dist[pos]
+        for delta in NEIGHBOR_DELTAS:
+            neighbor = pos + delta
+            neighbor_dist = self.dist.get(neighbor)
+            if neighbor_dist is None:
+                continue
+            value = neighbor_dist + self.cost_of(neighbor)
+            if value <= best_value:
+                best_value = value
+                best = neighbor
+        return best
+
+    def path_from(self, pos: HexKey, max_steps: Optional[int] = None) -> List[HexKey]:
+        """Путь от pos к ближайшей цели (начиная с pos), не длиннее max_steps шагов"""
+        path = [pos]
+        current = pos
+        while max_steps is None or len(path) <= max_steps:
+            current = self.next_step(current)
+            if current is None:
+                break
+            path.append(current)
+        return path
+
+
+class FieldCache:
+    """Кэш поля расстояний: перестраивается только при смене целей или рельефа"""
+
+    def __init__(self):
+        self.field: Optional[DistanceField] = None
+        self._targets = None
+        self._version = None
+        self.rebuilds = 0
+
+    def get(self, targets: Iterable[HexKey], world: WorldStore, cost_of: CostFn) -> DistanceField:
+        """Поле для целей targets по известной карте мира (версия world.version)"""
+        targets = frozenset(targets)
+        if self.field is None or targets != self._targets or self._version != world.version:
+            self._targets = targets
+            self._version = world.version
+            self.field = DistanceField(targets, cost_of, world, world.graph)
+            self.rebuilds += 1
+        return self.field
@@ -5,24 +5,31 @@
 """
 
 import asyncio
+import sys
 import time
 import threading
 import math
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from assignment import FoodAssigner, plan_food
+from async_transport import AsyncTransport
 from config import APIclient
+from constants import MOVEMENT_POINTS, ROLE_FIGHTER, ROLE_WORKER
+from hexgeo import key_to_dict, pack, pack_dict, unpack
 from ultra_aggressive import UltraAgressiveStrategy  # Исправлено название класса
-from resource_harvester import ResourceHarvester
-from zone_controller import ZoneController
-from rhythm_controller import GameRhythmController, DecisionMaker
+from turn_clock import TurnClock
+
+# Доли типов в армии: рабочие, бойцы, остальные - разведчики
+ARMY_COMPOSITION = {ROLE_WORKER: 0.6, ROLE_FIGHTER: 0.25}
 
 class DominationMaster:
-    def __init__(self, base_url="https://games-test.datsteam.dev"):
-        self.base_url = base_url
-        self.api_client = APIclient(use_test_server=True)  # Исправлен аргумент
-        self.ultra_strategy = UltraAgressiveStrategy()  # Исправлено название класса
-        self.zone_controller = ZoneController()
-        self.rhythm_controller = GameRhythmController()
-        self.decision_maker = DecisionMaker()
+    def __init__(self, use_test_server=True, transport=None):
+        # Общий асинхронный транспорт: пул соединений, лимит 3 RPS, дедлайны
+        self.transport = transport if transport is not None else AsyncTransport(use_test_server)
+        self.base_url = self.transport.base_url
+        self.api_client = APIclient(use_test_server=use_test_server)  # Память о карте, поиск пути и индекс хода
+        self.ultra_strategy = UltraAgressiveStrategy(self.api_client.world)  # Исправлено название класса
+        self.food_assigner = FoodAssigner()  # Общее назначение рабочих на ресурсы
+        self.turn_clock = TurnClock()  # Граница хода сервера вместо optimize_turn_timing
         
         # Состояние системы
         self.total_moves_made = 0
@@ -44,20 +51,23 @@ class DominationMaster:
         print("🔥 ЗАПУСК СИСТЕМЫ ПОЛНОГО ДОМИНИРОВАНИЯ! 🔥")
         print("� Команда MACAN team уже зарегистрирована - сразу в бой!")
         
-        async with ResourceHarvester(self.base_url) as harvester:
+        async with self.transport:
             turn_count = 0
             
             while True:
-                turn_start = time.time()
                 print(f"\n=== ХОД {turn_count + 1} ===")
                 
                 try:
                     # Получаем данные арены
-                    arena_data = await harvester.async_get_arena()
+                    status, arena_data = await self.transport.get_arena(self.turn_clock.fetch_deadline())
                     if not arena_data:
                         await asyncio.sleep(0.5)
                         continue
                     
+                    self.turn_clock.observe(arena_data, self.transport.request_started, time.monotonic())
+                    # Карта снимка - в память клиента: по ней ищутся пути
+                    self.api_client.remember_arena(arena_data)
+                    
                     # Проверяем, есть ли следующий ход
                     next_turn_in = arena_data.get('nextTurnIn', 0)
                     if next_turn_in <= 0:
@@ -68,13 +78,13 @@ class DominationMaster:
                     self.update_game_phase(arena_data)
                     
                     # Параллельный анализ всех систем
-                    analysis_tasks = await self.parallel_analysis(arena_data, harvester)
+                    analysis_tasks = await self.parallel_analysis(arena_data)
                     
                     # Принятие мастер-решения
                     master_plan = self.create_master_plan(analysis_tasks, arena_data)
                     
                     # Выполнение плана
-                    execution_result = await self.execute_master_plan(master_plan, harvester)
+                    execution_result = await self.execute_master_plan(master_plan, arena_data)
                     
                     # Обновление метрик
                     self.update_performance_metrics(arena_data, execution_result)
@@ -82,28 +92,19 @@ class DominationMaster:
                     # Адаптация стратегии
                     self.adapt_strategy()
                     
-                    # Контроль темпа
-                    turn_duration = time.time() - turn_start
-                    self.rhythm_controller.record_turn_metrics(
-                        turn_start, 
-                        len(master_plan.get('actions', [])),
-                        execution_result.get('successful_actions', 0)
-                    )
-                    
                     # Отчет о прогрессе
                     self.print_progress_report(arena_data, turn_count)
                     
                     turn_count += 1
                     
-                    # Оптимальная задержка
-                    optimal_delay = self.rhythm_controller.optimize_turn_timing()
-                    await asyncio.sleep(optimal_delay)
+                    # Спим до открытия следующего хода по часам сервера
+                    await asyncio.sleep(self.turn_clock.sleep_time())
                     
                 except Exception as e:
                     print(f"❌ Ошибка в цикле доминирования: {e}")
                     await asyncio.sleep(1)
     
-    async def parallel_analysis(self, arena_data, harvester):
+    async def parallel_analysis(self, arena_data):
         """Параллельный анализ всех систем"""
         analysis_results = {}
         
@@ -113,13 +114,10 @@ class DominationMaster:
                 self.analyze_ultra_strategy(arena_data)
             ),
             'resource_optimization': asyncio.create_task(
-                harvester.optimize_resource_collection(arena_data)
+                self.optimize_resource_collection(arena_data)
             ),
             'territory_analysis': asyncio.create_task(
                 self.analyze_territory(arena_data)
-            ),
-            'rhythm_analysis': asyncio.create_task(
-                self.analyze_rhythm()
             )
         }
         
@@ -141,21 +139,40 @@ class DominationMaster:
             arena_data
         )
     
-    async def analyze_territory(self, arena_data):
-        """Анализ территории"""
+    async def optimize_resource_collection(self, arena_data):
+        """Задания рабочим на сбор ресурсов"""
         return await asyncio.get_event_loop().run_in_executor(
             self.executor,
-            self.zone_controller.analyze_territory,
+            self.assign_workers_to_food,
             arena_data
         )
     
-    async def analyze_rhythm(self):
-        """Анализ ритма игры"""
+    def assign_workers_to_food(self, arena_data):
+        """Свободные рабочие - к ресурсам одним назначением по стоимости пути (см. assignment.py)"""
+        client = self.api_client
+        index = client.get_index(arena_data)
+        workers = [ant for ant in index.ants_by_id.values()
+                   if ant['type'] == ROLE_WORKER and not ant.get('food', {}).get('amount', 0)]
+        food_plan = plan_food(self.food_assigner, workers, arena_data.get('food', []), client.world.graph,
+                              client.world.cost_of, index.home, client.home_field(arena_data),
+                              client.strategy.threat_map(arena_data))
+        return [{'worker_id': ant_id, 'target': unpack(target), 'path': path}
+                for ant_id, (target, path) in food_plan.items()]
+    
+    async def analyze_territory(self, arena_data):
+        """Анализ территории: зоны экспансии вокруг муравейника"""
         return await asyncio.get_event_loop().run_in_executor(
             self.executor,
-            self.rhythm_controller.analyze_game_tempo
+            self.expansion_targets,
+            arena_data
         )
     
+    def expansion_targets(self, arena_data):
+        """Центры зон экспансии с приоритетом, важные первыми"""
+        self.ultra_strategy.create_expansion_zones(arena_data.get('home', []), arena_data)
+        zones = sorted(self.ultra_strategy.expansion_zones, key=lambda zone: zone['priority'], reverse=True)
+        return [(unpack(zone['center']), zone['priority']) for zone in zones]
+    
     def create_master_plan(self, analysis_results, arena_data):
         """Создание мастер-плана действий"""
         ants = arena_data.get('ants', [])
@@ -184,6 +201,7 @@ class DominationMaster:
                 'type': 'move',
                 'ant_id': assignment['worker_id'],
                 'target': assignment['target'],
+                'path': assignment['path'],
                 'priority': 90
             })
         
@@ -220,12 +238,12 @@ class DominationMaster:
         total_ants = len(ants)
         
         # Оптимальный состав
-        optimal_composition = self.zone_controller.calculate_optimal_composition(total_ants + 1)
+        planned_total = total_ants + 1
         
         # Выбираем тип для создания
-        if workers < optimal_composition['workers']:
+        if workers < planned_total * ARMY_COMPOSITION[ROLE_WORKER]:
             ant_type = 0  # Рабочий
-        elif fighters < optimal_composition['fighters']:
+        elif fighters < planned_total * ARMY_COMPOSITION[ROLE_FIGHTER]:
             ant_type = 1  # Боец
         else:
             ant_type = 2  # Разведчик
@@ -236,7 +254,7 @@ class DominationMaster:
             'priority': 100
         }
     
-    async def execute_master_plan(self, master_plan, harvester):
+    async def execute_master_plan(self, master_plan, arena_data):
         """Выполнение мастер-плана"""
         actions = master_plan.get('actions', [])
         if not actions:
@@ -245,27 +263,37 @@ class DominationMaster:
         # Сортируем по приоритету
         actions.sort(key=lambda x: x.get('priority', 0), reverse=True)
         
-        # Формируем команды для API
+        # Формируем команды для API: путь к цели в пределах очков движения муравья
+        index = self.api_client.get_index(arena_data)
         moves = []
         for action in actions[:20]:  # Лимит на количество действий
-            if action['type'] == 'move':
-                moves.append({
-                    'ant_id': action['ant_id'],
-                    'q': action['target'][0],
-                    'r': action['target'][1]
-                })
-            elif action['type'] == 'create_ant':
-                moves.append({
-                    'create': True,
-                    'type': action['ant_type']
-                })
+            if action['type'] == 'create_ant':
+                moves.append({'create': True, 'type': action['ant_type']})
+                continue
+            if action['type'] != 'move':
+                continue
+            ant = index.ants_by_id.get(action['ant_id'])
+            if ant is None:
+                continue
+            # Путь из назначения уже найден; остальным - поиск по памяти о карте
+            path = action.get('path') or self.api_client.find_path_astar(
+                pack_dict(ant), pack(*action['target']), arena_data)
+            path = path[1:MOVEMENT_POINTS.get(ant['type'], 5) + 1]
+            if path:
+                moves.append({'ant': ant['id'], 'path': [key_to_dict(key) for key in path]})
         
-        # Отправляем команды
+        # Отправляем команды до дедлайна хода
         if moves:
-            result = await harvester.async_send_moves(moves)
+            deadline = self.turn_clock.boundary
+            try:
+                status, _ = await self.transport.send_moves(moves, deadline)
+                self.turn_clock.record_send(self.transport.request_started, time.monotonic())
+            except Exception as e:
+                print(f"❌ Ошибка отправки: {e}")
+                status = None
             self.total_moves_made += len(moves)
             
-            if result:
+            if status == 200:
                 self.successful_moves += len(moves)
                 return {'successful_actions': len(moves)}
         
@@ -298,13 +326,15 @@ class DominationMaster:
             )
     
     def adapt_strategy(self):
-        """Адаптация стратегии"""
-        tempo_analysis = self.rhythm_controller.analyze_game_tempo()
+        """Адаптация стратегии по доле принятых сервером команд"""
+        efficiency = self.performance_metrics.get('execution_efficiency')
+        if efficiency is None:
+            return
         
-        if tempo_analysis.get('recommended_mode') == 'ultra_aggressive':
+        if efficiency >= 90:
             self.ultra_strategy.aggressiveness_level = min(1.0, 
                 self.ultra_strategy.aggressiveness_level + 0.1)
-        elif tempo_analysis.get('avg_efficiency', 0) < 50:
+        elif efficiency < 50:
             self.ultra_strategy.aggressiveness_level = max(0.3, 
                 self.ultra_strategy.aggressiveness_level - 0.1)
     
@@ -331,7 +361,7 @@ class DominationMaster:
 # Точка входа
 async def main():
     """ГЛАВНАЯ ФУНКЦИЯ ЗАПУСКА"""
-    master = DominationMaster()
+    master = DominationMaster(use_test_server="--prod" not in sys.argv)
     await master.run_domination_cycle()
 
 if __name__ == "__main__":
@@ -0,0 +1,163 @@
+"""
+Геометрия гексов в осевых координатах (q, r).
+
+Одна реализация расстояния, соседей, колец и спиралей для всех модулей,
+плюс пакетные версии на NumPy: матрицы расстояний муравьи x ресурсы,
+муравьи x враги, кандидаты x враги считаются одной операцией над массивами.
+
+Внутри планировщиков гекс - одно целое число (упакованный ключ): старшие
+KEY_BITS бит - q, младшие - r, оба со сдвигом KEY_OFFSET. Сосед получается
+прибавлением константы, без кортежей; словари {'q', 'r'} собираются только
+при отправке команд на сервер.
+"""
+
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+Position = Tuple[int, int]
+HexKey = int  # Упакованные координаты гекса
+
+HEX_DIRECTIONS = [(+1, 0), (+1, -1), (0, -1), (-1, 0), (-1, +1), (0, +1)]
+
+KEY_BITS = 16
+KEY_OFFSET = 1 << (KEY_BITS - 1)   # Координаты от -32768 до 32767
+KEY_MASK = (1 << KEY_BITS) - 1
+
+# Смещения ключа к шести соседям
+NEIGHBOR_DELTAS = tuple((dq << KEY_BITS) + dr for dq, dr in HEX_DIRECTIONS)
+
+
+def hex_distance(pos1: Position, pos2: Position) -> int:
+    """Вычисление расстояния между гексами"""
+    q1, r1 = pos1
+    q2, r2 = pos2
+    return (abs(q1 - q2) + abs(q1 + r1 - q2 - r2) + abs(r1 - r2)) // 2
+
+
+def neighbors(q: int, r: int) -> List[Position]:
+    """Соседние гексы"""
+    return [(q + dq, r + dr) for dq, dr in HEX_DIRECTIONS]
+
+
+def pack(q: int, r: int) -> HexKey:
+    """Координаты -> упакованный ключ"""
+    return ((q + KEY_OFFSET) << KEY_BITS) | (r + KEY_OFFSET)
+
+
+def pack_dict(item: Dict) -> HexKey:
+    """Словарь {'q', 'r'} из ответа сервера -> упакованный ключ"""
+    return ((item['q'] + KEY_OFFSET) << KEY_BITS) | (item['r'] + KEY_OFFSET)
+
+
+def unpack(key: HexKey) -> Position:
+    """Упакованный ключ -> координаты (q, r)"""
+    return (key >> KEY_BITS) - KEY_OFFSET, (key & KEY_MASK) - KEY_OFFSET
+
+
+def key_to_dict(key: HexKey) -> Dict:
+    """Упакованный ключ -> словарь {'q', 'r'} для запроса к серверу"""
+    return {'q': (key >> KEY_BITS) - KEY_OFFSET, 'r': (key & KEY_MASK) - KEY_OFFSET}
+
+
+def key_distance(a: HexKey, b: HexKey) -> int:
+    """Расстояние между гексами по упакованным ключам"""
+    dq = (a >> KEY_BITS) - (b >> KEY_BITS)
+    dr = (a & KEY_MASK) - (b & KEY_MASK)
+    return (abs(dq) + abs(dr) + abs(dq + dr)) // 2
+
+
+def neighbor_keys(key: HexKey) -> List[HexKey]:
+    """Ключи соседних гексов"""
+    return [key + delta for delta in NEIGHBOR_DELTAS]
+
+
+def axial_to_cube(q: int, r: int) -> Tuple[int, int, int]:
+    """Осевые координаты -> кубические (x + y + z = 0)"""
+    return q, -q - r, r
+
+
+def cube_to_axial(x: int, y: int, z: int) -> Position:
+    """Кубические координаты -> осевые"""
+    return x, z
+
+
+@lru_cache(maxsize=None)
+def ring_offsets(radius: int) -> Tuple[Position, ...]:
+    """Смещения гексов ровно на расстоянии radius от центра"""
+    if radius == 0:
+        return ((0, 0),)
+    offsets = []
+    q, r = -radius, radius  # Стартуем с угла в направлении (-1, +1)
+    for dq, dr in HEX_DIRECTIONS:
+        for _ in range(radius):
+            offsets.append((q, r))
+            q, r = q + dq, r + dr
+    return tuple(offsets)
+
+
+@lru_cache(maxsize=None)
+def spiral_offsets(radius: int) -> Tuple[Position, ...]:
+    """Смещения всех гексов в радиусе radius, по возрастанию расстояния"""
+    offsets = []
+    for ring in range(radius + 1):
+        offsets.extend(ring_offsets(ring))
+    return tuple(offsets)
+
+
+@lru_cache(maxsize=None)
+def spiral_key_offsets(radius: int) -> Tuple[int, ...]:
+    """spiral_offsets в виде смещений упакованного ключа"""
+    return tuple((dq << KEY_BITS) + dr for dq, dr in spiral_offsets(radius))
+
+
+@lru_cache(maxsize=None)
+def spiral_key_rings(radius: int) -> Tuple[Tuple[int, int], ...]:
+    """spiral_key_offsets вместе с расстоянием от центра (номером кольца)"""
+    return tuple(((dq << KEY_BITS) + dr, ring)
+                 for ring in range(radius + 1) for dq, dr in ring_offsets(ring))
+
+
+def ring(center: Position, radius: int) -> List[Position]:
+    """Гексы на расстоянии ровно radius от center"""
+    q, r = center
+    return [(q + dq, r + dr) for dq, dr in ring_offsets(radius)]
+
+
+def spiral(center: Position, radius: int) -> List[Position]:
+    """Гексы в радиусе radius от center (от ближних к дальним)"""
+    q, r = center
+    return [(q + dq, r + dr) for dq, dr in spiral_offsets(radius)]
+
+
+def coords_array(items: Iterable) -> np.ndarray:
+    """Массив координат (n, 2) из словарей {'q', 'r'} или кортежей (q, r)"""
+    coords = [(item['q'], item['r']) if isinstance(item, dict) else item for item in items]
+    return np.array(coords, dtype=np.int64).reshape(-1, 2)
+
+
+def pack_array(coords: np.ndarray) -> List[HexKey]:
+    """Массив координат (n, 2) -> список упакованных ключей"""
+    return (((coords[:, 0] + KEY_OFFSET) << KEY_BITS) | (coords[:, 1] + KEY_OFFSET)).tolist()
+
+
+def distance_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Матрица расстояний (len(a), len(b)) между двумя наборами гексов"""
+    dq = a[:, None, 0] - b[None, :, 0]
+    dr = a[:, None, 1] - b[None, :, 1]
+    return (np.abs(dq) + np.abs(dr) + np.abs(dq + dr)) // 2
+
+
+def distances_from(pos: Position, b: np.ndarray) -> np.ndarray:
+    """Расстояния от одного гекса до набора гексов"""
+    dq = b[:, 0] - pos[0]
+    dr = b[:, 1] - pos[1]
+    return (np.abs(dq) + np.abs(dr) + np.abs(dq + dr)) // 2
+
+
+def nearest_index(pos: Position, items: List) -> Optional[int]:
+    """Индекс ближайшего к pos элемента списка (None для пустого списка)"""
+    if not items:
+        return None
+    return int(np.argmin(distances_from(pos, coords_array(items))))
@@ -0,0 +1,252 @@
+"""
+Иерархический поиск пути (HPA*) для дальних целей.
+
+Известная карта режется на кластеры CLUSTER_SIZE x CLUSTER_SIZE в осевых
+координатах. На границах кластеров выбираются входы, внутри кластера
+заранее считаются стоимости вход-вход. Дальний маршрут ищется по этому
+абстрактному графу, а точный путь уточняется только на первые шаги.
+Кластеры, в которых изменился рельеф, пересчитываются лениво.
+Кластеры считаются прямо по полям упакованного ключа (q и r со сдвигом).
+В абстрактный граф входят только кластеры, где есть увиденные гексы, а
+поиск ограничен числом раскрытий и временем: недостижимая цель не
+заставляет строить кластеры по всей невидимой карте.
+"""
+
+import time
+from heapq import heappush, heappop
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from distance_field import DistanceField
+from hexgeo import KEY_BITS, KEY_MASK, HexKey, key_distance
+from pathfinding import dijkstra, find_path
+
+Cluster = Tuple[int, int]
+
+CLUSTER_SIZE = 8                   # Сторона кластера в гексах
+LONG_PATH_DISTANCE = 10            # С какой дальности цели используем иерархию
+HPA_MAX_ABSTRACT_EXPANSIONS = 2000
+HPA_TIME_BUDGET = 0.05             # Секунд на один дальний поиск (вместе с постройкой кластеров)
+HPA_LONG_ENTRANCE = 5              # С какой длины участка границы ставим два входа
+
+# Оси соседства кластеров: к +q и к +r
+_AXES = ((1, 0), (0, 1))
+
+
+class HierarchicalPlanner:
+    """Абстрактный граф входов между кластерами известной карты"""
+
+    def __init__(self, known_costs: Mapping[HexKey, Optional[int]], cluster_size: int = CLUSTER_SIZE):
+        self.known_costs = known_costs
+        self.size = cluster_size
+        self.sides: Dict[Tuple[Cluster, int], List[Tuple[HexKey, HexKey]]] = {}
+        self.intra: Dict[Cluster, Dict[HexKey, Dict[HexKey, int]]] = {}
+        self.partners: Dict[Cluster, Dict[HexKey, List[HexKey]]] = {}
+        self.seen_clusters: set = set()  # Кластеры, где видели хотя бы один гекс (только растет)
+        self.cluster_rebuilds = 0
+
+    def cluster_of(self, pos: HexKey) -> Cluster:
+        """Кластер гекса"""
+        return ((pos >> KEY_BITS) // self.size, (pos & KEY_MASK) // self.size)
+
+    def cost_of(self, pos: HexKey) -> Optional[int]:
+        """Стоимость входа на гекс по известной карте (невидимые стоят 1)"""
+        return self.known_costs.get(pos, 1)
+
+    def _cluster_cost_fn(self, cluster: Cluster):
+        """Функция стоимости, ограниченная одним кластером"""
+        size = self.size
+        cq, cr = cluster
+        known_costs = self.known_costs
+
+        def cost_of(pos):
+            if (pos >> KEY_BITS) // size != cq or (pos & KEY_MASK) // size != cr:
+                return None
+            return known_costs.get(pos, 1)
+
+        return cost_of
+
+    def is_seen(self, cluster: Cluster) -> bool:
+        """Видели ли в кластере хотя бы один гекс"""
+        if cluster in self.seen_clusters:
+            return True
+        known_costs = self.known_costs
+        if any(known_costs.get(pos, 0) != 0 for pos in self._cluster_hexes(cluster)):
+            self.seen_clusters.add(cluster)
+            return True
+        return False
+
+    def _cluster_hexes(self, cluster: Cluster) -> set:
+        size = self.size
+        q0, r0 = cluster[0] * size, cluster[1] * size
+        return {((q0 + dq) << KEY_BITS) | (r0 + dr) for dq in range(size) for dr in range(size)}
+
+    def mark_changed(self, positions: Iterable[HexKey]):
+        """Сбрасываем кэши кластеров, где изменился рельеф"""
+        for pos in positions:
+            cq, cr = self.cluster_of(pos)
+            for axis, (aq, ar) in enumerate(_AXES):
+                self.sides.pop(((cq, cr), axis), None)
+                self.sides.pop(((cq - aq, cr - ar), axis), None)
+            # Входы на общих границах изменились и у соседей
+            for dq, dr in ((0, 0), (1, 0), (-1, 0), (0, 1), (0, -1)):
+                self.intra.pop((cq + dq, cr + dr), None)
+                self.partners.pop((cq + dq, cr + dr), None)
+
+    def _side(self, cluster: Cluster, axis: int) -> List[Tuple[HexKey, HexKey]]:
+        """Переходы через границу cluster -> соседний кластер по оси axis"""
+        key = (cluster, axis)
+        transitions = self.sides.get(key)
+        if transitions is not None:
+            return transitions
+
+        size = self.size
+        cq, cr = cluster
+        if axis == 0:
+            q = cq * size + size - 1
+            pairs = [((q << KEY_BITS) | (cr * size + i), ((q + 1) << KEY_BITS) | (cr * size + i))
+                     for i in range(size)]
+        else:
+            r = cr * size + size - 1
+            pairs = [(((cq * size + i) << KEY_BITS) | r, ((cq * size + i) << KEY_BITS) | (r + 1))
+                     for i in range(size)]
+
+        # Непрерывные участки проходимой границы: короткий участок - вход в середине,
+        # длинный - два входа по краям
+        transitions = []
+        segment = []
+        for pair in pairs + [None]:
+            if pair is not None and self.cost_of(pair[0]) is not None and self.cost_of(pair[1]) is not None:
+                segment.append(pair)
+                continue
+            if len(segment) >= HPA_LONG_ENTRANCE:
+                transitions.extend((segment[0], segment[-1]))
+            elif segment:
+                transitions.append(segment[len(segment) // 2])
+            segment = []
+
+        self.sides[key] = transitions
+        return transitions
+
+    def _partners(self, cluster: Cluster) -> Dict[HexKey, List[HexKey]]:
+        """Входы кластера и их пары в соседних кластерах"""
+        partners = self.partners.get(cluster)
+        if partners is not None:
+            return partners
+
+        partners = {}
+        cq, cr = cluster
+        for axis, (aq, ar) in enumerate(_AXES):
+            for a, b in self._side(cluster, axis):
+                partners.setdefault(a, []).append(b)
+            for a, b in self._side((cq - aq, cr - ar), axis):
+                partners.setdefault(b, []).append(a)
+        self.partners[cluster] = partners
+        return partners
+
+    def _intra_edges(self, cluster: Cluster) -> Dict[HexKey, Dict[HexKey, int]]:
+        """Стоимости вход-вход внутри кластера (считаются лениво и кэшируются)"""
+        edges = self.intra.get(cluster)
+        if edges is not None:
+            return edges
+
+        entrances = list(self._partners(cluster))
+        cost_of = self._cluster_cost_fn(cluster)
+        max_cost = self.size * self.size * 3
+        edges = {}
+        for entrance in entrances:
+            dist, _ = dijkstra(entrance, cost_of, max_cost, targets=entrances,
+                               max_nodes=self.size * self.size)
+            edges[entrance] = {other: dist[other] for other in entrances
+                               if other != entrance and other in dist}
+        self.intra[cluster] = edges
+        self.cluster_rebuilds += 1
+        return edges
+
+    def _abstract_route(self, start: HexKey, goal: HexKey, max_expansions: int,
+                        deadline: Optional[float]) -> Optional[List[HexKey]]:
+        """A* по абстрактному графу: список опорных гексов от start до goal"""
+        start_cluster = self.cluster_of(start)
+        goal_cluster = self.cluster_of(goal)
+        if not self.is_seen(goal_cluster):
+            return None
+
+        start_entrances = set(self._partners(start_cluster))
+        start_dist, _ = dijkstra(start, self._cluster_cost_fn(start_cluster),
+                                 self.size * self.size * 3,
+                                 targets=start_entrances | {goal}, max_nodes=self.size * self.size)
+        goal_field = None  # Строится, только если поиск дошел до кластера цели
+
+        g_costs = {start: 0}
+        parents: Dict[HexKey, Optional[HexKey]] = {start: None}
+        heap = [(key_distance(start, goal), 0, start)]
+        expanded = 0
+
+        while heap:
+            _, g, node = heappop(heap)
+            if g > g_costs[node]:
+                continue
+            if node == goal:
+                route = []
+                while node is not None:
+                    route.append(node)
+                    node = parents[node]
+                route.reverse()
+                return route
+            expanded += 1
+            if expanded > max_expansions:
+                return None
+            # Постройка кластера дорогая - время проверяем на каждом раскрытии
+            if deadline is not None and time.perf_counter() > deadline:
+                return None
+
+            cluster = self.cluster_of(node)
+            if node == start:
+                edges = [(other, cost) for other, cost in start_dist.items()
+                         if other in start_entrances or other == goal]
+            else:
+                edges = list(self._intra_edges(cluster).get(node, {}).items())
+            # Переходы только в кластеры с увиденными гексами
+            edges += [(partner, self.cost_of(partner)) for partner in self._partners(cluster).get(node, [])
+                      if self.is_seen(self.cluster_of(partner))]
+            if node != start and cluster == goal_cluster:
+                if goal_field is None:
+                    goal_field = DistanceField([goal], self._cluster_cost_fn(goal_cluster),
+                                               self._cluster_hexes(goal_cluster))
+                to_goal = goal_field.distance(node)
+                if to_goal is not None:
+                    edges.append((goal, to_goal))
+
+            for neighbor, cost in edges:
+                new_g = g + cost
+                if new_g < g_costs.get(neighbor, float('inf')):
+                    g_costs[neighbor] = new_g
+                    parents[neighbor] = node
+                    heappush(heap, (new_g + key_distance(neighbor, goal), new_g, neighbor))
+
+        return None
+
+    def plan(self, start: HexKey, goal: HexKey, max_steps: int,
+             max_expansions: int = HPA_MAX_ABSTRACT_EXPANSIONS,
+             time_budget: Optional[float] = HPA_TIME_BUDGET) -> Optional[List[HexKey]]:
+        """Дальний путь: маршрут по кластерам, точный путь только на max_steps шагов
+
+        None - цель непроходима, в невидимой области или не нашлась в пределах
+        max_expansions раскрытий и time_budget секунд.
+        """
+        if self.cost_of(goal) is None:
+            return None
+        deadline = time.perf_counter() + time_budget if time_budget else None
+        route = self._abstract_route(start, goal, max_expansions, deadline)
+        if route is None:
+            return None
+
+        path = [start]
+        for waypoint in route[1:]:
+            segment = find_path(path[-1], waypoint, self.cost_of,
+                                max_nodes=self.size * self.size * 4)
+            if segment[-1] != waypoint:
+                return None
+            path.extend(segment[1:])
+            if len(path) > max_steps:
+                break
+        return path
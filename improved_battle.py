@@ -12,18 +12,29 @@
 """
 
 import asyncio
-import aiohttp
+import sys
 import time
 import random
 import math
-from collections import defaultdict
-from config import APIclient, TOKEN, HEADERS
+from arena_columns import ArenaColumns
+from arena_index import ArenaIndex
+from assignment import FoodAssigner, plan_food
+from async_transport import AsyncTransport
+from distance_field import FieldCache
+from hexgeo import hex_distance, key_to_dict, nearest_index, pack, pack_dict
+from pipeline import STOP, TurnPipeline
+from reservation import resolve_moves
+from transport import HTTP_TIMEOUT, PayloadStats
+from turn_clock import TurnClock
+from world import WorldStore
+
+REPORT_INTERVAL = 20.0  # Как часто печатаем метрики часов и стадий, секунд (~10 ходов)
 
 class ImprovedAsyncStrategy:
     def __init__(self):
         self.blocked_ants = set()  # Отслеживание заблокированных муравьев
         self.ant_tasks = {}  # Задачи для каждого муравья
-        self.resource_claims = {}  # Кто идет к какому ресурсу
+        self.food_assigner = FoodAssigner()  # Назначение рабочих на ресурсы с ценами между ходами
         self.turn_count = 0
         self.last_ant_count = 0
         self.stagnation_turns = 0
@@ -55,154 +66,161 @@ class ImprovedAsyncStrategy:
         self.last_ant_count = len(ants)
         return problems
     
-    def resolve_position_conflicts(self, moves, ants):
-        """УМНОЕ разрешение конфликтов позиций"""
+    def resolve_position_conflicts(self, moves, index):
+        """УМНОЕ разрешение конфликтов позиций (таблица резервирований по шагам)"""
         if not moves:
             return []
-            
-        # Группируем по целевым позициям
-        position_map = defaultdict(list)
-        for move in moves:
-            if 'path' in move and move['path']:
-                target = move['path'][-1]
-                target_key = (target['q'], target['r'])
-                position_map[target_key].append(move)
-        
-        resolved_moves = []
         
-        for target_pos, competing_moves in position_map.items():
-            if len(competing_moves) == 1:
-                resolved_moves.extend(competing_moves)
-            else:
-                # Выбираем приоритетный муравей
-                priority_move = self.select_priority_ant(competing_moves, ants)
-                resolved_moves.append(priority_move)
-                
-                # Остальным даем альтернативные задачи
-                for move in competing_moves:
-                    if move['ant'] != priority_move['ant']:
-                        alt_move = self.create_alternative_move(move, ants, target_pos)
-                        if alt_move:
-                            resolved_moves.append(alt_move)
+        # Таблица резервирований - только для движений; создание муравьев идет как есть
+        ant_moves = [move for move in moves if 'ant' in move]
+        actions = [move for move in moves if 'ant' not in move]
+        resolved_moves = resolve_moves(ant_moves, index, self.ant_priority)
         
-        return resolved_moves
+        # Запоминаем, кто не смог сдвинуться в этот ход
+        moved = {move['ant'] for move in resolved_moves}
+        self.blocked_ants = {move['ant'] for move in ant_moves if move['ant'] not in moved}
+        return resolved_moves + actions
     
-    def select_priority_ant(self, competing_moves, ants):
-        """Выбор приоритетного муравья при конфликте"""
-        best_move = None
-        best_score = -1
+    def ant_priority(self, ant):
+        """Приоритет муравья при постановке пути в таблицу резервирований"""
+        score = 0
         
-        for move in competing_moves:
-            ant_id = move['ant']
-            ant = next((a for a in ants if a['id'] == ant_id), None)
-            if not ant:
-                continue
-                
-            score = 0
+        # Приоритет по типу
+        if ant['type'] == 0:  # Рабочий
+            score += 100
+        elif ant['type'] == 1:  # Боец
+            score += 50
+        else:  # Разведчик
+            score += 30
             
-            # Приоритет по типу
-            if ant['type'] == 0:  # Рабочий
-                score += 100
-            elif ant['type'] == 1:  # Боец
-                score += 50
-            else:  # Разведчик
-                score += 30
-                
-            # Бонус за груз
-            if ant.get('food', {}).get('amount', 0) > 0:
-                score += 200  # Доставка ресурсов - высший приоритет
-                
-            # Штраф за блокировку в прошлом
-            if ant_id in self.blocked_ants:
-                score -= 50
+        # Бонус за груз
+        if ant.get('food', {}).get('amount', 0) > 0:
+            score += 200  # Доставка ресурсов - высший приоритет
             
-            if score > best_score:
-                best_score = score
-                best_move = move
+        # Штраф за блокировку в прошлом
+        if ant['id'] in self.blocked_ants:
+            score -= 50
         
-        return best_move if best_move else competing_moves[0]
-    
-    def create_alternative_move(self, blocked_move, ants, blocked_pos):
-        """Создание альтернативного движения"""
-        ant_id = blocked_move['ant']
-        ant = next((a for a in ants if a['id'] == ant_id), None)
-        if not ant:
-            return None
-            
-        # Ищем свободную соседнюю позицию
-        directions = [(1, 0), (0, 1), (-1, 1), (-1, 0), (0, -1), (1, -1)]
-        
-        for dq, dr in directions:
-            alt_q = blocked_pos[0] + dq
-            alt_r = blocked_pos[1] + dr
-            
-            # Создаем альтернативный путь к соседней позиции
-            return {
-                'ant': ant_id,
-                'path': [{'q': alt_q, 'r': alt_r}]
-            }
-        
-        # Если не нашли альтернативу, возвращаем None
-        return None
+        return score
 
 class AsyncBattleClient:
-    def __init__(self):
-        self.base_url = "https://games-test.datsteam.dev/api"
-        self.headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json", 
-            "X-Auth-Token": TOKEN
-        }
+    def __init__(self, use_test_server=True, transport=None):
+        self.transport = transport if transport is not None else AsyncTransport(use_test_server)
+        self.base_url = self.transport.base_url
         self.strategy = ImprovedAsyncStrategy()
-        self.session = None
+        self.home_fields = FieldCache()  # Поле расстояний до муравейника
+        self.world = WorldStore()  # Вся увиденная за раунд карта
+        self.turn_clock = TurnClock()  # Граница хода сервера по turnNo, nextTurnIn и RTT
+        self.arena_columns = None  # Последний ответ /arena в столбцах NumPy
+        self.arena_payload = PayloadStats()  # Размер ответов /arena и время разбора
         
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        await self.transport.open()
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
-    
-    async def get_arena_async(self):
-        """Асинхронное получение данных арены"""
-        try:
-            async with self.session.get(
-                f"{self.base_url}/arena",
-                headers=self.headers,
-                timeout=aiohttp.ClientTimeout(total=3)
-            ) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    print(f"❌ Ошибка получения арены: {response.status}")
-        except Exception as e:
-            print(f"❌ Ошибка запроса арены: {e}")
-        return None
+        await self.transport.close()
     
-    async def send_moves_async(self, moves):
-        """Асинхронная отправка команд"""
+    async def send_moves_async(self, moves, deadline=None, boundary=None):
+        """Асинхронная отправка команд (опоздавшие к дедлайну хода отбрасываются)
+        
+        deadline и boundary - дедлайн отправки и конец хода, для которого
+        команды спланированы; по умолчанию - последнего увиденного хода.
+        """
         if not moves:
             return False
+        
+        if boundary is None:
+            deadline, boundary = self.turn_clock.deadline(), self.turn_clock.boundary
+        if deadline is not None and time.monotonic() > deadline:
+            print("⏰ Дедлайн хода прошел: команды не отправлены")
+            self.turn_clock.record_drop()
+            return False
             
+        # Пути внутри - упакованные ключи, словари координат только для запроса
+        payload = [{"ant": move["ant"], "path": [key_to_dict(key) for key in move["path"]]}
+                   if 'ant' in move else move for move in moves]
+        # Ответ должен прийти до конца хода
+        send_deadline = boundary
+        if send_deadline is None:
+            send_deadline = time.monotonic() + sum(HTTP_TIMEOUT)
         try:
-            async with self.session.post(
-                f"{self.base_url}/move",
-                headers=self.headers,
-                json={"moves": moves},
-                timeout=aiohttp.ClientTimeout(total=3)
-            ) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    print(f"❌ Ошибка отправки команд: {response.status}")
+            status, data = await self.transport.send_moves(payload, send_deadline)
+            if status == 200:
+                self.turn_clock.record_send(self.transport.request_started, time.monotonic(), boundary)
+                return data
+            print(f"❌ Ошибка отправки команд: {status}")
         except Exception as e:
             print(f"❌ Ошибка отправки: {e}")
         return False
     
-    def plan_resource_focused_strategy(self, arena_data):
+    # Стадии конвейера хода (pipeline.TurnPipeline)
+    
+    async def fetch_snapshot(self):
+        """Стадия fetch: снимок вместе с дедлайнами своего хода"""
+        try:
+            status, data = await self.transport.get_arena(self.turn_clock.fetch_deadline(), self.arena_payload)
+        except Exception as e:
+            print(f"❌ Ошибка запроса арены: {e}")
+            return None
+        if status != 200 or not data:
+            print(f"❌ Ошибка получения арены: {status}")
+            return None
+        if not self.turn_clock.observe(data, self.transport.request_started, time.monotonic()):
+            return None  # Тот же ход уже в конвейере
+        if data.get('nextTurnIn', 0) <= 0:
+            print("🏁 РАУНД ЗАВЕРШЕН!")
+            return STOP
+        print(f"📦 /arena: {self.arena_payload.last()}")
+        return {'arena': data, 'deadline': self.turn_clock.deadline(), 'boundary': self.turn_clock.boundary}
+    
+    def prepare_snapshot(self, snapshot):
+        """Стадия prepare: столбцы и индекс хода (только чтение снимка)"""
+        columns = ArenaColumns(snapshot['arena'])
+        snapshot['columns'] = columns
+        snapshot['index'] = ArenaIndex(snapshot['arena'], columns)
+        return snapshot
+    
+    def plan_snapshot(self, snapshot):
+        """Стадия plan: память о карте, поле до дома и команды хода"""
+        arena_data, index, columns = snapshot['arena'], snapshot['index'], snapshot['columns']
+        # Память о карте меняется только в этом потоке - планировщик видит ее целиком
+        self.world.update_columns(columns.map_keys, columns.map_type, columns.map_cost,
+                                  arena_data.get('turnNo', 0))
+        self.arena_columns = columns
+        self.home_fields.get(index.home, self.world, self.world.cost_of)
+        
+        problems = self.strategy.analyze_logs_problems(arena_data)
+        self.strategy.turn_count += 1
+        print(f"\n=== ХОД {arena_data.get('turnNo', self.strategy.turn_count)} ===")
+        print(f"Муравьи: {len(index.ants_by_id)} | Счет: {arena_data.get('score', 0)} | "
+              f"Нектар: {arena_data.get('nectar', 0)} | Ресурсы: {len(arena_data.get('food', []))}")
+        if problems:
+            print(f"⚠️ Проблемы: {', '.join(problems)}")
+        
+        moves = self.plan_resource_focused_strategy(arena_data, index)
+        snapshot['moves'] = self.strategy.resolve_position_conflicts(moves, index)
+        snapshot['conflicts'] = len(moves) - len(snapshot['moves'])
+        return snapshot
+    
+    async def send_planned(self, snapshot):
+        """Стадия send: команды уходят с дедлайном своего хода, а не последнего снимка"""
+        moves = snapshot['moves']
+        if not moves:
+            print("⚠️ Нет команд для отправки")
+            return
+        if await self.send_moves_async(moves, snapshot['deadline'], snapshot['boundary']):
+            print(f"✅ Отправлено {len(moves)} команд")
+            if snapshot['conflicts'] > 0:
+                print(f"⚠️ Разрешено {snapshot['conflicts']} конфликтов")
+        else:
+            print("❌ Ошибка отправки команд")
+    
+    def plan_resource_focused_strategy(self, arena_data, index=None):
         """ПРИОРИТЕТ СБОРА РЕСУРСОВ - исправляем застой"""
-        ants = arena_data.get('ants', [])
+        if index is None:
+            index = ArenaIndex(arena_data)
+        ants = list(index.ants_by_id.values())
         food = arena_data.get('food', [])
         nectar = arena_data.get('nectar', 0)
         home = arena_data.get('home', [])
@@ -218,9 +236,20 @@ class AsyncBattleClient:
             })
             print(f"🐜 Создаем муравья типа {ant_type}, нектар: {nectar}")
         
-        # 2. ДОСТАВКА РЕСУРСОВ - высший приоритет
+        # 2. ДОСТАВКА РЕСУРСОВ - высший приоритет (одно поле расстояний на всех)
+        home_field = self.home_fields.get(index.home, self.world, self.world.cost_of)
         for ant in ants:
             if ant.get('food', {}).get('amount', 0) > 0:
+                ant_pos = pack_dict(ant)
+                if home_field.distance(ant_pos) is not None:
+                    path = home_field.path_from(ant_pos, 3)[1:]
+                    if path:
+                        moves.append({
+                            'ant': ant['id'],
+                            'path': path
+                        })
+                    continue
+                
                 closest_home = self.find_closest_home(ant, home)
                 if closest_home:
                     path = self.calculate_path(ant, closest_home)
@@ -231,37 +260,22 @@ class AsyncBattleClient:
                         })
                         continue
         
-        # 3. СБОР РЕСУРСОВ - умное распределение
+        # 3. СБОР РЕСУРСОВ - все свободные рабочие одним назначением по стоимости пути
         workers = [ant for ant in ants if ant['type'] == 0 and 
                   ant.get('food', {}).get('amount', 0) == 0]
-        
-        # Сортируем ресурсы по ценности
-        sorted_food = sorted(food, key=lambda f: self.get_food_value(f), reverse=True)
-        
-        assigned_workers = 0
-        for food_item in sorted_food:
-            if assigned_workers >= len(workers):
-                break
-                
-            # Находим ближайшего свободного рабочего
-            available_workers = [w for w in workers[assigned_workers:]]
-            if not available_workers:
-                break
-                
-            closest_worker = min(available_workers, 
-                               key=lambda w: self.hex_distance(w, food_item))
-            
-            path = self.calculate_path(closest_worker, food_item)
-            if path:
+        food_plan = plan_food(self.strategy.food_assigner, workers, food, self.world.graph,
+                              self.world.cost_of, index.home, home_field)
+        for worker in workers:
+            choice = food_plan.get(worker['id'])
+            if choice and len(choice[1]) > 1:
                 moves.append({
-                    'ant': closest_worker['id'],
-                    'path': path
+                    'ant': worker['id'],
+                    'path': choice[1][1:4]
                 })
-                assigned_workers += 1
         
         # 4. РАЗВЕДКА для оставшихся муравьев
-        remaining_ants = [ant for ant in ants if ant['id'] not in 
-                         [m['ant'] for m in moves if 'ant' in m]]
+        moved_ids = {m['ant'] for m in moves if 'ant' in m}
+        remaining_ants = [ant for ant in ants if ant['id'] not in moved_ids]
         
         for ant in remaining_ants[:5]:  # Ограничиваем количество
             explore_target = self.get_exploration_target(ant, home)
@@ -289,16 +303,14 @@ class AsyncBattleClient:
         if not home_coords:
             return None
             
-        return min(home_coords, key=lambda h: self.hex_distance(ant, h))
+        return home_coords[nearest_index((ant['q'], ant['r']), home_coords)]
     
     def hex_distance(self, pos1, pos2):
         """Расстояние между гексами"""
-        q1, r1 = pos1.get('q', 0), pos1.get('r', 0)
-        q2, r2 = pos2.get('q', 0), pos2.get('r', 0)
-        return (abs(q1 - q2) + abs(q1 + r1 - q2 - r2) + abs(r1 - r2)) / 2
+        return hex_distance((pos1.get('q', 0), pos1.get('r', 0)), (pos2.get('q', 0), pos2.get('r', 0)))
     
     def calculate_path(self, ant, target, max_steps=3):
-        """Простой расчет пути"""
+        """Простой расчет пути (упакованные ключи гексов)"""
         ant_q, ant_r = ant['q'], ant['r']
         target_q, target_r = target['q'], target['r']
         
@@ -321,10 +333,10 @@ class AsyncBattleClient:
                 step_q = current_q
                 step_r = current_r + (1 if dr > 0 else -1)
             
-            path.append({'q': step_q, 'r': step_r})
+            path.append(pack(step_q, step_r))
             current_q, current_r = step_q, step_r
         
-        return path if path else [{'q': ant_q, 'r': ant_r}]
+        return path if path else [pack(ant_q, ant_r)]
     
     def get_exploration_target(self, ant, home_coords):
         """Цель для разведки"""
@@ -341,79 +353,30 @@ class AsyncBattleClient:
         
         return {'q': target_q, 'r': target_r}
 
-async def main_improved_battle():
+async def main_improved_battle(use_test_server=True):
     """ГЛАВНАЯ АСИНХРОННАЯ ФУНКЦИЯ БИТВЫ"""
     print("🚀 ЗАПУСК УЛУЧШЕННОЙ АСИНХРОННОЙ СИСТЕМЫ")
     print("💪 Команда MACAN team: исправлены все проблемы!")
     print("=" * 60)
     
-    async with AsyncBattleClient() as client:
-        turn_count = 0
-        last_score = 0
+    async with AsyncBattleClient(use_test_server) as client:
+        # Получение, разбор, планирование и отправка идут одновременно
+        pipeline = TurnPipeline(client.turn_clock.sleep_time, client.fetch_snapshot,
+                                client.prepare_snapshot, client.plan_snapshot, client.send_planned)
         
-        while turn_count < 1000:
-            turn_start = time.time()
-            
-            # Получаем данные арены
-            arena_data = await client.get_arena_async()
-            if not arena_data:
-                await asyncio.sleep(1)
-                continue
-            
-            # Проверяем окончание
-            next_turn_in = arena_data.get('nextTurnIn', 0)
-            if next_turn_in <= 0:
-                print("🏁 РАУНД ЗАВЕРШЕН!")
-                break
-            
-            # Анализируем проблемы
-            problems = client.strategy.analyze_logs_problems(arena_data)
-            
-            # Получаем текущее состояние
-            ants = arena_data.get('ants', [])
-            score = arena_data.get('score', 0)
-            nectar = arena_data.get('nectar', 0)
-            food = arena_data.get('food', [])
-            
-            print(f"\n=== ХОД {turn_count + 1} ===")
-            print(f"Муравьи: {len(ants)} | Счет: {score} | Нектар: {nectar} | Ресурсы: {len(food)}")
-            
-            if problems:
-                print(f"⚠️ Проблемы: {', '.join(problems)}")
-            
-            # Планируем стратегию
-            moves = client.plan_resource_focused_strategy(arena_data)
-            
-            # Разрешаем конфликты
-            resolved_moves = client.strategy.resolve_position_conflicts(moves, ants)
-            
-            # Отправляем команды
-            if resolved_moves:
-                result = await client.send_moves_async(resolved_moves)
-                if result:
-                    print(f"✅ Отправлено {len(resolved_moves)} команд")
-                    
-                    # Отслеживаем заблокированных муравьев
-                    blocked_count = len(moves) - len(resolved_moves)
-                    if blocked_count > 0:
-                        print(f"⚠️ Разрешено {blocked_count} конфликтов")
-                else:
-                    print("❌ Ошибка отправки команд")
-            else:
-                print("⚠️ Нет команд для отправки")
-            
-            # Статистика прогресса
-            if score > last_score:
-                print(f"📈 Счет вырос: {last_score} → {score}")
-                last_score = score
-            
-            turn_count += 1
-            client.strategy.turn_count = turn_count
-            
-            # Адаптивная пауза
-            execution_time = time.time() - turn_start
-            sleep_time = max(0.1, next_turn_in - execution_time - 0.1)
-            await asyncio.sleep(sleep_time)
+        async def report():
+            while True:
+                await asyncio.sleep(REPORT_INTERVAL)
+                print(f"⏱️ {client.turn_clock.summary()}")
+                print(f"🧵 {pipeline.stats.summary()}")
+        
+        reporter = asyncio.create_task(report())
+        try:
+            await pipeline.run()
+        finally:
+            reporter.cancel()
+        print(f"⏱️ {client.turn_clock.summary()}")
+        print(f"🧵 {pipeline.stats.summary()}")
 
 if __name__ == "__main__":
     print("🔥 УЛУЧШЕННАЯ СИСТЕМА BATTLE START")
@@ -421,4 +384,5 @@ if __name__ == "__main__":
     print("⚡ Асинхронность для скорости")
     print("🛠️ Исправлены все проблемы из логов")
     
-    asyncio.run(main_improved_battle())
+    # --prod - боевой сервер, как у config.py
+    asyncio.run(main_improved_battle(use_test_server="--prod" not in sys.argv))
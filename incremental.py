@@ -0,0 +1,192 @@
+"""
+Инкрементальное перепланирование (D* Lite).
+
+Для муравьев, чья цель сохраняется между ходами, состояние поиска хранится
+и на следующем ходу только чинится: пересчитываются лишь вершины рядом
+с гексами, стоимость которых изменилась в последнем ответе /arena.
+Поиск идет от цели к муравью, поэтому перемещение муравья дешево.
+"""
+
+from heapq import heappush, heappop
+from typing import Dict, Iterable, List, Mapping, Optional, Set
+
+from hexgeo import NEIGHBOR_DELTAS, HexKey, key_distance
+
+INF = float('inf')
+
+# Запас области поиска вокруг отрезка муравей-цель (в гексах)
+DSTAR_REGION_MARGIN = 8
+# Максимум раскрытий за один пересчет
+DSTAR_MAX_EXPANSIONS = 4000
+
+
+class DStarLite:
+    """Состояние D* Lite для одного муравья и одной цели"""
+
+    def __init__(self, start: HexKey, goal: HexKey, known_costs: Mapping[HexKey, Optional[int]],
+                 margin: int = DSTAR_REGION_MARGIN):
+        self.start = start
+        self.goal = goal
+        self.known_costs = known_costs
+        # Область фиксируется при создании: иначе стоимости менялись бы без уведомлений
+        self.anchor = start
+        self.region_size = key_distance(start, goal) + 2 * margin
+        self.km = 0
+        self.g: Dict[HexKey, float] = {}
+        self.rhs: Dict[HexKey, float] = {goal: 0}
+        self.queue = []
+        self.queued: Dict[HexKey, tuple] = {}
+        self._push(goal, self._key(goal))
+
+    def in_region(self, pos: HexKey) -> bool:
+        """Входит ли гекс в область поиска (эллипс вокруг муравья и цели)"""
+        return key_distance(pos, self.anchor) + key_distance(pos, self.goal) <= self.region_size
+
+    def cost_of(self, pos: HexKey) -> Optional[int]:
+        """Стоимость входа на гекс (None - непроходим или вне области)"""
+        if not self.in_region(pos):
+            return None
+        return self.known_costs.get(pos, 1)
+
+    def _key(self, pos: HexKey) -> tuple:
+        best = min(self.g.get(pos, INF), self.rhs.get(pos, INF))
+        return (best + key_distance(self.start, pos) + self.km, best)
+
+    def _push(self, pos: HexKey, key: tuple):
+        self.queued[pos] = key
+        heappush(self.queue, (key, pos))
+
+    def _top(self):
+        """Верхний актуальный элемент очереди (устаревшие записи выбрасываются)"""
+        queue = self.queue
+        while queue:
+            key, pos = queue[0]
+            if self.queued.get(pos) == key:
+                return key, pos
+            heappop(queue)
+        return None
+
+    def _update_vertex(self, pos: HexKey):
+        if pos != self.goal:
+            best = INF
+            for delta in NEIGHBOR_DELTAS:
+                neighbor = pos + delta
+                step_cost = self.cost_of(neighbor)
+                if step_cost is None:
+                    continue
+                value = step_cost + self.g.get(neighbor, INF)
+                if value < best:
+                    best = value
+            self.rhs[pos] = best
+        self.queued.pop(pos, None)
+        if self.g.get(pos, INF) != self.rhs.get(pos, INF):
+            self._push(pos, self._key(pos))
+
+    def _update_predecessors(self, pos: HexKey):
+        for delta in NEIGHBOR_DELTAS:
+            neighbor = pos + delta
+            if self.cost_of(neighbor) is not None:
+                self._update_vertex(neighbor)
+
+    def compute(self, max_expansions: int = DSTAR_MAX_EXPANSIONS) -> bool:
+        """Пересчет кратчайшего пути; False - лимит раскрытий исчерпан"""
+        expansions = 0
+        while True:
+            top = self._top()
+            start_key = self._key(self.start)
+            if top is None or (top[0] >= start_key and
+                               self.rhs.get(self.start, INF) == self.g.get(self.start, INF)):
+                return True
+            if expansions >= max_expansions:
+                return False
+            expansions += 1
+
+            old_key, pos = top
+            new_key = self._key(pos)
+            g_value = self.g.get(pos, INF)
+            rhs_value = self.rhs.get(pos, INF)
+            if old_key < new_key:
+                self._push(pos, new_key)
+            elif g_value > rhs_value:
+                self.g[pos] = rhs_value
+                self.queued.pop(pos, None)
+                self._update_predecessors(pos)
+            else:
+                self.g[pos] = INF
+                self._update_vertex(pos)
+                self._update_predecessors(pos)
+
+    def move_start(self, new_start: HexKey):
+        """Муравей сдвинулся: корректируем ключи через km"""
+        if new_start != self.start:
+            self.km += key_distance(self.start, new_start)
+            self.start = new_start
+
+    def notify_changed(self, positions: Iterable[HexKey]):
+        """Стоимость входа на гексы изменилась: чиним только их соседей"""
+        for pos in positions:
+            if not self.in_region(pos):
+                continue
+            self._update_predecessors(pos)
+            self._update_vertex(pos)
+
+    def path(self, max_steps: Optional[int] = None) -> List[HexKey]:
+        """Путь от муравья к цели по значениям g (начиная с позиции муравья)"""
+        path = [self.start]
+        current = self.start
+        visited = {current}
+        while current != self.goal and (max_steps is None or len(path) <= max_steps):
+            best = None
+            best_value = INF
+            for delta in NEIGHBOR_DELTAS:
+                neighbor = current + delta
+                step_cost = self.cost_of(neighbor)
+                if step_cost is None or neighbor in visited:
+                    continue
+                value = step_cost + self.g.get(neighbor, INF)
+                if value < best_value:
+                    best_value = value
+                    best = neighbor
+            if best is None or best_value == INF:
+                break
+            path.append(best)
+            visited.add(best)
+            current = best
+        return path
+
+
+class IncrementalPlanner:
+    """Хранилище состояний D* Lite по муравьям поверх известной карты весов"""
+
+    def __init__(self, known_costs: Mapping[HexKey, Optional[int]]):
+        self.known_costs = known_costs
+        self.states: Dict[str, DStarLite] = {}
+        self.repairs = 0
+
+    def notify_changed(self, changed: Set[HexKey]):
+        """Чиним сохраненные состояния только по гексам с изменившимся весом"""
+        if changed:
+            for state in self.states.values():
+                state.notify_changed(changed)
+                self.repairs += 1
+
+    def forget(self, alive_ids: Iterable[str]):
+        """Удаляем состояния погибших муравьев"""
+        alive = set(alive_ids)
+        for ant_id in [ant_id for ant_id in self.states if ant_id not in alive]:
+            del self.states[ant_id]
+
+    def plan(self, ant_id: str, start: HexKey, goal: HexKey,
+             max_steps: Optional[int] = None) -> Optional[List[HexKey]]:
+        """Путь муравья к цели; None - цель недостижима в области поиска"""
+        state = self.states.get(ant_id)
+        if state is None or state.goal != goal or not state.in_region(start):
+            state = DStarLite(start, goal, self.known_costs)
+            self.states[ant_id] = state
+        else:
+            state.move_start(start)
+
+        if not state.compute() or state.g.get(start, INF) == INF:
+            del self.states[ant_id]
+            return None
+        return state.path(max_steps)
@@ -0,0 +1,332 @@
+"""
+Поиск пути по гексам.
+
+A* с указателями на родителя вместо копирования пути и с корзинной очередью
+(алгоритм Дайала): стоимости гексов маленькие целые числа (1-3), поэтому
+f-стоимость растет монотонно и укладывается в несколько корзин.
+Поиск ограничен по стоимости пути, числу раскрытых узлов и времени;
+если цель недостижима, возвращается лучший частичный путь в ее сторону.
+Гексы - упакованные ключи (hexgeo.pack), соседи - сложение с NEIGHBOR_DELTAS;
+по известной карте те же поиски идут по скомпилированному графу (adjacency).
+"""
+
+import time
+from heapq import heappush, heappop
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from adjacency import HexGraph
+from constants import HEX_ACID, HEX_DIRT, HEX_STONE
+from hexgeo import NEIGHBOR_DELTAS, HexKey, key_distance
+
+CostFn = Callable[[HexKey], Optional[int]]  # None - гекс непроходим
+
+# Ограничения поиска по умолчанию
+PATH_MAX_NODES = 3000      # Максимум раскрытых узлов на один поиск
+PATH_TIME_BUDGET = 0.02    # Секунд на один поиск
+PATH_MAX_STEP_COST = 3     # Максимальная стоимость одного гекса
+_TIME_CHECK_INTERVAL = 256
+
+# Веса гексов для A*: кислоту обходим, грязь дороже пустого гекса
+ASTAR_TERRAIN_WEIGHTS = {
+    HEX_ACID: 3,
+    HEX_DIRT: 2
+}
+
+
+def terrain_cost_fn(terrain: Mapping[HexKey, int]) -> CostFn:
+    """Функция стоимости гекса по карте типов (невидимые гексы стоят 1)"""
+    def cost_of(key):
+        hex_type = terrain.get(key)
+        if hex_type == HEX_STONE:
+            return None
+        return ASTAR_TERRAIN_WEIGHTS.get(hex_type, 1)
+
+    return cost_of
+
+
+def reconstruct_path(parents: Dict[HexKey, Optional[HexKey]], end: HexKey) -> List[HexKey]:
+    """Восстановление пути по указателям на родителя (от старта до end)"""
+    path = []
+    node = end
+    while node is not None:
+        path.append(node)
+        node = parents[node]
+    path.reverse()
+    return path
+
+
+def find_path(start: HexKey, goal: HexKey, cost_of: CostFn,
+              max_cost: Optional[int] = None,
+              max_nodes: int = PATH_MAX_NODES,
+              time_budget: Optional[float] = PATH_TIME_BUDGET,
+              max_step_cost: int = PATH_MAX_STEP_COST) -> List[HexKey]:
+    """
+    A* с корзинной очередью от start до goal.
+
+    cost_of(key) возвращает стоимость входа на гекс (1..max_step_cost) или None
+    для непроходимого гекса. max_cost ограничивает стоимость пути.
+    Возвращает список ключей гексов, начиная со start. Если цель не найдена в пределах
+    ограничений, возвращается путь к раскрытому гексу, ближайшему к цели.
+    """
+    if start == goal:
+        return [start]
+
+    deadline = time.perf_counter() + time_budget if time_budget else None
+
+    # Эвристика согласована (стоимость шага >= 1), поэтому f не убывает и
+    # за один шаг растет максимум на max_step_cost + 1
+    span = max_step_cost + 2
+    buckets: List[List[HexKey]] = [[] for _ in range(span)]
+    h_start = key_distance(start, goal)
+    current_f = h_start
+    buckets[current_f % span].append(start)
+    queued = 1
+
+    g_costs = {start: 0}
+    parents: Dict[HexKey, Optional[HexKey]] = {start: None}
+    closed = set()
+
+    best_node = start
+    best_key = (h_start, 0)
+    expanded = 0
+
+    while queued:
+        bucket = buckets[current_f % span]
+        if not bucket:
+            current_f += 1
+            continue
+
+        current = bucket.pop()
+        queued -= 1
+        if current in closed:
+            continue
+        g = g_costs[current]
+        if g + key_distance(current, goal) != current_f:
+            continue  # Устаревшая запись, узел уже найден дешевле
+
+        if current == goal:
+            return reconstruct_path(parents, goal)
+
+        closed.add(current)
+        expanded += 1
+
+        h = current_f - g
+        if (h, g) < best_key:
+            best_key = (h, g)
+            best_node = current
+
+        if expanded >= max_nodes:
+            break
+        if deadline is not None and expanded % _TIME_CHECK_INTERVAL == 0 \
+                and time.perf_counter() > deadline:
+            break
+
+        for delta in NEIGHBOR_DELTAS:
+            neighbor = current + delta
+            if neighbor in closed:
+                continue
+            step_cost = cost_of(neighbor)
+            if step_cost is None:
+                continue
+            new_g = g + step_cost
+            if max_cost is not None and new_g > max_cost:
+                continue
+            old_g = g_costs.get(neighbor)
+            if old_g is not None and old_g <= new_g:
+                continue
+            g_costs[neighbor] = new_g
+            parents[neighbor] = current
+            new_f = new_g + key_distance(neighbor, goal)
+            buckets[new_f % span].append(neighbor)
+            queued += 1
+
+    return reconstruct_path(parents, best_node)
+
+
+def dijkstra(start: HexKey, cost_of: CostFn, max_cost: int,
+             targets: Optional[Iterable[HexKey]] = None,
+             max_nodes: int = PATH_MAX_NODES) -> Tuple[Dict[HexKey, int], Dict[HexKey, Optional[HexKey]]]:
+    """
+    Поиск от start ко всем гексам в пределах стоимости max_cost.
+
+    Возвращает (стоимости, родители). Если заданы targets, поиск
+    останавливается, как только все достижимые цели получили точную стоимость.
+    """
+    dist = {start: 0}
+    parents: Dict[HexKey, Optional[HexKey]] = {start: None}
+    remaining = set(targets) if targets is not None else None
+    if remaining is not None:
+        remaining.discard(start)
+    heap = [(0, start)]
+    expanded = 0
+
+    while heap:
+        d, current = heappop(heap)
+        if d > dist[current]:
+            continue
+        if remaining is not None:
+            remaining.discard(current)
+            if not remaining:
+                break
+        expanded += 1
+        if expanded >= max_nodes:
+            break
+
+        for delta in NEIGHBOR_DELTAS:
+            neighbor = current + delta
+            step_cost = cost_of(neighbor)
+            if step_cost is None:
+                continue
+            new_d = d + step_cost
+            if new_d > max_cost:
+                continue
+            old_d = dist.get(neighbor)
+            if old_d is None or new_d < old_d:
+                dist[neighbor] = new_d
+                parents[neighbor] = current
+                heappush(heap, (new_d, neighbor))
+
+    return dist, parents
+
+
+def find_path_graph(graph: HexGraph, start: HexKey, goal: HexKey,
+                    max_cost: Optional[int] = None,
+                    max_nodes: int = PATH_MAX_NODES,
+                    time_budget: Optional[float] = PATH_TIME_BUDGET,
+                    max_step_cost: int = PATH_MAX_STEP_COST) -> Optional[List[HexKey]]:
+    """
+    Тот же A*, что find_path, но по скомпилированному графу соседства.
+
+    Соседи и веса читаются из готовых строк графа. Возвращает None, если
+    start или goal нет в графе (тогда нужен find_path по ключам).
+    """
+    index = graph.index
+    start_node = index.get(start)
+    goal_node = index.get(goal)
+    if start_node is None or goal_node is None:
+        return None
+    if start == goal:
+        return [start]
+
+    keys = graph.keys
+    rows = graph.rows
+    weights = graph.weights
+    deadline = time.perf_counter() + time_budget if time_budget else None
+
+    span = max_step_cost + 2
+    buckets: List[List[int]] = [[] for _ in range(span)]
+    h_start = key_distance(start, goal)
+    current_f = h_start
+    buckets[current_f % span].append(start_node)
+    queued = 1
+
+    g_costs = {start_node: 0}
+    parents: Dict[int, Optional[int]] = {start_node: None}
+    closed = set()
+
+    best_node = start_node
+    best_key = (h_start, 0)
+    expanded = 0
+
+    while queued:
+        bucket = buckets[current_f % span]
+        if not bucket:
+            current_f += 1
+            continue
+
+        current = bucket.pop()
+        queued -= 1
+        if current in closed:
+            continue
+        g = g_costs[current]
+        h = key_distance(keys[current], goal)
+        if g + h != current_f:
+            continue
+
+        if current == goal_node:
+            best_node = current
+            break
+
+        closed.add(current)
+        expanded += 1
+
+        if (h, g) < best_key:
+            best_key = (h, g)
+            best_node = current
+
+        if expanded >= max_nodes:
+            break
+        if deadline is not None and expanded % _TIME_CHECK_INTERVAL == 0 \
+                and time.perf_counter() > deadline:
+            break
+
+        for neighbor in rows[current]:
+            if neighbor in closed:
+                continue
+            new_g = g + weights[neighbor]
+            if max_cost is not None and new_g > max_cost:
+                continue
+            old_g = g_costs.get(neighbor)
+            if old_g is not None and old_g <= new_g:
+                continue
+            g_costs[neighbor] = new_g
+            parents[neighbor] = current
+            buckets[(new_g + key_distance(keys[neighbor], goal)) % span].append(neighbor)
+            queued += 1
+
+    path = []
+    node = best_node
+    while node is not None:
+        path.append(keys[node])
+        node = parents[node]
+    path.reverse()
+    return path
+
+
+def dijkstra_graph(graph: HexGraph, start: HexKey, max_cost: int,
+                   targets: Optional[Iterable[HexKey]] = None,
+                   max_nodes: int = PATH_MAX_NODES
+                   ) -> Optional[Tuple[Dict[HexKey, int], Dict[HexKey, Optional[HexKey]]]]:
+    """dijkstra по скомпилированному графу; None - start нет в графе"""
+    index = graph.index
+    start_node = index.get(start)
+    if start_node is None:
+        return None
+
+    rows = graph.rows
+    weights = graph.weights
+    dist = {start_node: 0}
+    parents: Dict[int, Optional[int]] = {start_node: None}
+    remaining = None
+    if targets is not None:
+        # Цели вне графа недостижимы по нему и не держат поиск
+        remaining = {index[target] for target in targets if target in index}
+        remaining.discard(start_node)
+    heap = [(0, start_node)]
+    expanded = 0
+
+    while heap:
+        d, current = heappop(heap)
+        if d > dist[current]:
+            continue
+        if remaining is not None:
+            remaining.discard(current)
+            if not remaining:
+                break
+        expanded += 1
+        if expanded >= max_nodes:
+            break
+
+        for neighbor in rows[current]:
+            new_d = d + weights[neighbor]
+            if new_d > max_cost:
+                continue
+            old_d = dist.get(neighbor)
+            if old_d is None or new_d < old_d:
+                dist[neighbor] = new_d
+                parents[neighbor] = current
+                heappush(heap, (new_d, neighbor))
+
+    keys = graph.keys
+    return ({keys[node]: d for node, d in dist.items()},
+            {keys[node]: (None if parent is None else keys[parent]) for node, parent in parents.items()})
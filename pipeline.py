@@ -0,0 +1,132 @@
+"""
+Конвейер хода: получение -> подготовка -> планирование -> отправка.
+
+Стадии работают одновременно и связаны очередями на один элемент: пока
+команды хода N уходят по сети, снимок хода N+1 уже разбирается, индексируется
+и планируется. Подготовка и планирование - синхронный код, они идут в
+отдельных потоках и не блокируют цикл asyncio. Если планирование не
+успевает, ждущий снимок заменяется более свежим: старый ход уже не спасти.
+Задержка каждой стадии считается отдельно.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from transport import LatencyStats
+
+STOP = object()                # Конец раунда: стадии завершаются по цепочке
+PIPELINE_STAGES = ('fetch', 'prepare', 'plan', 'send')
+
+
+class StageStats:
+    """Задержки стадий конвейера и сброшенные устаревшие элементы"""
+
+    def __init__(self):
+        self.latency: Dict[str, LatencyStats] = {stage: LatencyStats() for stage in PIPELINE_STAGES}
+        self.dropped = 0
+
+    def add(self, stage: str, seconds: float):
+        self.latency[stage].add(seconds)
+
+    def summary(self) -> str:
+        """p50/p95 по стадиям для логов"""
+        parts = []
+        for stage, stats in self.latency.items():
+            p50, p95 = stats.percentile(50), stats.percentile(95)
+            if p50 is not None:
+                parts.append(f"{stage} {p50 * 1000:.0f}/{p95 * 1000:.0f}")
+        return f"Стадии p50/p95, мс: {' | '.join(parts) or 'нет данных'} | Сброшено: {self.dropped}"
+
+
+async def put_latest(queue: asyncio.Queue, item: Any) -> bool:
+    """Кладем элемент, вытесняя неразобранный старый; True - старый сброшен"""
+    dropped = False
+    if queue.full():
+        try:
+            queue.get_nowait()
+            dropped = True
+        except asyncio.QueueEmpty:
+            pass
+    await queue.put(item)
+    return dropped
+
+
+class TurnPipeline:
+    """Четыре стадии хода, связанные ограниченными очередями
+
+    pause   - sync, сколько ждать до следующего запроса снимка (часы хода);
+    fetch   - async, получает снимок (None - пропуск, STOP - конец);
+    prepare - sync, разбор снимка (столбцы, индекс);
+    plan    - sync, планирование хода (None - отправлять нечего);
+    send    - async, отправка команд.
+    """
+
+    def __init__(self, pause: Callable[[], float], fetch: Callable[[], Awaitable[Any]],
+                 prepare: Callable[[Any], Any], plan: Callable[[Any], Any],
+                 send: Callable[[Any], Awaitable[Any]], executor: Optional[ThreadPoolExecutor] = None):
+        self.pause = pause
+        self.fetch = fetch
+        self.prepare = prepare
+        self.plan = plan
+        self.send = send
+        # Подготовка и планирование - по своему потоку, чтобы шли одновременно
+        self.executor = executor if executor is not None else ThreadPoolExecutor(max_workers=2)
+        self.stats = StageStats()
+
+    async def _fetch_stage(self, out: asyncio.Queue):
+        while True:
+            await asyncio.sleep(self.pause())
+            started = time.monotonic()
+            item = await self.fetch()
+            if item is STOP:
+                # STOP ждет своей очереди и ничего не вытесняет
+                await out.put(STOP)
+                return
+            if item is None:
+                continue
+            self.stats.add('fetch', time.monotonic() - started)
+            if await put_latest(out, item):
+                self.stats.dropped += 1
+
+    async def _sync_stage(self, name: str, func: Callable[[Any], Any],
+                          source: asyncio.Queue, out: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await source.get()
+            if item is STOP:
+                await out.put(STOP)
+                return
+            started = time.monotonic()
+            try:
+                result = await loop.run_in_executor(self.executor, func, item)
+            except Exception as e:
+                print(f"❌ Ошибка стадии {name}: {e}")
+                continue
+            self.stats.add(name, time.monotonic() - started)
+            if result is not None and await put_latest(out, result):
+                self.stats.dropped += 1
+
+    async def _send_stage(self, source: asyncio.Queue):
+        while True:
+            item = await source.get()
+            if item is STOP:
+                return
+            started = time.monotonic()
+            try:
+                await self.send(item)
+            except Exception as e:
+                print(f"❌ Ошибка стадии send: {e}")
+                continue
+            self.stats.add('send', time.monotonic() - started)
+
+    async def run(self):
+        """Запускаем стадии и ждем конца раунда"""
+        fetched, prepared, planned = asyncio.Queue(1), asyncio.Queue(1), asyncio.Queue(1)
+        await asyncio.gather(
+            self._fetch_stage(fetched),
+            self._sync_stage('prepare', self.prepare, fetched, prepared),
+            self._sync_stage('plan', self.plan, prepared, planned),
+            self._send_stage(planned),
+        )
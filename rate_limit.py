@@ -0,0 +1,190 @@
+"""
+Общий лимит запросов (3 RPS) на один токен.
+
+Корзина токенов хранится в файле во временной папке и защищена файловой
+блокировкой, поэтому ее делят все потоки и все локальные процессы с тем же
+токеном: бот, визуализатор, проверки. Запросы делятся на классы приоритета:
+пока ждет запрос более высокого класса (/move), более низкие (/arena,
+/logs, визуализатор) токен не получают.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Классы приоритета: меньше - важнее
+PRIORITY_MOVE = 0              # /move
+PRIORITY_ARENA = 1             # /arena, /register
+PRIORITY_BACKGROUND = 2        # /logs, /rounds, визуализатор
+
+RATE_LIMIT_RPS = 2.9           # Чуть меньше 3 RPS сервера: запас на неточность часов
+RATE_LIMIT_BURST = 1           # Без всплесков: в любом окне 1 с не больше 3 запросов
+RATE_LIMIT_POLL = 0.02         # Как часто ждущий запрос проверяет корзину, секунд
+WAITER_TTL = 1.0               # Через сколько забываем ожидающего из упавшего процесса
+
+# Сколько ждем токен по умолчанию для каждого класса, секунд
+ACQUIRE_TIMEOUTS = {
+    PRIORITY_MOVE: 1.0,
+    PRIORITY_ARENA: 2.0,
+    PRIORITY_BACKGROUND: 5.0
+}
+
+
+class RateLimitTimeout(requests.RequestException):
+    """Токен не получен вовремя (ловится там же, где ошибки requests)"""
+
+
+class _FileLock:
+    """Эксклюзивная блокировка файла между процессами"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        self.file = open(self.path, 'a+')
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        else:
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+        return self.file
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+            else:
+                self.file.seek(0)
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.file.close()
+            self.file = None
+
+
+class RateLimiter:
+    """Корзина токенов в файле, общая для потоков и процессов"""
+
+    def __init__(self, path: str, rate: float = RATE_LIMIT_RPS, burst: int = RATE_LIMIT_BURST):
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self.thread_lock = threading.Lock()
+        self.file_lock = _FileLock(path + '.lock')
+        self.acquired: Dict[int, int] = {PRIORITY_MOVE: 0, PRIORITY_ARENA: 0, PRIORITY_BACKGROUND: 0}
+        self.waited = 0.0              # Суммарное ожидание токенов в этом процессе, секунд
+
+    def _load(self, now: float) -> Dict:
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        tokens = state.get('tokens', self.burst)
+        stamp = state.get('stamp', now)
+        # Пополнение за прошедшее время (часы разных процессов общие - time.time)
+        state['tokens'] = min(self.burst, tokens + max(0.0, now - stamp) * self.rate)
+        state['stamp'] = now
+        state['waiters'] = {key: value for key, value in state.get('waiters', {}).items()
+                            if value[1] > now}
+        return state
+
+    def _save(self, state: Dict):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def _try_acquire(self, priority: int, waiter: str) -> float:
+        """Одна попытка взять токен: 0 - получен, иначе сколько подождать до следующей"""
+        with self.thread_lock, self.file_lock:
+            now = time.time()
+            state = self._load(now)
+            waiters = state['waiters']
+            ahead = any(other_priority < priority for key, (other_priority, _) in waiters.items()
+                        if key != waiter)
+            if not ahead and state['tokens'] >= 1:
+                state['tokens'] -= 1
+                waiters.pop(waiter, None)
+                self._save(state)
+                self.acquired[priority] += 1
+                return 0.0
+            # Встаем в очередь, чтобы менее важные запросы пропускали нас
+            waiters[waiter] = [priority, now + WAITER_TTL]
+            self._save(state)
+            if ahead or state['tokens'] >= 1:
+                return RATE_LIMIT_POLL
+            return max(RATE_LIMIT_POLL, (1 - state['tokens']) / self.rate)
+
+    def _forget(self, waiter: str):
+        with self.thread_lock, self.file_lock:
+            state = self._load(time.time())
+            if state['waiters'].pop(waiter, None) is not None:
+                self._save(state)
+
+    @staticmethod
+    def _waiter_id() -> str:
+        """Уникальный номер ожидающего запроса среди всех процессов"""
+        return f"{os.getpid()}-{next(_waiter_ids)}"
+
+    def acquire(self, priority: int = PRIORITY_BACKGROUND, timeout: Optional[float] = None):
+        """Ждем токен (блокирующе); RateLimitTimeout - не дождались за timeout секунд"""
+        if timeout is None:
+            timeout = ACQUIRE_TIMEOUTS.get(priority, ACQUIRE_TIMEOUTS[PRIORITY_BACKGROUND])
+        waiter = self._waiter_id()
+        started = time.monotonic()
+        while True:
+            wait = self._try_acquire(priority, waiter)
+            if wait == 0:
+                self.waited += time.monotonic() - started
+                return
+            if time.monotonic() - started + wait > timeout:
+                self._forget(waiter)
+                raise RateLimitTimeout(f"Лимит запросов: токен не получен за {timeout:.1f} с")
+            time.sleep(wait)
+
+    async def acquire_async(self, priority: int = PRIORITY_BACKGROUND, timeout: Optional[float] = None):
+        """То же ожидание токена, но без блокировки цикла asyncio"""
+        if timeout is None:
+            timeout = ACQUIRE_TIMEOUTS.get(priority, ACQUIRE_TIMEOUTS[PRIORITY_BACKGROUND])
+        waiter = self._waiter_id()
+        started = time.monotonic()
+        while True:
+            wait = self._try_acquire(priority, waiter)
+            if wait == 0:
+                self.waited += time.monotonic() - started
+                return
+            if time.monotonic() - started + wait > timeout:
+                self._forget(waiter)
+                raise RateLimitTimeout(f"Лимит запросов: токен не получен за {timeout:.1f} с")
+            await asyncio.sleep(wait)
+
+
+_waiter_ids = itertools.count()
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def shared_limiter(token: Optional[str]) -> RateLimiter:
+    """Лимитер токена: один объект на процесс, один файл корзины на машину"""
+    digest = hashlib.sha1((token or '').encode()).hexdigest()[:12]
+    with _limiters_lock:
+        limiter = _limiters.get(digest)
+        if limiter is None:
+            path = os.path.join(tempfile.gettempdir(), f"datspulse_rate_{digest}.json")
+            limiter = _limiters[digest] = RateLimiter(path)
+        return limiter
@@ -0,0 +1,132 @@
+"""
+Согласованное движение муравьев по таблице резервирований (гекс, шаг).
+
+Муравьи ставятся в таблицу по очереди в порядке приоритета. Путь каждого
+проверяется по уже занятым парам (гекс, шаг) муравьев того же типа и по
+гексам врагов: при конфликте путь обрезается или муравей отступает на
+свободный соседний гекс. Итоговые команды не конфликтуют по построению,
+вместо того чтобы отменяться после проверки.
+"""
+
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from arena_index import ArenaIndex
+from hexgeo import KEY_BITS, NEIGHBOR_DELTAS, HexKey, key_distance, pack_dict
+from pathfinding import CostFn
+
+Slot = int  # Тип муравья и гекс в одном числе: (тип << 2 * KEY_BITS) | ключ гекса
+_TYPE_SHIFT = 2 * KEY_BITS
+
+
+def slot_of(ant_type: int, key: HexKey) -> Slot:
+    """Ячейка таблицы для муравья типа ant_type на гексе key"""
+    return (ant_type << _TYPE_SHIFT) | key
+
+
+class ReservationTable:
+    """Занятость гексов по шагам хода отдельно для каждого типа муравьев"""
+
+    def __init__(self, enemy_positions: Iterable[HexKey], cost_of: CostFn):
+        self.enemies = frozenset(enemy_positions)  # Занятость врагами на этот ход
+        self.cost_of = cost_of
+        self.steps: Dict[Slot, Dict[int, str]] = defaultdict(dict)
+        self.parked: Dict[Slot, Tuple[int, str]] = {}  # Где муравей стоит с шага до конца хода
+        self.pending: Dict[Slot, Set[str]] = defaultdict(set)  # Старты еще не поставленных муравьев
+
+    def add_pending(self, ant_id: str, ant_type: int, pos: HexKey):
+        """Муравей пока стоит на pos: чужой путь не может на этом гексе закончиться"""
+        self.pending[slot_of(ant_type, pos)].add(ant_id)
+
+    def is_free(self, ant_id: str, ant_type: int, pos: HexKey, step: int) -> bool:
+        """Можно ли быть на гексе на шаге step"""
+        if pos in self.enemies:
+            return False
+        key = slot_of(ant_type, pos)
+        other = self.steps[key].get(step) if key in self.steps else None
+        if other is not None and other != ant_id:
+            return False
+        parked = self.parked.get(key)
+        return parked is None or parked[1] == ant_id or parked[0] > step
+
+    def can_park(self, ant_id: str, ant_type: int, pos: HexKey, step: int) -> bool:
+        """Можно ли остаться на гексе с шага step до конца хода"""
+        if not self.is_free(ant_id, ant_type, pos, step):
+            return False
+        key = slot_of(ant_type, pos)
+        if self.pending.get(key, set()) - {ant_id}:
+            return False
+        later = self.steps.get(key, {})
+        return all(s <= step or other == ant_id for s, other in later.items())
+
+    def sidestep(self, ant_id: str, ant_type: int, pos: HexKey,
+                 toward: Optional[HexKey] = None, forced: bool = False) -> Optional[HexKey]:
+        """Свободный соседний гекс, ближайший к toward; без forced - не дальше от цели, чем pos"""
+        best = None
+        best_distance = None
+        limit = key_distance(pos, toward) if toward is not None and not forced else None
+        for delta in NEIGHBOR_DELTAS:
+            neighbor = pos + delta
+            if self.cost_of(neighbor) is None or not self.can_park(ant_id, ant_type, neighbor, 1):
+                continue
+            distance = key_distance(neighbor, toward) if toward is not None else 0
+            if limit is not None and distance > limit:
+                continue
+            if best is None or distance < best_distance:
+                best, best_distance = neighbor, distance
+        return best
+
+    def reserve(self, ant_id: str, ant_type: int, path: List[HexKey]) -> List[HexKey]:
+        """Ставим путь (path[0] - текущая позиция) и возвращаем его бесконфликтную часть"""
+        start = path[0]
+        self.pending.get(slot_of(ant_type, start), set()).discard(ant_id)
+
+        fitted = [start]
+        for step, pos in enumerate(path[1:], 1):
+            if not self.is_free(ant_id, ant_type, pos, step):
+                break
+            fitted.append(pos)
+
+        # Отступаем назад до гекса, на котором можно стоять до конца хода
+        while len(fitted) > 1 and not self.can_park(ant_id, ant_type, fitted[-1], len(fitted) - 1):
+            fitted.pop()
+
+        if len(fitted) == 1 and len(path) > 1:
+            # Путь перекрыт с первого шага: пробуем обойти по соседнему гексу
+            side = self.sidestep(ant_id, ant_type, start, path[-1])
+            if side is not None:
+                fitted.append(side)
+        if len(fitted) == 1 and not self.can_park(ant_id, ant_type, start, 0):
+            # Стоять нельзя (гекс нужен более приоритетному муравью) - уходим в сторону
+            side = self.sidestep(ant_id, ant_type, start, path[-1], forced=True)
+            if side is not None:
+                fitted.append(side)
+
+        for step, pos in enumerate(fitted):
+            self.steps[slot_of(ant_type, pos)][step] = ant_id
+        self.parked[slot_of(ant_type, fitted[-1])] = (len(fitted) - 1, ant_id)
+        return fitted
+
+
+def resolve_moves(moves: List[Dict], index: ArenaIndex, priority: Callable[[Dict], float]) -> List[Dict]:
+    """Команды в порядке приоритета через таблицу резервирований (пути обрезаются, а не отменяются)
+
+    Пути команд - списки упакованных ключей гексов (без текущей позиции муравья).
+    """
+    # Обходить разрешаем только по видимым проходимым гексам
+    table = ReservationTable(index.enemies_by_pos, index.costs.get)
+    for ant in index.ants_by_id.values():
+        table.add_pending(ant['id'], ant['type'], pack_dict(ant))
+
+    planned = [(index.ant(move['ant']), move) for move in moves if index.ant(move.get('ant'))]
+    planned.sort(key=lambda item: priority(item[0]), reverse=True)
+
+    resolved = []
+    for ant, move in planned:
+        path = [pack_dict(ant)] + list(move.get('path', []))
+        fitted = table.reserve(ant['id'], ant['type'], path)
+        if len(fitted) > 1:
+            resolved.append({'ant': ant['id'], 'path': fitted[1:]})
+        if len(fitted) < len(path):
+            print(f"Предупреждение: путь муравья {ant['id'][:8]} сокращен до {len(fitted) - 1} шагов")
+    return resolved
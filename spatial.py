@@ -0,0 +1,90 @@
+"""
+Пространственный хеш по гексам.
+
+Объекты (враги, ресурсы, наши муравьи) раскладываются по квадратным
+ячейкам 2^shift x 2^shift в осевых координатах. Запросы "в радиусе" и
+"k ближайших" смотрят только ячейки рядом с центром, а не весь список.
+Индекс строится за один проход, один раз на ход.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from hexgeo import HexKey, key_distance, pack, unpack
+
+SPATIAL_CELL_SHIFT = 2         # Ячейка 4 x 4 гекса
+
+Entry = Tuple[HexKey, Any]
+
+
+class SpatialIndex:
+    """Объекты по ячейкам хеша с запросами по расстоянию на гексах"""
+
+    __slots__ = ('shift', 'cells', 'size')
+
+    def __init__(self, entries: Iterable[Entry], shift: int = SPATIAL_CELL_SHIFT):
+        self.shift = shift
+        self.cells: Dict[HexKey, List[Entry]] = {}
+        self.size = 0
+        for key, item in entries:
+            q, r = unpack(key)
+            self.cells.setdefault(pack(q >> shift, r >> shift), []).append((key, item))
+            self.size += 1
+
+    def __len__(self) -> int:
+        return self.size
+
+    def within(self, center: HexKey, radius: int) -> List[Tuple[int, Any]]:
+        """Объекты на расстоянии не больше radius: (расстояние, объект), без сортировки"""
+        if not self.size:
+            return []
+        shift = self.shift
+        q, r = unpack(center)
+        found = []
+        for cell_q in range((q - radius) >> shift, ((q + radius) >> shift) + 1):
+            for cell_r in range((r - radius) >> shift, ((r + radius) >> shift) + 1):
+                for key, item in self.cells.get(pack(cell_q, cell_r), ()):
+                    distance = key_distance(center, key)
+                    if distance <= radius:
+                        found.append((distance, item))
+        return found
+
+    def count_within(self, center: HexKey, radius: int,
+                     where: Optional[Callable[[Any], bool]] = None) -> int:
+        """Сколько объектов в радиусе (where - фильтр по объекту)"""
+        return sum(1 for _, item in self.within(center, radius) if where is None or where(item))
+
+    def nearest(self, center: HexKey, k: int = 1, max_radius: Optional[int] = None) -> List[Tuple[int, Any]]:
+        """k ближайших объектов (расстояние, объект) по возрастанию расстояния
+
+        Ячейки обходятся кольцами вокруг ячейки центра. После кольца b все
+        необойденные объекты дальше b * размер ячейки, поэтому обход
+        останавливается, как только k-й найденный ближе этой границы.
+        """
+        shift = self.shift
+        cell_size = 1 << shift
+        q, r = unpack(center)
+        cell_q, cell_r = q >> shift, r >> shift
+        found = []
+        seen = 0
+        ring = 0
+        while seen < self.size:
+            for dq in range(-ring, ring + 1):
+                # На кольце b полные строки только у краев, в середине - две ячейки
+                step = 1 if abs(dq) == ring else 2 * ring
+                for dr in range(-ring, ring + 1, max(1, step)):
+                    entries = self.cells.get(pack(cell_q + dq, cell_r + dr))
+                    if entries:
+                        seen += len(entries)
+                        found.extend((key_distance(center, key), item) for key, item in entries)
+            bound = ring * cell_size
+            if max_radius is not None and bound >= max_radius:
+                break
+            if len(found) >= k:
+                found.sort(key=lambda pair: pair[0])
+                if found[k - 1][0] <= bound:
+                    break
+            ring += 1
+        found.sort(key=lambda pair: pair[0])
+        if max_radius is not None:
+            found = [pair for pair in found if pair[0] <= max_radius]
+        return found[:k]
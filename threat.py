@@ -0,0 +1,75 @@
+"""
+Тепловая карта угрозы на один ход.
+
+Вместо пересчета кандидаты x враги для каждой позиции поле строится один
+раз на снимок /arena: ядро каждого врага (радиус и сила по типу) и зоны
+атаки вражеских муравейников штампуются по спиральным таблицам смещений.
+Дальше угроза гекса - поиск в словаре, а для поиска пути есть надбавка
+к стоимости гексов под угрозой.
+"""
+
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from constants import ANTHILL_ATTACK_DAMAGE, ANTHILL_ATTACK_RADIUS
+from hexgeo import HexKey, pack_dict, spiral_key_offsets, spiral_key_rings
+from pathfinding import CostFn
+
+THREAT_COST_STEP = 20.0        # Сколько угрозы добавляет единицу стоимости гекса
+THREAT_MAX_EXTRA = 3           # Предел надбавки к стоимости одного гекса
+
+Kernel = Tuple[int, int, float]  # Тип врага, радиус, сила
+
+
+class ThreatField:
+    """Угроза по гексам для одного ответа /arena"""
+
+    def __init__(self, arena_data: Dict, kernels: Iterable[Kernel], anthills: Iterable[HexKey] = ()):
+        self.source = arena_data
+        values: Dict[HexKey, float] = {}
+        kernels = {enemy_type: (radius, strength) for enemy_type, radius, strength in kernels}
+
+        # Ядро врага: сила / (расстояние + 1) в пределах радиуса его типа
+        for enemy in arena_data.get('enemies', []):
+            kernel = kernels.get(enemy['type'])
+            if kernel is None:
+                continue
+            radius, strength = kernel
+            center = pack_dict(enemy)
+            for offset, ring in spiral_key_rings(radius):
+                key = center + offset
+                values[key] = values.get(key, 0.0) + strength / (ring + 1)
+
+        # Муравейник бьет всех в радиусе с одинаковой силой: гекс зоны считаем один раз
+        zone = {hill + offset for hill in anthills for offset in spiral_key_offsets(ANTHILL_ATTACK_RADIUS)}
+        for key in zone:
+            values[key] = values.get(key, 0.0) + ANTHILL_ATTACK_DAMAGE
+
+        self.values = values
+
+    def is_for(self, arena_data: Dict) -> bool:
+        """Построено ли поле именно по этому ответу /arena"""
+        return self.source is arena_data
+
+    def at(self, key: HexKey) -> float:
+        """Угроза на гексе (0 - безопасно)"""
+        return self.values.get(key, 0.0)
+
+    def levels(self, keys: List[HexKey]) -> np.ndarray:
+        """Угроза для списка гексов"""
+        values = self.values
+        return np.fromiter((values.get(key, 0.0) for key in keys), dtype=float, count=len(keys))
+
+    def cost_overlay(self, cost_of: CostFn) -> CostFn:
+        """Стоимость гекса с надбавкой за угрозу (до THREAT_MAX_EXTRA за гекс)"""
+        values = self.values
+
+        def threat_cost(key: HexKey):
+            cost = cost_of(key)
+            threat = values.get(key)
+            if cost is None or not threat:
+                return cost
+            return cost + min(THREAT_MAX_EXTRA, int(threat // THREAT_COST_STEP))
+
+        return threat_cost
@@ -0,0 +1,189 @@
+"""
+HTTP-сессия для API игры.
+
+Одна requests.Session на клиента держит соединения с сервером открытыми
+(keep-alive), поэтому TCP+TLS рукопожатие делается один раз, а не на каждый
+запрос. Оборванное соединение переоткрывается пулом автоматически.
+
+Каждый запрос ограничен дедлайном (обычно из часов хода): таймауты попытки
+не выходят за дедлайн, а повторы с джиттером делаются, только пока до него
+хватает времени.
+"""
+
+import json
+import random
+import time
+from collections import deque
+from typing import Any, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:  # Без orjson разбираем стандартным json
+    orjson = None
+
+HTTP_POOL_SIZE = 4             # Соединений в пуле на сервер
+HTTP_CONNECT_TIMEOUT = 1.0     # Секунд на подключение
+HTTP_READ_TIMEOUT = 1.5        # Секунд на ответ (ход длится 2 секунды)
+HTTP_RETRIES = 2               # Повторы запроса в пределах дедлайна
+HTTP_BACKOFF = 0.05            # Базовая пауза между повторами, секунд (растет вдвое, с джиттером)
+HTTP_MIN_ATTEMPT = 0.1         # Если до дедлайна меньше, новую попытку не начинаем
+HTTP_RETRY_STATUSES = frozenset({502, 503, 504})
+LATENCY_WINDOW = 50            # Сколько последних задержек храним для перцентилей
+
+ACCEPT_ENCODING = 'gzip, deflate'
+
+Timeout = Tuple[float, float]
+HTTP_TIMEOUT: Timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+
+class DeadlineExceeded(requests.Timeout):
+    """До дедлайна запрос выполнить не успеваем"""
+
+
+def make_session(headers: Optional[dict] = None,
+                 pool_size: int = HTTP_POOL_SIZE) -> requests.Session:
+    """Сессия с пулом keep-alive соединений"""
+    # Сам пул не повторяет запросы: повторы делает request_with_deadline,
+    # пока дедлайн позволяет
+    retry = Retry(total=0, redirect=0, raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    # Сжатый ответ requests распаковывает сам
+    session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+def decode_json(payload: bytes) -> Any:
+    """Разбор тела ответа: orjson, если установлен, иначе json"""
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def wire_size(response: requests.Response) -> int:
+    """Сколько байт тела пришло по сети (до распаковки gzip)"""
+    raw = getattr(response, 'raw', None)
+    try:
+        size = raw.tell() if raw is not None else 0
+    except (AttributeError, OSError, ValueError):
+        size = 0
+    if size:
+        return size
+    length = response.headers.get('Content-Length')
+    return int(length) if length and length.isdigit() else len(response.content)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Пауза перед повтором номер attempt (с 0): экспонента с джиттером +-50%"""
+    return HTTP_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+def attempt_timeout(deadline: float, timeout: Timeout = HTTP_TIMEOUT) -> Optional[Timeout]:
+    """Таймауты попытки, урезанные до дедлайна (None - попытку начинать поздно)"""
+    remaining = deadline - time.monotonic()
+    if remaining < HTTP_MIN_ATTEMPT:
+        return None
+    return (min(timeout[0], remaining), min(timeout[1], remaining))
+
+
+def connect_failed(error: requests.RequestException) -> bool:
+    """Ошибка до установки соединения (таймаут или отказ): запрос точно не ушел"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, (ConnectTimeoutError, NewConnectionError))
+
+
+def request_with_deadline(session: requests.Session, method: str, url: str, deadline: float,
+                          timeout: Timeout = HTTP_TIMEOUT, retries: int = HTTP_RETRIES,
+                          idempotent: bool = True, **kwargs) -> requests.Response:
+    """
+    Запрос, который укладывается в дедлайн (time.monotonic).
+
+    Ошибки соединения и 502/503/504 повторяются с джиттером, пока до дедлайна
+    хватает времени. Неидемпотентный запрос (idempotent=False) повторяется
+    только после ошибки соединения (таймаут или отказ): любая другая ошибка
+    или ответ сервера значат, что запрос мог уже дойти.
+    """
+    attempt = 0
+    while True:
+        attempt_timeouts = attempt_timeout(deadline, timeout)
+        if attempt_timeouts is None:
+            raise DeadlineExceeded(f"{method} {url}: дедлайн истек")
+        try:
+            response = session.request(method, url, timeout=attempt_timeouts, **kwargs)
+            if not (idempotent and response.status_code in HTTP_RETRY_STATUSES):
+                return response
+            error = None
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if not idempotent and not connect_failed(e):
+                raise
+            error = e
+
+        delay = backoff_delay(attempt)
+        if attempt >= retries or time.monotonic() + delay + HTTP_MIN_ATTEMPT > deadline:
+            if error is not None:
+                raise error
+            return response
+        attempt += 1
+        time.sleep(delay)
+
+
+class LatencyStats:
+    """Задержки последних запросов и их перцентили"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Перцентиль задержки, секунд (None - измерений еще нет)"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+class PayloadStats:
+    """Размер ответов (по сети и после распаковки) и время их разбора"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.wire = deque(maxlen=window)
+        self.body = deque(maxlen=window)
+        self.decode = deque(maxlen=window)
+
+    def add(self, wire_bytes: int, body_bytes: int, decode_seconds: float):
+        self.wire.append(wire_bytes)
+        self.body.append(body_bytes)
+        self.decode.append(decode_seconds)
+
+    def last(self) -> str:
+        """Строка о последнем ответе для логов"""
+        if not self.wire:
+            return "ответов еще нет"
+        return (f"{self.wire[-1] / 1024:.1f} КБ по сети ({self.body[-1] / 1024:.1f} КБ JSON), "
+                f"разбор {self.decode[-1] * 1000:.1f} мс")
+
+    def summary(self) -> str:
+        """Средние по окну для итоговой статистики"""
+        if not self.wire:
+            return "ответов еще нет"
+        count = len(self.wire)
+        ratio = sum(self.body) / max(1, sum(self.wire))
+        return (f"{sum(self.wire) / count / 1024:.1f} КБ по сети, сжатие x{ratio:.1f}, "
+                f"разбор {sum(self.decode) / count * 1000:.1f} мс")
@@ -0,0 +1,134 @@
+"""
+Часы ходов, синхронизированные с сервером.
+
+Каждый снимок /arena дает nextTurnIn - сколько осталось до следующего хода
+по часам сервера на момент ответа. Момент ответа оцениваем как середину
+запроса (отправка + RTT/2), отсюда граница хода в локальном монотонном
+времени. Длина хода и RTT сглаживаются по смене turnNo, пропущенные и
+повторные ходы считаются.
+
+Цикл игры спит до момента, когда запрос /arena придет на сервер сразу после
+открытия нового хода, а команды должны уйти не позже дедлайна с запасом.
+Запас растет по измеренному 95-му перцентилю задержки /move.
+"""
+
+import time
+from typing import Dict, Optional
+
+from transport import HTTP_MIN_ATTEMPT, LatencyStats
+
+TURN_FETCH_DELAY = 0.05        # Через сколько после открытия хода запрос должен дойти до сервера
+TURN_SEND_MARGIN = 0.25        # Минимальный запас до конца хода, к которому команды уже отправлены
+TURN_SEND_GUARD = 0.05         # Добавка к 95-му перцентилю задержки /move
+TURN_MIN_SLEEP = 0.05          # Минимальная пауза цикла, секунд
+TURN_SMOOTHING = 0.3           # Вес нового измерения в скользящем среднем
+DEFAULT_TURN_LENGTH = 2.0      # Длина хода до первых измерений, секунд
+
+
+def _smooth(old: Optional[float], new: float) -> float:
+    return new if old is None else old + TURN_SMOOTHING * (new - old)
+
+
+class TurnClock:
+    """Оценка границы хода сервера по turnNo, nextTurnIn и RTT"""
+
+    def __init__(self, fetch_delay: float = TURN_FETCH_DELAY, send_margin: float = TURN_SEND_MARGIN):
+        self.fetch_delay = fetch_delay
+        self.send_margin = send_margin
+        self.turn_no: Optional[int] = None
+        self.boundary: Optional[float] = None   # Начало следующего хода (time.monotonic)
+        self.turn_length = DEFAULT_TURN_LENGTH
+        self.rtt: Optional[float] = None
+        self.turns = 0                 # Сколько разных ходов увидели
+        self.missed = 0                # Ходы, которые прошли между снимками
+        self.duplicates = 0            # Снимки хода, который уже видели
+        self.late_sends = 0            # Команды, дошедшие после конца хода
+        self.dropped_sends = 0         # Команды, которые не отправили: дедлайн уже прошел
+        self.send_latency = LatencyStats()
+
+    def observe(self, arena_data: Dict, sent_at: float, received_at: float) -> bool:
+        """Учитываем снимок /arena (время по time.monotonic); True - начался новый ход"""
+        rtt = max(0.0, received_at - sent_at)
+        self.rtt = _smooth(self.rtt, rtt)
+        boundary = received_at - rtt / 2 + arena_data.get('nextTurnIn', 0)
+
+        turn_no = arena_data.get('turnNo')
+        is_new = turn_no is None or turn_no != self.turn_no
+        if self.turn_no is not None and turn_no is not None:
+            if turn_no == self.turn_no:
+                self.duplicates += 1
+            elif turn_no > self.turn_no:
+                self.missed += turn_no - self.turn_no - 1
+                if self.boundary is not None:
+                    length = (boundary - self.boundary) / (turn_no - self.turn_no)
+                    if length > 0:
+                        self.turn_length = _smooth(self.turn_length, length)
+        if is_new:
+            self.turns += 1
+        self.turn_no = turn_no
+        self.boundary = boundary
+        return is_new
+
+    def margin(self) -> float:
+        """Запас до конца хода на отправку команд по измеренным задержкам /move"""
+        p95 = self.send_latency.percentile(95)
+        if p95 is None:
+            return self.send_margin + (self.rtt or 0) / 2
+        return max(self.send_margin, p95 + TURN_SEND_GUARD)
+
+    def deadline(self) -> Optional[float]:
+        """Момент (time.monotonic), когда команды этого хода должны быть отправлены"""
+        if self.boundary is None:
+            return None
+        return self.boundary - self.margin()
+
+    def fetch_deadline(self) -> float:
+        """Дедлайн запроса /arena: снимок позже дедлайна отправки уже не нужен"""
+        now = time.monotonic()
+        if self.boundary is None:
+            return now + self.turn_length - self.send_margin
+        margin = self.margin()
+        deadline = self.boundary - margin
+        if deadline <= now + HTTP_MIN_ATTEMPT:
+            # Команды этого хода отправить уже не успеем: снимок нужен для следующего
+            deadline += self.turn_length * (int((now + HTTP_MIN_ATTEMPT - deadline) / self.turn_length) + 1)
+        return deadline
+
+    def time_left(self) -> float:
+        """Сколько секунд осталось до дедлайна отправки"""
+        deadline = self.deadline()
+        if deadline is None:
+            return self.turn_length - self.send_margin
+        return deadline - time.monotonic()
+
+    def record_send(self, started_at: float, finished_at: float, boundary: Optional[float] = None):
+        """Команды отправлены: задержка идет в перцентили, ответ после конца хода - опоздание
+
+        boundary - конец хода, для которого команды спланированы (по умолчанию текущего).
+        """
+        self.send_latency.add(finished_at - started_at)
+        if boundary is None:
+            boundary = self.boundary
+        if boundary is not None and finished_at > boundary:
+            self.late_sends += 1
+
+    def record_drop(self):
+        """Команды хода не отправлены, потому что дедлайн уже прошел"""
+        self.dropped_sends += 1
+
+    def sleep_time(self) -> float:
+        """Пауза до запроса /arena, который придет на сервер сразу после открытия хода"""
+        if self.boundary is None:
+            return TURN_MIN_SLEEP
+        fetch_at = self.boundary + self.fetch_delay - (self.rtt or 0) / 2
+        # Если граница уже прошла, новый ход открыт - запрашиваем сразу
+        return max(TURN_MIN_SLEEP, fetch_at - time.monotonic())
+
+    def summary(self) -> str:
+        """Строка с метриками часов для логов"""
+        rtt_ms = (self.rtt or 0) * 1000
+        p50 = (self.send_latency.percentile(50) or 0) * 1000
+        p95 = (self.send_latency.percentile(95) or 0) * 1000
+        return (f"Ходов: {self.turns} | Пропущено: {self.missed} | Повторов: {self.duplicates} | "
+                f"Опозданий: {self.late_sends} | Отброшено: {self.dropped_sends} | RTT: {rtt_ms:.0f} мс | "
+                f"/move p50/p95: {p50:.0f}/{p95:.0f} мс | Ход: {self.turn_length:.2f} с")
@@ -17,12 +17,16 @@ from collections import defaultdict
 import time
 import random
 import math  # Добавлен импорт math
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Optional
 from config import *
+from assignment import FoodAssigner, plan_food
+from claims import ClaimRegistry
+from hexgeo import HexKey, neighbor_keys, pack, pack_dict, unpack
+from reservation import resolve_moves
 
 class UltraAgressiveStrategy:
-    def __init__(self):
-        self.explored_hexes = set()
+    def __init__(self, world: Optional[WorldStore] = None):
+        self.world = world if world is not None else WorldStore()  # Вся увиденная карта
         self.enemy_positions = {}
         self.resource_memory = {}
         self.turn_count = 0
@@ -31,7 +35,10 @@ class UltraAgressiveStrategy:
         
         # НОВЫЕ СИСТЕМЫ ДОМИНИРОВАНИЯ
         self.ant_assignments = {}  # ID -> специальная задача
-        self.resource_claims = {}  # позиция -> ID муравья
+        self.resource_claims = ClaimRegistry()  # позиция ресурса -> ID муравья, ход и срок заявки
+        self.food_assigner = FoodAssigner()  # Назначение рабочих на ресурсы с ценами между ходами
+        self.food_paths = {}  # ID рабочего -> путь к ресурсу из назначения хода
+        self.food_paths_version = 0  # Версия карты, по которой построены пути назначения
         self.formation_groups = defaultdict(list)  # тип формации -> муравьи
         self.expansion_zones = []  # приоритетные зоны расширения
         self.blocked_positions = set()  # заблокированные позиции
@@ -42,6 +49,28 @@ class UltraAgressiveStrategy:
         self.resources_collected = 0
         self.territory_controlled = 0
     
+    def update_memory(self, arena_data: Dict, columns: Optional[ArenaColumns] = None):
+        """Обновляем память о карте, врагах и ресурсах"""
+        self.turn_count += 1
+        if columns is not None:
+            self.world.update_columns(columns.map_keys, columns.map_type, columns.map_cost, self.turn_count)
+        else:
+            self.world.update(arena_data.get('map', []), self.turn_count)
+        
+        for enemy in arena_data.get('enemies', []):
+            self.enemy_positions[pack_dict(enemy)] = {
+                'type': enemy['type'],
+                'health': enemy['health'],
+                'turn': self.turn_count
+            }
+        
+        for food in arena_data.get('food', []):
+            self.resource_memory[pack_dict(food)] = {
+                'type': food['type'],
+                'amount': food['amount'],
+                'turn': self.turn_count
+            }
+    
     def analyze_situation(self, arena_data: Dict) -> Dict:
         """Анализ ситуации для domination_master"""
         ants = arena_data.get('ants', [])
@@ -85,35 +114,49 @@ class UltraAgressiveStrategy:
         home_coords = arena_data.get('home', [])
         visible_food = arena_data.get('food', [])
         spot = arena_data.get('spot', {})
-        main_hex = (spot.get('q', 0), spot.get('r', 0))
+        main_hex = pack(spot.get('q', 0), spot.get('r', 0))
         
         # Очищаем старые назначения
         self.ant_assignments.clear()
         self.formation_groups.clear()
+        self.food_paths = {}
+        self.food_paths_version = self.world.version
         
         workers = [ant for ant in ants if ant['type'] == ROLE_WORKER]
         fighters = [ant for ant in ants if ant['type'] == ROLE_FIGHTER] 
         scouts = [ant for ant in ants if ant['type'] == ROLE_SCOUT]
         
         # РАБОЧИЕ: специализация по ресурсам
-        for i, worker in enumerate(workers):
-            worker_pos = (worker['q'], worker['r'])
+        free_workers = []
+        for worker in workers:
+            worker_pos = pack_dict(worker)
             
             if worker_pos == main_hex:
                 self.ant_assignments[worker['id']] = "EVACUATE_MAIN_HEX"
             elif worker.get('food') and worker['food'].get('amount', 0) > 0:
                 self.ant_assignments[worker['id']] = "DELIVER_RESOURCES"
-            elif i < len(visible_food):
-                # Назначаем каждому рабочему свой ресурс
-                target_food = visible_food[i % len(visible_food)]
-                self.ant_assignments[worker['id']] = f"COLLECT_{target_food['q']}_{target_food['r']}"
-                self.resource_claims[(target_food['q'], target_food['r'])] = worker['id']
+            else:
+                free_workers.append(worker)
+        
+        # Свободные рабочие делят ресурсы одним назначением по стоимости пути
+        self.resource_claims.sync(self.turn_count, ants, {pack_dict(food) for food in visible_food})
+        home = [pack_dict(h) for h in home_coords]
+        food_plan = plan_food(self.food_assigner, free_workers, visible_food, self.world.graph,
+                              self.world.cost_of, home)
+        for worker in free_workers:
+            choice = food_plan.get(worker['id'])
+            if choice:
+                q, r = unpack(choice[0])
+                self.ant_assignments[worker['id']] = f"COLLECT_{q}_{r}"
+                self.food_paths[worker['id']] = choice[1]
+                self.resource_claims.claim(choice[0], worker['id'], self.turn_count)
             else:
                 self.ant_assignments[worker['id']] = "EXPLORE_RESOURCES"
+                self.resource_claims.release_ant(worker['id'])
         
         # БОЙЦЫ: формирование боевых групп
         for i, fighter in enumerate(fighters):
-            fighter_pos = (fighter['q'], fighter['r'])
+            fighter_pos = pack_dict(fighter)
             
             if fighter_pos == main_hex:
                 self.ant_assignments[fighter['id']] = "EVACUATE_MAIN_HEX"
@@ -126,7 +169,7 @@ class UltraAgressiveStrategy:
         
         # РАЗВЕДЧИКИ: зоны исследования  
         for i, scout in enumerate(scouts):
-            scout_pos = (scout['q'], scout['r'])
+            scout_pos = pack_dict(scout)
             
             if scout_pos == main_hex:
                 self.ant_assignments[scout['id']] = "EVACUATE_MAIN_HEX"
@@ -134,93 +177,31 @@ class UltraAgressiveStrategy:
                 zone_id = i % 4  # 4 зоны исследования
                 self.ant_assignments[scout['id']] = f"SCOUT_ZONE_{zone_id}"
                 
-    def resolve_position_conflicts(self, moves: List[Dict], ants: List[Dict]) -> List[Dict]:
-        """ИНТЕЛЛЕКТУАЛЬНОЕ разрешение конфликтов позиций"""
-        resolved_moves = []
-        position_claims = defaultdict(list)
-        
-        # Группируем по целевым позициям
-        for move in moves:
-            if move.get('path'):
-                final_pos = (move['path'][-1]['q'], move['path'][-1]['r'])
-                position_claims[final_pos].append(move)
-        
-        for position, competing_moves in position_claims.items():
-            if len(competing_moves) == 1:
-                resolved_moves.extend(competing_moves)
-            else:
-                # РАЗРЕШЕНИЕ КОНФЛИКТА: приоритеты
-                priority_move = self.select_priority_move(competing_moves, ants)
-                resolved_moves.append(priority_move)
-                
-                # Остальным даем альтернативные пути
-                for move in competing_moves:
-                    if move != priority_move:
-                        alternative = self.find_alternative_path(move, ants, position)
-                        if alternative:
-                            resolved_moves.append(alternative)
-        
-        return resolved_moves
-    
-    def select_priority_move(self, competing_moves: List[Dict], ants: List[Dict]) -> Dict:
-        """Выбор приоритетного движения при конфликте"""
-        ant_priorities = {}
-        
-        for move in competing_moves:
-            ant_id = move['ant']
-            ant = next((a for a in ants if a['id'] == ant_id), None)
-            if not ant:
-                continue
-                
-            priority = 0
-            assignment = self.ant_assignments.get(ant_id, "")
-            
-            # ПРИОРИТЕТЫ (чем больше число - тем выше приоритет)
-            if "DELIVER_RESOURCES" in assignment:
-                priority = 100  # Доставка ресурсов - высший приоритет
-            elif "COLLECT_" in assignment:
-                priority = 90   # Сбор ресурсов
-            elif "EVACUATE_MAIN_HEX" in assignment:
-                priority = 80   # Освобождение главного гекса
-            elif "ATTACK_FORMATION" in assignment:
-                priority = 70   # Боевые формации
-            elif ant['type'] == ROLE_WORKER:
-                priority = 60   # Рабочие важнее
-            elif ant['type'] == ROLE_FIGHTER:
-                priority = 50   # Бойцы
-            else:
-                priority = 40   # Разведчики
-                
-            ant_priorities[move] = priority
-        
-        return max(competing_moves, key=lambda m: ant_priorities.get(m, 0))
+    def resolve_position_conflicts(self, moves: List[Dict], index: ArenaIndex) -> List[Dict]:
+        """ИНТЕЛЛЕКТУАЛЬНОЕ разрешение конфликтов позиций (таблица резервирований по шагам)"""
+        return resolve_moves(moves, index, self.move_priority)
     
-    def find_alternative_path(self, blocked_move: Dict, ants: List[Dict], blocked_position: Tuple) -> Optional[Dict]:
-        """Поиск альтернативного пути при блокировке"""
-        ant_id = blocked_move['ant']
-        ant = next((a for a in ants if a['id'] == ant_id), None)
-        if not ant:
-            return None
-            
-        ant_pos = (ant['q'], ant['r'])
-        
-        # Ищем соседние позиции как альтернативу
-        neighbors = self.get_neighbors(*blocked_position)
-        for neighbor in neighbors:
-            if neighbor != ant_pos and neighbor not in self.blocked_positions:
-                # Создаем альтернативный путь
-                alternative_path = [{'q': neighbor[0], 'r': neighbor[1]}]
-                return {
-                    "ant": ant_id,
-                    "path": alternative_path
-                }
-        
-        return None
+    def move_priority(self, ant: Dict) -> int:
+        """Приоритет муравья при постановке пути в таблицу резервирований"""
+        assignment = self.ant_assignments.get(ant['id'], "")
+        
+        # ПРИОРИТЕТЫ (чем больше число - тем выше приоритет)
+        if "DELIVER_RESOURCES" in assignment:
+            return 100  # Доставка ресурсов - высший приоритет
+        elif "COLLECT_" in assignment:
+            return 90   # Сбор ресурсов
+        elif "EVACUATE_MAIN_HEX" in assignment:
+            return 80   # Освобождение главного гекса
+        elif "ATTACK_FORMATION" in assignment:
+            return 70   # Боевые формации
+        elif ant['type'] == ROLE_WORKER:
+            return 60   # Рабочие важнее
+        elif ant['type'] == ROLE_FIGHTER:
+            return 50   # Бойцы
+        else:
+            return 40   # Разведчики
     
-    def get_neighbors(self, q: int, r: int) -> List[Tuple[int, int]]:
-        """Получение соседних гексов"""
-        directions = [(+1, 0), (+1, -1), (0, -1), (-1, 0), (-1, +1), (0, +1)]
-        return [(q + dq, r + dr) for dq, dr in directions]
+    get_neighbors = staticmethod(neighbor_keys)
         
     def create_expansion_zones(self, home_coords: List[Dict], arena_data: Dict):
         """Создание зон для агрессивной экспансии"""
@@ -230,7 +211,7 @@ class UltraAgressiveStrategy:
             return
             
         home_center = home_coords[0]
-        center_pos = (home_center['q'], home_center['r'])
+        center_q, center_r = home_center['q'], home_center['r']
         
         # Создаем зоны в разных направлениях от базы
         directions = [
@@ -243,7 +224,7 @@ class UltraAgressiveStrategy:
         ]
         
         for i, (dq, dr) in enumerate(directions):
-            zone_center = (center_pos[0] + dq, center_pos[1] + dr)
+            zone_center = pack(center_q + dq, center_r + dr)
             self.expansion_zones.append({
                 'id': i,
                 'center': zone_center,
@@ -252,20 +233,25 @@ class UltraAgressiveStrategy:
             })
 
 class SuperAgressiveAPIClient(APIclient):
-    def __init__(self, use_test_server=True):
-        super().__init__(use_test_server)
-        self.strategy = UltraAgressiveStrategy()
+    def __init__(self, use_test_server=True, session=None):
+        super().__init__(use_test_server, session)
+        self.strategy = UltraAgressiveStrategy(self.world)
         self.move_executor = ThreadPoolExecutor(max_workers=4)
         
-    def execute_ultra_aggressive_turn(self):
-        """УЛЬТРА-АГРЕССИВНОЕ выполнение хода с многопоточностью"""
+    def execute_ultra_aggressive_turn(self, arena_data: Optional[Dict] = None):
+        """УЛЬТРА-АГРЕССИВНОЕ выполнение хода с многопоточностью (по снимку арены из цикла)"""
         start_time = time.time()
         
-        arena_data = self.get_arena()
+        if arena_data is None:
+            arena_data = self.get_arena()
         if not arena_data:
             return False
+        if self.already_planned(arena_data):
+            print(f"ℹ️ Ход {arena_data.get('turnNo')} уже спланирован, пропускаем")
+            return True
             
-        our_ants = arena_data.get('ants', [])
+        index = self.get_index(arena_data)
+        our_ants = list(index.ants_by_id.values())
         visible_enemies = arena_data.get('enemies', [])
         visible_food = arena_data.get('food', [])
         home_coords = arena_data.get('home', [])
@@ -299,7 +285,7 @@ class SuperAgressiveAPIClient(APIclient):
                 print(f"⚠️ Ошибка планирования для {ant_id[:8]}: {e}")
         
         # 5. ИНТЕЛЛЕКТУАЛЬНОЕ РАЗРЕШЕНИЕ КОНФЛИКТОВ
-        resolved_moves = self.strategy.resolve_position_conflicts(moves, our_ants)
+        resolved_moves = self.strategy.resolve_position_conflicts(moves, index)
         
         # 6. ОТПРАВКА КОМАНД
         if resolved_moves:
@@ -312,6 +298,7 @@ class SuperAgressiveAPIClient(APIclient):
                 return False
         else:
             print("⚠️ Нет команд для отправки")
+        self.planned_turn = arena_data.get('turnNo')
         
         execution_time = time.time() - start_time
         print(f"⚡ Время выполнения: {execution_time:.2f}с | Эффективность: {len(resolved_moves)/max(1, len(our_ants))*100:.1f}%")
@@ -319,10 +306,9 @@ class SuperAgressiveAPIClient(APIclient):
         
         return True
     
-    def plan_specialized_move(self, ant: Dict, arena_data: Dict) -> List[Dict]:
+    def plan_specialized_move(self, ant: Dict, arena_data: Dict) -> List[HexKey]:
         """Планирование движения на основе специализации"""
         ant_id = ant['id']
-        ant_pos = (ant['q'], ant['r'])
         assignment = self.strategy.ant_assignments.get(ant_id, "")
         
         try:
@@ -345,27 +331,27 @@ class SuperAgressiveAPIClient(APIclient):
                 
         except Exception as e:
             print(f"Ошибка в специализированном планировании для {ant_id[:8]}: {e}")
-            return [{'q': ant['q'], 'r': ant['r']}]
+            return [pack_dict(ant)]
     
-    def evacuate_from_main_hex(self, ant: Dict, arena_data: Dict) -> List[Dict]:
+    def evacuate_from_main_hex(self, ant: Dict, arena_data: Dict) -> List[HexKey]:
         """БЫСТРАЯ эвакуация с основного гекса"""
-        ant_pos = (ant['q'], ant['r'])
+        ant_pos = pack_dict(ant)
         home_coords = arena_data.get('home', [])
         
         # Ищем ближайший свободный гекс дома
         for home in home_coords:
-            home_pos = (home['q'], home['r'])
+            home_pos = pack_dict(home)
             if home_pos != ant_pos:
                 return self.find_path_astar(ant_pos, home_pos, arena_data, max_cost=5)
         
         # Если все гексы дома заняты, отходим на соседний
-        neighbors = self.get_neighbors(*ant_pos)
+        neighbors = self.get_neighbors(ant_pos)
         if neighbors:
-            return [{'q': ant_pos[0], 'r': ant_pos[1]}, {'q': neighbors[0][0], 'r': neighbors[0][1]}]
+            return [ant_pos, neighbors[0]]
         
-        return [{'q': ant['q'], 'r': ant['r']}]
+        return [ant_pos]
     
-    def collect_assigned_resource(self, ant: Dict, assignment: str, arena_data: Dict) -> List[Dict]:
+    def collect_assigned_resource(self, ant: Dict, assignment: str, arena_data: Dict) -> List[HexKey]:
         """Сбор НАЗНАЧЕННОГО ресурса"""
         # Извлекаем координаты из назначения: "COLLECT_125_-102"
         parts = assignment.split('_')
@@ -373,34 +359,41 @@ class SuperAgressiveAPIClient(APIclient):
             try:
                 target_q = int(parts[1])
                 target_r = int(parts[2])
-                target_pos = (target_q, target_r)
-                ant_pos = (ant['q'], ant['r'])
+                target_pos = pack(target_q, target_r)
                 
-                return self.find_path_astar(ant_pos, target_pos, arena_data, max_cost=10)
+                # Путь из общего назначения; D* Lite чинит его, только если гексы на пути
+                # изменились после назначения
+                path = self.strategy.food_paths.get(ant['id'])
+                if path and path[0] == pack_dict(ant) and path[-1] == target_pos:
+                    moved = self.world.version != self.strategy.food_paths_version
+                    if not any((moved and key in self.world.changed) or self.world.cost_of(key) is None
+                               for key in path[1:]):
+                        return path
+                return self.find_path_incremental(ant, target_pos, arena_data)
             except ValueError:
                 pass
         
         # Если не удалось извлечь координаты, ищем ближайший ресурс
         return self.explore_for_resources_aggressive(ant, arena_data)
     
-    def explore_for_resources_aggressive(self, ant: Dict, arena_data: Dict) -> List[Dict]:
+    def explore_for_resources_aggressive(self, ant: Dict, arena_data: Dict) -> List[HexKey]:
         """АГРЕССИВНАЯ разведка ресурсов"""
-        ant_pos = (ant['q'], ant['r'])
+        ant_pos = pack_dict(ant)
         visible_food = arena_data.get('food', [])
         
         if visible_food:
-            # Ищем ближайший НЕзанятый ресурс
-            available_food = []
-            for food in visible_food:
-                food_pos = (food['q'], food['r'])
-                if food_pos not in self.strategy.resource_claims:
-                    distance = self.hex_distance(ant_pos, food_pos)
-                    available_food.append((food_pos, distance))
+            # Ищем ближайший по реальной стоимости пути НЕзанятый ресурс
+            claims = self.strategy.resource_claims
+            turn = self.strategy.turn_count
+            available_food = [food for food in visible_food
+                              if not claims.claimed_by_other(pack_dict(food), ant['id'], turn)]
             
             if available_food:
-                available_food.sort(key=lambda x: x[1])
-                target_pos = available_food[0][0]
-                return self.find_path_astar(ant_pos, target_pos, arena_data, max_cost=15)
+                travel_costs, parents = self.search_food(ant, available_food, arena_data)
+                # Соседний поток мог занять ресурс после фильтра: берем ближайший, на который заявка прошла
+                for target_pos in sorted(travel_costs, key=travel_costs.get):
+                    if claims.claim(target_pos, ant['id'], turn):
+                        return reconstruct_path(parents, target_pos)
         
         # Если нет видимых ресурсов, АГРЕССИВНО исследуем
         home_coords = arena_data.get('home', [])
@@ -413,67 +406,52 @@ class SuperAgressiveAPIClient(APIclient):
             
             target_q = int(home_center['q'] + distance * math.cos(angle))
             target_r = int(home_center['r'] + distance * math.sin(angle))
-            target_pos = (target_q, target_r)
+            target_pos = pack(target_q, target_r)
             
-            return self.find_path_astar(ant_pos, target_pos, arena_data, max_cost=20)
+            return self.find_path_long(ant_pos, target_pos, arena_data)
         
-        return [{'q': ant['q'], 'r': ant['r']}]
+        return [ant_pos]
         
-    def deliver_resources_optimized(self, ant: Dict, arena_data: Dict) -> List[Dict]:
+    def deliver_resources_optimized(self, ant: Dict, arena_data: Dict) -> List[HexKey]:
         """ОПТИМИЗИРОВАННАЯ доставка ресурсов"""
-        ant_pos = (ant['q'], ant['r'])
-        home_coords = arena_data.get('home', [])
+        ant_pos = pack_dict(ant)
         
-        if home_coords:
-            # Выбираем ближайший гекс муравейника
-            closest_home = min(home_coords, 
-                             key=lambda h: self.hex_distance(ant_pos, (h['q'], h['r'])))
-            target_pos = (closest_home['q'], closest_home['r'])
-            
-            return self.find_path_astar(ant_pos, target_pos, arena_data, max_cost=10)
+        if self.get_index(arena_data).home:
+            # Общее поле расстояний до муравейника вместо A* для каждого муравья
+            return self.path_to_home(ant_pos, arena_data)
         
-        return [{'q': ant['q'], 'r': ant['r']}]
-    
-    def get_neighbors(self, q: int, r: int) -> List[Tuple[int, int]]:
-        """Получение соседних гексов"""
-        directions = [(+1, 0), (+1, -1), (0, -1), (-1, 0), (-1, +1), (0, +1)]
-        return [(q + dq, r + dr) for dq, dr in directions]
+        return [ant_pos]
     
-    def execute_attack_formation(self, ant: Dict, assignment: str, arena_data: Dict) -> List[Dict]:
+    def execute_attack_formation(self, ant: Dict, assignment: str, arena_data: Dict) -> List[HexKey]:
         """Выполнение атакующей формации"""
-        ant_pos = (ant['q'], ant['r'])
-        visible_enemies = arena_data.get('enemies', [])
-        
-        if visible_enemies:
-            # Атакуем ближайшего врага
-            closest_enemy = min(visible_enemies, 
-                              key=lambda e: self.hex_distance(ant_pos, (e['q'], e['r'])))
-            target_pos = (closest_enemy['q'], closest_enemy['r'])
-            return self.find_path_astar(ant_pos, target_pos, arena_data, max_cost=10)
+        # Атакуем ближайшего врага (из пространственного хеша хода)
+        closest = self.get_index(arena_data).enemy_grid.nearest(pack_dict(ant))
+        if closest:
+            return self.find_path_astar(pack_dict(ant), pack_dict(closest[0][1]), arena_data, max_cost=10)
         
         # Если врагов нет, патрулируем
         return self.default_aggressive_move(ant, arena_data)
     
-    def defend_base_position(self, ant: Dict, arena_data: Dict) -> List[Dict]:
+    def defend_base_position(self, ant: Dict, arena_data: Dict) -> List[HexKey]:
         """Защита базы"""
-        ant_pos = (ant['q'], ant['r'])
+        ant_pos = pack_dict(ant)
         home_coords = arena_data.get('home', [])
         
         if home_coords:
             # Держимся рядом с базой
             home_center = home_coords[0]
-            home_pos = (home_center['q'], home_center['r'])
+            home_pos = pack_dict(home_center)
             
             # Если далеко от базы, возвращаемся
             distance = self.hex_distance(ant_pos, home_pos)
             if distance > 5:
-                return self.find_path_astar(ant_pos, home_pos, arena_data, max_cost=8)
+                return self.find_path_incremental(ant, home_pos, arena_data)
         
-        return [{'q': ant['q'], 'r': ant['r']}]
+        return [ant_pos]
     
-    def scout_assigned_zone(self, ant: Dict, assignment: str, arena_data: Dict) -> List[Dict]:
+    def scout_assigned_zone(self, ant: Dict, assignment: str, arena_data: Dict) -> List[HexKey]:
         """Разведка назначенной зоны"""
-        ant_pos = (ant['q'], ant['r'])
+        ant_pos = pack_dict(ant)
         
         # Извлекаем номер зоны из задания
         try:
@@ -481,31 +459,28 @@ class SuperAgressiveAPIClient(APIclient):
             if zone_id < len(self.strategy.expansion_zones):
                 zone = self.strategy.expansion_zones[zone_id]
                 target_pos = zone['center']
-                return self.find_path_astar(ant_pos, target_pos, arena_data, max_cost=20)
+                return self.find_path_long(ant_pos, target_pos, arena_data)
         except (ValueError, IndexError):
             pass
         
         return self.default_aggressive_move(ant, arena_data)
     
-    def default_aggressive_move(self, ant: Dict, arena_data: Dict) -> List[Dict]:
+    def default_aggressive_move(self, ant: Dict, arena_data: Dict) -> List[HexKey]:
         """Базовое агрессивное движение"""
-        ant_pos = (ant['q'], ant['r'])
-        visible_food = arena_data.get('food', [])
+        ant_pos = pack_dict(ant)
         
-        if visible_food:
-            # Движемся к ближайшему ресурсу
-            closest_food = min(visible_food, 
-                             key=lambda f: self.hex_distance(ant_pos, (f['q'], f['r'])))
-            target_pos = (closest_food['q'], closest_food['r'])
-            return self.find_path_astar(ant_pos, target_pos, arena_data, max_cost=10)
+        # Движемся к ближайшему ресурсу
+        closest = self.get_index(arena_data).food_grid.nearest(ant_pos)
+        if closest:
+            return self.find_path_astar(ant_pos, pack_dict(closest[0][1]), arena_data, max_cost=10)
         
         # Если ресурсов нет, исследуем случайно
-        neighbors = self.get_neighbors(*ant_pos)
+        neighbors = self.get_neighbors(ant_pos)
         if neighbors:
             target = random.choice(neighbors)
-            return [{'q': ant_pos[0], 'r': ant_pos[1]}, {'q': target[0], 'r': target[1]}]
+            return [ant_pos, target]
         
-        return [{'q': ant['q'], 'r': ant['r']}]
+        return [ant_pos]
 
 def main_ultra_aggressive():
     """ГЛАВНАЯ функция ультра-агрессивного бота"""
@@ -532,8 +507,8 @@ def main_ultra_aggressive():
                 print("🏁 РАУНД ЗАВЕРШЕН!")
                 break
             
-            # ВЫПОЛНЯЕМ УЛЬТРА-АГРЕССИВНЫЙ ХОД
-            success = client.execute_ultra_aggressive_turn()
+            # ВЫПОЛНЯЕМ УЛЬТРА-АГРЕССИВНЫЙ ХОД по тому же снимку арены
+            success = client.execute_ultra_aggressive_turn(arena_data)
             
             if success:
                 turn_count += 1
@@ -543,10 +518,10 @@ def main_ultra_aggressive():
                     ants_count = len(arena_data.get('ants', []))
                     score = arena_data.get('score', 0)
                     print(f"📊 ПРОГРЕСС: Ход {turn_count} | Армия: {ants_count} | Счет: {score}")
+                    print(f"⏱️ {client.turn_clock.summary()}")
             
-            # Адаптивная пауза
-            sleep_time = max(0.3, next_turn_in - 0.2)
-            time.sleep(sleep_time)
+            # Спим до открытия следующего хода по часам сервера
+            time.sleep(client.turn_clock.sleep_time())
             
     except KeyboardInterrupt:
         print(f"\n⏹️ ОСТАНОВКА на ходу {turn_count}")
@@ -556,6 +531,7 @@ def main_ultra_aggressive():
         traceback.print_exc()
     finally:
         client.move_executor.shutdown(wait=True)
+        print(f"⏱️ {client.turn_clock.summary()}")
         print("🔥 УЛЬТРА-АГРЕССИВНАЯ СИСТЕМА ЗАВЕРШЕНА")
 
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
 import os, time, requests
 from dotenv import load_dotenv
 from colorama import Fore, Back, Style, init
+from rate_limit import PRIORITY_BACKGROUND, shared_limiter
 
 init(autoreset=True)
 load_dotenv()
@@ -18,6 +19,8 @@ RESOURCE_CHARS = {1: Fore.CYAN + "a", 2: Fore.CYAN + "b", 3: Fore.CYAN + "n"}
 
 def fetch_arena_data():
     try:
+        # Визуализатор делит лимит 3 RPS с ботом и уступает его запросам
+        shared_limiter(TOKEN).acquire(PRIORITY_BACKGROUND)
         r = requests.get(f"{BASE_URL}/arena", headers=HEADERS)
         r.raise_for_status()
         return r.json()
@@ -0,0 +1,218 @@
+"""
+Память о карте за весь раунд.
+
+/arena возвращает только видимые сейчас гексы. Все, что муравьи когда-либо
+видели, хранится в чанках CHUNK_SIZE x CHUNK_SIZE в осевых координатах:
+тип гекса, стоимость входа и ход, когда гекс видели последним, лежат
+в компактных массивах байт. Поиск пути получает полную известную карту,
+а не только текущую область видимости; вместе с картой дополняется
+граф соседства (adjacency.HexGraph).
+
+Все запросы принимают упакованные ключи гексов: чанк и смещение внутри
+него выделяются из ключа масками, без распаковки координат.
+"""
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from adjacency import HexGraph
+from arena_columns import MAP_FIELDS, field_table, pack_columns
+from constants import HEX_STONE
+from hexgeo import KEY_BITS, HexKey, spiral_key_offsets
+from pathfinding import ASTAR_TERRAIN_WEIGHTS
+
+CHUNK_SHIFT = 4                    # Сторона чанка 2**4 = 16 гексов
+CHUNK_SIZE = 1 << CHUNK_SHIFT
+CHUNK_MASK = CHUNK_SIZE - 1
+CHUNK_CELLS = CHUNK_SIZE * CHUNK_SIZE
+# Ключ без младших бит q и r - общий для всех гексов чанка (KEY_OFFSET кратен CHUNK_SIZE)
+CHUNK_ID_MASK = ((1 << (2 * KEY_BITS)) - 1) ^ ((CHUNK_MASK << KEY_BITS) | CHUNK_MASK)
+
+UNSEEN = 0                         # Тип гекса, который еще не видели
+NEVER_SEEN = -1                    # Ход последнего наблюдения для таких гексов
+
+ChunkId = int
+
+
+def weight_of(hex_type: int) -> int:
+    """Вес гекса для поиска пути (0 - непроходимый камень)"""
+    if hex_type == HEX_STONE:
+        return 0
+    return ASTAR_TERRAIN_WEIGHTS.get(hex_type, 1)
+
+
+# Вес по типу гекса для пакетного обновления чанков
+WEIGHT_TABLE = np.array([weight_of(hex_type) for hex_type in range(256)], dtype=np.uint8)
+
+
+class Chunk:
+    """Чанк карты: тип, стоимость, вес для поиска пути и ход наблюдения по гексам"""
+
+    __slots__ = ('types', 'costs', 'weights', 'seen', 'known')
+
+    def __init__(self):
+        self.types = bytearray(CHUNK_CELLS)
+        self.costs = bytearray(CHUNK_CELLS)
+        self.weights = bytearray(b'\x01' * CHUNK_CELLS)  # Невидимые гексы стоят 1
+        self.seen = array('i', [NEVER_SEEN]) * CHUNK_CELLS
+        self.known = 0
+
+
+def chunk_id(key: HexKey) -> ChunkId:
+    """Чанк гекса"""
+    return key & CHUNK_ID_MASK
+
+
+def _offset(key: HexKey) -> int:
+    """Номер гекса внутри чанка"""
+    return ((key & CHUNK_MASK) << CHUNK_SHIFT) | ((key >> KEY_BITS) & CHUNK_MASK)
+
+
+class WeightView:
+    """Веса гексов мира в виде отображения ключ -> вес (None - камень)"""
+
+    def __init__(self, world: 'WorldStore'):
+        self.chunks = world.chunks
+
+    def get(self, key: HexKey, default: Optional[int] = None) -> Optional[int]:
+        chunk = self.chunks.get(key & CHUNK_ID_MASK)
+        if chunk is None:
+            return default
+        offset = ((key & CHUNK_MASK) << CHUNK_SHIFT) | ((key >> KEY_BITS) & CHUNK_MASK)
+        if not chunk.types[offset]:
+            return default
+        return chunk.weights[offset] or None
+
+
+class WorldStore:
+    """Все увиденные за раунд гексы, разбитые на чанки"""
+
+    def __init__(self):
+        self.chunks: Dict[ChunkId, Chunk] = {}
+        self.version = 0               # Растет при любом изменении рельефа
+        self.changed: Set[HexKey] = set()  # Гексы с новым весом после последнего update
+        self.weights = WeightView(self)
+        self.graph = HexGraph()        # Граф соседства, растет вместе с картой
+
+    def _cell(self, key: HexKey) -> Tuple[Optional[Chunk], int]:
+        return self.chunks.get(key & CHUNK_ID_MASK), _offset(key)
+
+    def update(self, hexes: Iterable[Dict], turn: int) -> Set[HexKey]:
+        """Записываем гексы из ответа /arena; возвращаем гексы, у которых изменился вес"""
+        hexes = list(hexes)
+        table = field_table(hexes, MAP_FIELDS)
+        return self.update_columns(pack_columns(table[:, 0], table[:, 1]), table[:, 2].astype(np.uint8),
+                                   np.minimum(table[:, 3], 255).astype(np.uint8), turn)
+
+    def update_columns(self, keys: np.ndarray, types: np.ndarray, costs: np.ndarray,
+                       turn: int) -> Set[HexKey]:
+        """То же по столбцам (ArenaColumns): массивы чанка обновляются срезами, в цикле - только новые гексы"""
+        changed = set()
+        terrain_changed = False
+        if len(keys):
+            chunk_ids = keys & CHUNK_ID_MASK
+            offsets = ((keys & CHUNK_MASK) << CHUNK_SHIFT) | ((keys >> KEY_BITS) & CHUNK_MASK)
+            order = np.argsort(chunk_ids, kind='stable')
+            sorted_ids = chunk_ids[order]
+            bounds = np.flatnonzero(np.diff(sorted_ids)) + 1
+            for group in np.split(order, bounds):
+                cid = int(chunk_ids[group[0]])
+                chunk = self.chunks.get(cid)
+                if chunk is None:
+                    chunk = self.chunks[cid] = Chunk()
+                cell = offsets[group]
+                new_types = types[group]
+
+                chunk_types = np.frombuffer(chunk.types, dtype=np.uint8)
+                old_types = chunk_types[cell]
+                differs = old_types != new_types
+                if differs.any():
+                    terrain_changed = True
+                    chunk.known += int(np.count_nonzero(differs & (old_types == UNSEEN)))
+                    chunk_weights = np.frombuffer(chunk.weights, dtype=np.uint8)
+                    new_weights = WEIGHT_TABLE[new_types[differs]]
+                    moved = cell[differs]
+                    weight_changed = chunk_weights[moved] != new_weights
+                    chunk_types[moved] = new_types[differs]
+                    chunk_weights[moved] = new_weights
+                    changed.update(keys[group][differs][weight_changed].tolist())
+                    graph = self.graph
+                    for key, weight in zip(keys[group][differs].tolist(), new_weights.tolist()):
+                        graph.reveal(key, weight)
+
+                np.frombuffer(chunk.costs, dtype=np.uint8)[cell] = costs[group]
+                np.frombuffer(chunk.seen, dtype=np.int32)[cell] = turn
+
+        if terrain_changed:
+            self.version += 1
+        self.changed = changed
+        return changed
+
+    def cost_of(self, key: HexKey) -> Optional[int]:
+        """Вес гекса для поиска пути (невидимые стоят 1, None - камень)"""
+        chunk = self.chunks.get(key & CHUNK_ID_MASK)
+        if chunk is None:
+            return 1
+        return chunk.weights[((key & CHUNK_MASK) << CHUNK_SHIFT) | ((key >> KEY_BITS) & CHUNK_MASK)] or None
+
+    def type_at(self, key: HexKey) -> Optional[int]:
+        """Тип гекса (None - гекс не видели)"""
+        chunk, offset = self._cell(key)
+        if chunk is None or not chunk.types[offset]:
+            return None
+        return chunk.types[offset]
+
+    def cost_at(self, key: HexKey) -> Optional[int]:
+        """Стоимость входа по данным сервера (None - гекс не видели)"""
+        chunk, offset = self._cell(key)
+        if chunk is None or not chunk.types[offset]:
+            return None
+        return chunk.costs[offset]
+
+    def last_seen(self, key: HexKey) -> Optional[int]:
+        """Ход, когда гекс видели последним (None - не видели)"""
+        chunk, offset = self._cell(key)
+        if chunk is None or chunk.seen[offset] == NEVER_SEEN:
+            return None
+        return chunk.seen[offset]
+
+    def get(self, key: HexKey, default: Optional[int] = None) -> Optional[int]:
+        """Тип гекса как у словаря рельефа"""
+        hex_type = self.type_at(key)
+        return default if hex_type is None else hex_type
+
+    def __contains__(self, key: HexKey) -> bool:
+        return self.type_at(key) is not None
+
+    def __len__(self) -> int:
+        return sum(chunk.known for chunk in self.chunks.values())
+
+    def chunk(self, cid: ChunkId) -> Optional[Chunk]:
+        """Чанк по номеру chunk_id (None - в нем ничего не видели)"""
+        return self.chunks.get(cid)
+
+    def chunk_items(self, cid: ChunkId) -> Iterator[Tuple[HexKey, int]]:
+        """Увиденные гексы чанка: (ключ, тип)"""
+        chunk = self.chunks.get(cid)
+        if chunk is None:
+            return
+        types = chunk.types
+        for offset in range(CHUNK_CELLS):
+            if types[offset]:
+                yield cid | ((offset & CHUNK_MASK) << KEY_BITS) | (offset >> CHUNK_SHIFT), types[offset]
+
+    def items(self) -> Iterator[Tuple[HexKey, int]]:
+        """Все увиденные гексы: (ключ, тип)"""
+        for key in list(self.chunks):
+            yield from self.chunk_items(key)
+
+    def region(self, center: HexKey, radius: int) -> List[Tuple[HexKey, int]]:
+        """Увиденные гексы в радиусе radius от center: (ключ, тип)"""
+        result = []
+        for delta in spiral_key_offsets(radius):
+            hex_type = self.type_at(center + delta)
+            if hex_type is not None:
+                result.append((center + delta, hex_type))
+        return result